@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+
+# Content-addressed store for the files the scripts archive into
+# archived_files/ (project_database.db, lib_info.db, lib_info.csv,
+# pool_summary.csv, lib_info_submitted_to_clarity.csv, ...) and for the
+# copies of unmodified density .xlsx files.
+#
+# Each unique file is stored once, gzip compressed, as
+# archived_files/.store/<first 2 hex>/<sha256>.gz and every archive event is
+# one row in archived_files/archive_manifest.csv that maps the archive name
+# and time to the hash.  Archiving a file that hasn't changed only adds a
+# manifest row.  Set SIP_ARCHIVE_STORE=0 to go back to plain timestamped
+# copies in archived_files/.
+#
+# USAGE:   import archive_store
+#          archive_store.archiveFile(PROJECT_DIR / 'lib_info.csv', ARCHIV_DIR / f"archive_lib_info_{date}.csv")
+#
+#          python archive_store.py list [pattern]
+#          python archive_store.py restore <archive name> [destination]
+#          python archive_store.py import       (fold existing plain archive files into the store)
+#          python archive_store.py stats
+
+
+import os
+import sys
+import csv
+import gzip
+import shutil
+import hashlib
+import fnmatch
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+
+MANIFEST_COLS = ['archived_at', 'archive_path', 'source_path',
+                 'sha256', 'size', 'mtime_ns']
+
+CHUNK_SIZE = 1 << 20
+
+
+##########################
+##########################
+def useArchiveStore():
+
+    return os.environ.get('SIP_ARCHIVE_STORE', '1') != '0'
+##########################
+##########################
+
+
+##########################
+##########################
+def getArchiveDir(project_dir=None):
+
+    if project_dir is None:
+        project_dir = Path.cwd()
+
+    return Path(project_dir) / 'archived_files'
+##########################
+##########################
+
+
+##########################
+##########################
+def getStoreDir(project_dir=None):
+
+    return getArchiveDir(project_dir) / '.store'
+##########################
+##########################
+
+
+##########################
+##########################
+def getManifestPath(project_dir=None):
+
+    return getArchiveDir(project_dir) / 'archive_manifest.csv'
+##########################
+##########################
+
+
+##########################
+##########################
+def getBlobPath(digest, project_dir=None):
+
+    return getStoreDir(project_dir) / digest[:2] / f'{digest}.gz'
+##########################
+##########################
+
+
+##########################
+##########################
+def relativePath(path, project_dir=None):
+
+    # manifest paths are relative to the project folder so the
+    # whole project folder can be moved
+    if project_dir is None:
+        project_dir = Path.cwd()
+
+    path = Path(path).absolute()
+
+    try:
+        return path.relative_to(Path(project_dir).absolute()).as_posix()
+    except ValueError:
+        return path.as_posix()
+##########################
+##########################
+
+
+##########################
+##########################
+def hashFile(path):
+
+    sha = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+##########################
+##########################
+
+
+##########################
+##########################
+def readManifest(project_dir=None):
+
+    manifest_path = getManifestPath(project_dir)
+
+    if not manifest_path.exists():
+        return []
+
+    with open(manifest_path, newline='') as f:
+        return list(csv.DictReader(f))
+##########################
+##########################
+
+
+##########################
+##########################
+def appendManifest(row, project_dir=None):
+
+    manifest_path = getManifestPath(project_dir)
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    write_header = not manifest_path.exists()
+
+    # one row per write so rows from different scripts don't interleave
+    with open(manifest_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLS)
+
+        if write_header:
+            writer.writeheader()
+
+        writer.writerow(row)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def findKnownHash(source_path, stat, project_dir=None):
+
+    # the hash recorded the last time this exact file (same path, size and
+    # modification time) was archived, so unchanged files aren't re-read
+    for row in reversed(readManifest(project_dir)):
+        if row['source_path'] != source_path:
+            continue
+
+        if (row['size'] == str(stat.st_size)) and (row['mtime_ns'] == str(stat.st_mtime_ns)):
+            return row['sha256']
+
+        return None
+
+    return None
+##########################
+##########################
+
+
+##########################
+##########################
+def storeBlob(path, digest, project_dir=None):
+
+    # returns False when the content was already in the store
+    blob_path = getBlobPath(digest, project_dir)
+
+    if blob_path.exists():
+        return False
+
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # compress to a temporary file first so a partly written blob
+    # is never mistaken for a complete one
+    fd, tmp_name = tempfile.mkstemp(dir=blob_path.parent, suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, 'wb') as raw, open(path, 'rb') as src:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as gz:
+                shutil.copyfileobj(src, gz, CHUNK_SIZE)
+
+        os.replace(tmp_name, blob_path)
+
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    return True
+##########################
+##########################
+
+
+##########################
+##########################
+def archiveFile(src_path, archive_path, move=True, project_dir=None):
+
+    # archive src_path under the name archive_path.  With move=True the
+    # source file is removed afterwards, like the Path.rename() archiving
+    # it replaces
+    src_path = Path(src_path)
+    archive_path = Path(archive_path)
+
+    if not useArchiveStore():
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if move:
+            src_path.rename(archive_path)
+        else:
+            shutil.copy(src_path, archive_path)
+
+        archive_path.touch()
+
+        return None
+
+    source_rel = relativePath(src_path, project_dir)
+
+    stat = src_path.stat()
+
+    digest = findKnownHash(source_rel, stat, project_dir)
+
+    if (digest is None) or not getBlobPath(digest, project_dir).exists():
+        digest = hashFile(src_path)
+
+        storeBlob(src_path, digest, project_dir)
+
+    appendManifest({'archived_at': datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S"),
+                    'archive_path': relativePath(archive_path, project_dir),
+                    'source_path': source_rel,
+                    'sha256': digest,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns}, project_dir)
+
+    if move:
+        src_path.unlink()
+
+    return digest
+##########################
+##########################
+
+
+##########################
+##########################
+def findArchive(name, project_dir=None):
+
+    # latest manifest row whose archive name or path matches name
+    for row in reversed(readManifest(project_dir)):
+        if (row['archive_path'] == name) or (Path(row['archive_path']).name == name):
+            return row
+
+    return None
+##########################
+##########################
+
+
+##########################
+##########################
+def restoreArchive(name, dest=None, project_dir=None):
+
+    row = findArchive(name, project_dir)
+
+    if row is None:
+        print(f'\n\n{name} was not found in {getManifestPath(project_dir)}.  Aborting\n\n')
+        sys.exit()
+
+    blob_path = getBlobPath(row['sha256'], project_dir)
+
+    if not blob_path.exists():
+        print(f"\n\nStored copy of {name} ({blob_path}) is missing.  Aborting\n\n")
+        sys.exit()
+
+    if dest is None:
+        if project_dir is None:
+            project_dir = Path.cwd()
+
+        dest = Path(project_dir) / row['archive_path']
+
+    dest = Path(dest)
+
+    if dest.is_dir():
+        dest = dest / Path(row['archive_path']).name
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    with gzip.open(blob_path, 'rb') as gz, open(dest, 'wb') as out:
+        shutil.copyfileobj(gz, out, CHUNK_SIZE)
+
+    if hashFile(dest) != row['sha256']:
+        print(f'\n\nRestored {dest} does not match its stored hash.  Aborting\n\n')
+        sys.exit()
+
+    return dest
+##########################
+##########################
+
+
+##########################
+##########################
+def importArchives(project_dir=None):
+
+    # move plain archive files left by earlier runs into the store.  A file
+    # is only deleted once its compressed copy is in the store
+    archive_dir = getArchiveDir(project_dir)
+
+    files = sorted(p for p in archive_dir.glob('archive_*')
+                   if p.is_file() and (p != getManifestPath(project_dir)))
+
+    n_new = 0
+
+    for p in files:
+        digest = hashFile(p)
+
+        n_new += storeBlob(p, digest, project_dir)
+
+        stat = p.stat()
+
+        appendManifest({'archived_at': datetime.fromtimestamp(stat.st_mtime).strftime("%Y_%m_%d-Time%H-%M-%S"),
+                        'archive_path': relativePath(p, project_dir),
+                        'source_path': '',
+                        'sha256': digest,
+                        'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns}, project_dir)
+
+        p.unlink()
+
+    return len(files), n_new
+##########################
+##########################
+
+
+##########################
+##########################
+def getStats(project_dir=None):
+
+    rows = readManifest(project_dir)
+
+    original = sum(int(r['size']) for r in rows)
+
+    stored = sum(p.stat().st_size for p in getStoreDir(project_dir).glob('*/*.gz'))
+
+    return len(rows), len({r['sha256'] for r in rows}), original, stored
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    usage = 'USAGE:   python archive_store.py list [pattern] | restore <archive name> [destination] | import | stats'
+
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit()
+
+    command = sys.argv[1]
+
+    if command == 'list':
+        pattern = sys.argv[2] if len(sys.argv) > 2 else '*'
+
+        for row in readManifest():
+            if fnmatch.fnmatch(Path(row['archive_path']).name, pattern):
+                print(f"{row['archived_at']}  {row['sha256'][:12]}  {int(row['size']):>12}  {row['archive_path']}")
+
+    elif command == 'restore' and len(sys.argv) > 2:
+        dest = sys.argv[3] if len(sys.argv) > 3 else None
+
+        print(f'Restored {restoreArchive(sys.argv[2], dest)}')
+
+    elif command == 'import':
+        n_files, n_new = importArchives()
+
+        print(f'{n_files} archive files moved into the store, {n_new} unique')
+
+    elif command == 'stats':
+        n_rows, n_blobs, original, stored = getStats()
+
+        print(f'{n_rows} archived files, {n_blobs} unique')
+        print(f'{original / 1e6:.1f} MB as plain copies, {stored / 1e6:.1f} MB in the store')
+
+    else:
+        print(usage)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# Run one workflow step, or the whole workflow, in many project folders
+# without anyone at the keyboard, e.g. to process a queue of projects
+# overnight.
+#
+# Each project is run with SIP_BATCH=1, so every question is answered from
+# the project's sip_params.json (see sip_params.py) or left at its default.
+# Projects are run by a pool of N workers.  A step's output is written to
+# <project>/.workflow_status/<step>.log and a project counts as done only when
+# the step wrote a new success marker.
+#
+# USAGE:   python batch_runner.py <step> <project folder> [<project folder> ...] [--workers N] [--arg VALUE ...]
+#          python batch_runner.py all <project folder> [...] [--arg STEP=VALUE ...]     (workflow_runner.py in each project)
+#
+#          python batch_runner.py calcSequinAddition /data/sip/project_* --workers 4
+
+
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import workflow_runner
+
+
+##########################
+##########################
+def runWorkflowInProject(project_dir, args):
+
+    # whole workflow, workflow_runner.py decides which steps are out of date
+    log_path = workflow_runner.getStatusDir(project_dir) / 'workflow_runner.log'
+
+    cmd = [sys.executable, str(workflow_runner.SCRIPT_DIR / 'workflow_runner.py'),
+           '--project', str(project_dir)]
+
+    # STEP=VALUE arguments are passed on to workflow_runner.py
+    for a in args:
+        cmd += ['--arg', a]
+
+    with open(log_path, 'w') as log:
+        result = subprocess.run(cmd, cwd=project_dir, stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT)
+
+    return result.returncode == 0
+##########################
+##########################
+
+
+##########################
+##########################
+def runProject(project_dir, step, args, terminal_lock):
+
+    workflow_runner.getStatusDir(project_dir).mkdir(exist_ok=True)
+
+    start = time.perf_counter()
+
+    if step == 'all':
+        ok = runWorkflowInProject(project_dir, args)
+
+    else:
+        if not args:
+            args = workflow_runner.getStepArgs(project_dir, step, {})
+
+        ok = workflow_runner.runStep(project_dir, step, args, terminal_lock)
+
+    return ok, time.perf_counter() - start
+##########################
+##########################
+
+
+##########################
+##########################
+def runBatch(step, project_dirs, args=(), workers=4):
+
+    # every step runs without a terminal, including in child processes
+    os.environ['SIP_BATCH'] = '1'
+
+    terminal_lock = threading.Lock()
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = {executor.submit(runProject, p, step, list(args), terminal_lock): p
+                   for p in project_dirs}
+
+        for fut, p in futures.items():
+            try:
+                results[p] = fut.result()
+            except Exception as e:
+                print(f'{p}: {e}')
+                results[p] = (False, 0.0)
+
+            ok, seconds = results[p]
+
+            print(f"{'done' if ok else 'FAILED':>6}  {seconds:8.1f} s  {p}")
+
+    return results
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('step', help="workflow step, e.g. calcSequinAddition, or 'all'")
+    parser.add_argument('projects', nargs='+', type=Path)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--arg', action='append', default=[],
+                        help="argument passed to the step, relative to each project folder.  STEP=VALUE with 'all'")
+    args = parser.parse_args()
+
+    step = args.step.removesuffix('.py')
+
+    if (step != 'all') and (step not in workflow_runner.STEPS):
+        print(f'\n\nUnknown step {step}.  Aborting\n\n')
+        sys.exit()
+
+    for p in args.projects:
+        if not p.is_dir():
+            print(f'\n\nCould not find project folder {p}.  Aborting\n\n')
+            sys.exit()
+
+    results = runBatch(step, [p.resolve() for p in args.projects], args.arg, args.workers)
+
+    n_failed = sum(not ok for ok, _ in results.values())
+
+    print(f'\n{len(results) - n_failed} of {len(results)} projects finished {step}')
+
+    sys.exit(1 if n_failed else 0)
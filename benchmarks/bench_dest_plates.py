@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# Cost of assigning destination plates and wells to the libraries.
+#
+# Compares plate_geometry.allocateWells() with the addDestplate() loop of
+# make.library.creation.files.96.py and the rework scripts, which filled
+# 92 well plates with .loc slices.  Both must give the same plate and well
+# for every library count up to --check.  The loop failed when the libraries
+# filled more than one plate exactly, so those counts are only run through
+# allocateWells(), which fills the plates.
+#
+# USAGE:   python benchmarks/bench_dest_plates.py [--sizes 100 1000 5000] [--repeat 20] [--check 1000]
+
+import sys
+import math
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import plate_geometry
+
+
+well_list_96w_emptycorner = plate_geometry.getWellList(96, empty_corners=True)
+
+
+##########################
+##########################
+def addDestplateLoop(my_import_df, my_destbc, my_well_list):
+
+    # addDestplate() as it was in make.library.creation.files.96.py
+    num_libplates = math.ceil(my_import_df.shape[0]/92)
+
+    if num_libplates > 1:
+        for i in range(1, num_libplates):
+            if ((i == (num_libplates-1)) & (my_import_df.shape[0] % 92 < 24)):
+                start = (i*92)-92
+                stop = start + \
+                    divmod((92+(my_import_df.shape[0] % 92)),  2)[0] - 1
+            else:
+                start = (i*92)-92
+                stop = (i*92)-1
+
+            my_import_df.loc[start:stop,
+                             "Destination_ID"] = my_destbc + "-" + str(i)
+            my_import_df.loc[start:stop, "Destination_Well"] = np.array(
+                my_well_list[0:(stop-start+1)])
+
+        start = stop + 1
+        my_import_df.loc[start:my_import_df.shape[0],
+                         "Destination_ID"] = my_destbc + "-" + str(num_libplates)
+        my_import_df.loc[start:my_import_df.shape[0], "Destination_Well"] = np.array(
+            my_well_list[0:my_import_df.shape[0]-start])
+
+    elif num_libplates == 1:
+        my_import_df.loc[0:my_import_df.shape[0],
+                         "Destination_ID"] = my_destbc + "-" + str(num_libplates)
+        my_import_df.loc[0:my_import_df.shape[0], "Destination_Well"] = np.array(
+            my_well_list[0:my_import_df.shape[0]])
+
+    return my_import_df
+##########################
+##########################
+
+
+##########################
+##########################
+def addDestplateAllocate(my_import_df, my_destbc):
+
+    plate_num, wells = plate_geometry.allocateWells(my_import_df.shape[0], empty_corners=True)
+
+    my_import_df['Destination_ID'] = np.char.add(f'{my_destbc}-', plate_num.astype(str))
+    my_import_df['Destination_Well'] = wells
+
+    return my_import_df
+##########################
+##########################
+
+
+##########################
+##########################
+def makeLibs(n_libs):
+
+    return pd.DataFrame({'Sample Barcode': np.repeat(np.arange(n_libs // 24 + 1), 24)[:n_libs].astype(str),
+                         'Fraction #': np.tile(np.arange(1, 25), n_libs // 24 + 1)[:n_libs]})
+##########################
+##########################
+
+
+##########################
+##########################
+def loopFails(n_libs):
+
+    # the loop gave the last plate no room when the libraries filled the plates exactly
+    return (n_libs > 92) and (n_libs % 92 == 0)
+##########################
+##########################
+
+
+##########################
+##########################
+def timeAssign(assign, n_libs, repeat):
+
+    times = []
+
+    for _ in range(repeat):
+        libs_df = makeLibs(n_libs)
+
+        start = time.perf_counter()
+        result = assign(libs_df)
+        times.append(time.perf_counter() - start)
+
+    return times, result
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--check', type=int, default=1000)
+    args = parser.parse_args()
+
+    same = True
+
+    for n in range(1, args.check + 1):
+        new_df = addDestplateAllocate(makeLibs(n), 'BENCH1')
+
+        # every plate must be filled from its first well, with no well used twice
+        filled = new_df.groupby('Destination_ID', sort=False)['Destination_Well'].agg(list)
+        same = same and all(w == well_list_96w_emptycorner[:len(w)] for w in filled)
+
+        if not loopFails(n):
+            old_df = addDestplateLoop(makeLibs(n), 'BENCH1', well_list_96w_emptycorner)
+            same = same and old_df.equals(new_df)
+
+    print(f'checked 1 to {args.check} libraries, same result: {same}\n')
+
+    print(f"{'libraries':>10} {'loop ms':>10} {'allocate ms':>12}")
+
+    for n in args.sizes:
+        n_old = n + 1 if loopFails(n) else n
+
+        old_times, _ = timeAssign(lambda df: addDestplateLoop(df, 'BENCH1', well_list_96w_emptycorner), n_old, args.repeat)
+        new_times, _ = timeAssign(lambda df: addDestplateAllocate(df, 'BENCH1'), n, args.repeat)
+
+        print(f'{n:>10} {1000 * np.median(old_times):>10.2f} {1000 * np.median(new_times):>12.2f}')
+
+    sys.exit(0 if same else 1)
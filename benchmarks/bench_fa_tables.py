@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+# Cost of reading the smear analysis files of a Fragment Analyzer batch.
+#
+# Compares fa_results.readSmearFiles() with the processFAfiles() loop the FA
+# scripts used before, which filtered and split each plate's file on its own
+# and concatenated the plates afterwards, on a batch of 20 plates made in the
+# format make_sip_project.py writes.  Plate and sample are categorical in the
+# new frame, so they're compared as strings.  Both must give the same frame
+# and the same list of destination plates.
+#
+# USAGE:   python benchmarks/bench_fa_tables.py [--plates 20] [--repeat 20]
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fa_results
+import make_sip_project
+
+
+##########################
+##########################
+def processFAfilesLoop(my_fa_files, prefix=''):
+
+    # processFAfiles() as it was in first.FA.output.analysis.py and the
+    # second and third attempt scripts
+    fa_dict = {}
+
+    fa_dest_plates = []
+
+    for f, fa_path in my_fa_files.items():
+        fa_dict[f] = pd.read_csv(fa_path, usecols=['Well', 'Sample ID', 'ng/uL', 'nmole/L', 'Avg. Size'])
+
+        fa_dict[f] = fa_dict[f].rename(columns={"Sample ID": "FA_Sample_ID", "Well": "FA_Well"})
+
+        fa_dict[f]['FA_Well'] = fa_dict[f]['FA_Well'].str.replace(':', '')
+
+        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains('empty', case=False) == False]
+
+        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains('ladder', case=False) == False]
+
+        fa_dict[f] = fa_dict[f][fa_dict[f]["FA_Sample_ID"].str.contains('LibStd', case=False) == False]
+
+        fa_dict[f][['FA_Destination_plate', 'FA_Sample', 'FA_Fraction']
+                   ] = fa_dict[f].FA_Sample_ID.str.split("_", expand=True)
+
+        for c in ['ng/uL', 'nmole/L', 'Avg. Size']:
+            fa_dict[f][c] = fa_dict[f][c].fillna(0)
+
+        fa_dict[f]['FA_Fraction'] = fa_dict[f]['FA_Fraction'].astype(int)
+
+        fa_dict[f]['FA_Sample'] = fa_dict[f]['FA_Sample'].astype(str)
+
+        for c in ['ng/uL', 'nmole/L', 'Avg. Size']:
+            fa_dict[f][c] = fa_dict[f][c].astype(float)
+
+        fa_dest_plates = fa_dest_plates + fa_dict[f]['FA_Destination_plate'].unique().tolist()
+
+    fa_df = pd.concat(fa_dict.values(), ignore_index=True)
+
+    return fa_df.rename(columns={c: f'{prefix}{c}' for c in fa_df.columns}), fa_dest_plates
+##########################
+##########################
+
+
+##########################
+##########################
+def makeSmearFiles(out_dir, n_plates, rng):
+
+    # one smear analysis file per plate: ladder in H12, LibStd in the corners,
+    # a few empty wells, and libraries <plate>_<sample>_<fraction> elsewhere
+    fa_files = {}
+
+    wells = make_sip_project.WELLS_96
+
+    for p in range(n_plates):
+        plate = f'BENCH{p:02d}-1'
+
+        names = [f'{plate}_{3400000 + i // 24}_{i % 24 + 1}' for i in range(len(wells))]
+
+        for i, w in enumerate(wells):
+            if w in ('A1', 'A12', 'H1'):
+                names[i] = f'LibStd_{w}'
+            elif w == 'H12':
+                names[i] = 'ladder'
+            elif rng.random() < 0.05:
+                names[i] = 'Empty_well'
+
+        n = len(wells)
+
+        is_lib = ~pd.Series(names).str.contains('empty|ladder|LibStd', case=False).to_numpy()
+
+        nmol = rng.lognormal(1.7, 0.4, n)
+        size = rng.uniform(300, 900, n)
+
+        smear_df = pd.DataFrame({'Well': [f'{w[0]}:{w[1:]}' if i % 2 else w for i, w in enumerate(wells)],
+                                 'Sample ID': names,
+                                 'Range': '100 bp to 6000 bp',
+                                 'ng/uL': np.where(is_lib, (nmol * size * 660 / 1e6).round(4), np.nan),
+                                 '%Total': np.where(is_lib, 100.0, np.nan),
+                                 'nmole/L': np.where(is_lib, nmol.round(4), np.nan),
+                                 'Avg. Size': np.where(is_lib, size.round(0), np.nan),
+                                 '%CV': np.where(is_lib, 40.0, np.nan)})
+
+        path = Path(out_dir) / f'2024-06-01 10-00-00 {plate}F Smear Analysis Result.csv'
+
+        smear_df.to_csv(path, index=False)
+
+        fa_files[f'{plate}F.csv'] = str(path)
+
+    return fa_files
+##########################
+##########################
+
+
+##########################
+##########################
+def timeReader(reader, fa_files, repeat):
+
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = reader(fa_files, prefix='Redo_')
+        times.append(time.perf_counter() - start)
+
+    return times, result
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plates', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fa_files = makeSmearFiles(tmp_dir, args.plates, rng)
+
+        old_times, (old_df, old_plates) = timeReader(processFAfilesLoop, fa_files, args.repeat)
+        new_times, (new_df, new_plates) = timeReader(fa_results.readSmearFiles, fa_files, args.repeat)
+
+    new_df = new_df.astype({c: object for c in new_df.columns if isinstance(new_df[c].dtype, pd.CategoricalDtype)})
+
+    same = old_df.equals(new_df) and (old_plates == new_plates)
+
+    print(f'per plate loop:    best {1000 * min(old_times):.1f} ms   median {1000 * np.median(old_times):.1f} ms for {args.plates} plates')
+    print(f'readSmearFiles:    best {1000 * min(new_times):.1f} ms   median {1000 * np.median(new_times):.1f} ms for {args.plates} plates')
+    print(f'{np.median(old_times) / np.median(new_times):.1f}x faster, same result: {same}')
+
+    sys.exit(0 if same else 1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# Compare the two formula recalculation engines in excel_recalc.py.
+#
+# Recalculates copies of a workbook (default BLANK_POOLING_TOOL.xlsx) with the
+# pure python engine, and with excel through xlwings when it's installed, and
+# reports the time taken by each.  The python engine's values are checked
+# against the cached values excel saved in the original workbook.
+#
+# USAGE:   python benchmarks/bench_recalc.py [workbook.xlsx] [--repeat N]
+
+import sys
+import shutil
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import excel_recalc
+
+
+##########################
+##########################
+def timeEngine(src, engine, repeat):
+
+    times = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(repeat):
+            dest = Path(tmp_dir) / f'run{i}_{src.name}'
+            shutil.copyfile(src, dest)
+
+            start = time.perf_counter()
+            excel_recalc.recalcWorkbook(dest, engine)
+            times.append(time.perf_counter() - start)
+
+        # values of the last run, for comparing with excel
+        values = excel_recalc.readCachedValues(dest)
+
+    return times, values
+##########################
+##########################
+
+
+##########################
+##########################
+def sameValue(a, b):
+
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= 1e-9 * max(1.0, abs(a), abs(b))
+
+    return a == b
+##########################
+##########################
+
+
+##########################
+##########################
+def compareValues(expected, found):
+
+    mismatch = [(k, expected[k], found.get(k))
+                for k in expected if not sameValue(expected[k], found.get(k))]
+
+    print(f'{len(expected)} formula cells compared, {len(mismatch)} differ')
+
+    for (sheet, cell), e, f in mismatch[:20]:
+        print(f'    {sheet}!{cell}: excel {e!r}  python {f!r}')
+
+    return len(mismatch)
+##########################
+##########################
+
+
+##########################
+##########################
+def report(engine, times):
+
+    print(f'{engine:>8}: best {min(times):.3f} s   mean {sum(times) / len(times):.3f} s   ({len(times)} runs)')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    default_book = Path(__file__).resolve().parent.parent / \
+        'BLANK_POOLING_TOOL.xlsx'
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('workbook', nargs='?', default=default_book, type=Path)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # values saved by excel, before either engine touches a copy
+    excel_values = excel_recalc.readCachedValues(args.workbook)
+
+    py_times, py_values = timeEngine(args.workbook, 'python', args.repeat)
+    report('python', py_times)
+
+    try:
+        import xlwings
+    except ImportError:
+        xlwings = None
+
+    if xlwings is None:
+        print(' xlwings: not installed, skipped')
+    else:
+        xw_times, xw_values = timeEngine(
+            args.workbook, 'xlwings', args.repeat)
+        report('xlwings', xw_times)
+        print(f'python engine is {min(xw_times) / min(py_times):.1f}x faster')
+
+        # excel may store results differently after its own recalculation
+        excel_values = xw_values
+
+    n_diff = compareValues(excel_values, py_values)
+
+    sys.exit(1 if n_diff > 0 else 0)
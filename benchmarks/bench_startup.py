@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+# Startup time of the workflow scripts.
+#
+# Runs each step's script with python -X importtime in an empty folder, where
+# it stops at its first missing-file check, the same delay as when the GUI
+# starts a step without its input files.  Reports the wall time, the total
+# import time and the slowest top level imports of each script.  The best of
+# --repeat runs is kept.
+#
+# Results can be saved as the baseline with --save-baseline.  Later runs
+# report scripts whose import time grew by more than --threshold, and exit
+# with 1.
+#
+# USAGE:   python benchmarks/bench_startup.py [script ...] [--repeat 3] [--top 3]
+#                                             [--baseline FILE] [--save-baseline] [--threshold 0.25]
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import workflow_runner
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'startup_baseline.json'
+
+# import time changes smaller than this are noise
+MIN_SECONDS = 0.05
+
+
+##########################
+##########################
+def parseImportTime(stderr):
+
+    # lines look like "import time:   self [us] | cumulative | imported package",
+    # nested imports are indented by 2 spaces per level
+    top = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        parts = line.split('|')
+
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+
+        name = parts[2][1:]
+
+        if not name.startswith(' '):
+            top[name.strip()] = top.get(name.strip(), 0) + int(parts[1]) / 1e6
+
+    return top
+##########################
+##########################
+
+
+##########################
+##########################
+def timeScript(step):
+
+    script = workflow_runner.SCRIPT_DIR / f'{step}.py'
+
+    env = dict(os.environ, SIP_BATCH='1')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+
+        result = subprocess.run([sys.executable, '-X', 'importtime', str(script)], cwd=tmp_dir, env=env,
+                                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True)
+
+        seconds = time.perf_counter() - start
+
+    top = parseImportTime(result.stderr)
+
+    return {'seconds': seconds, 'import_seconds': sum(top.values()), 'imports': top}
+##########################
+##########################
+
+
+##########################
+##########################
+def timeScripts(steps, repeat):
+
+    results = {}
+
+    for step in steps:
+        runs = [timeScript(step) for _ in range(repeat)]
+
+        results[step] = min(runs, key=lambda r: r['import_seconds'])
+
+    return results
+##########################
+##########################
+
+
+##########################
+##########################
+def report(results, top):
+
+    print(f"{'script':<40} {'wall s':>7} {'import s':>9}   slowest imports")
+
+    for step, r in results.items():
+        slowest = sorted(r['imports'].items(), key=lambda x: -x[1])[:top]
+
+        slowest = ', '.join(f'{name} {t:.2f}' for name, t in slowest)
+
+        print(f"{step:<40} {r['seconds']:7.2f} {r['import_seconds']:9.2f}   {slowest}")
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def findRegressions(results, baseline, threshold):
+
+    regressions = []
+
+    for step, r in results.items():
+        if step not in baseline:
+            continue
+
+        old = baseline[step]
+        new = r['import_seconds']
+
+        if (new - old > MIN_SECONDS) and (new > old * (1 + threshold)):
+            regressions.append((step, old, new))
+
+    return regressions
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('scripts', nargs='*', help='workflow steps, default all')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=3, help='slowest imports shown per script')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction slower than the baseline reported as a regression')
+    args = parser.parse_args()
+
+    steps = [s.removesuffix('.py') for s in args.scripts] or list(workflow_runner.STEPS)
+
+    for s in steps:
+        if s not in workflow_runner.STEPS:
+            print(f'\n\nUnknown step {s}.  Aborting\n\n')
+            sys.exit()
+
+    results = timeScripts(steps, max(args.repeat, 1))
+
+    report(results, args.top)
+
+    baseline = {}
+
+    if args.baseline.exists():
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = findRegressions(results, baseline, args.threshold)
+
+    for step, old, new in regressions:
+        print(f'REGRESSION  {step}: import {old:.2f} s -> {new:.2f} s')
+
+    if args.save_baseline:
+        baseline.update({step: r['import_seconds'] for step, r in results.items()})
+
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1)
+
+        print(f'\nSaved baseline to {args.baseline}')
+
+    sys.exit(1 if regressions else 0)
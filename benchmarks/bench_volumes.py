@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+# Per-plate cost of loading a VolumeCheck .CSV.
+#
+# Compares fraction_plate_io.readPlateVolumes() with the getVolumes() the
+# scripts used before, which re-formatted the tube positions with iterrows(),
+# on a 96 tube rack made by make_sip_project.py.  The input cache is turned
+# off so both parse the file every time.  Both must give the same frame.
+#
+# USAGE:   python benchmarks/bench_volumes.py [--repeat 200]
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fraction_plate_io
+import make_sip_project
+
+
+##########################
+##########################
+def getVolumesIterrows(vol_path, plate_id):
+
+    # getVolumes() as it was in calcSequinAddition.py and the other scripts
+    my_volume_df = fraction_plate_io.readVolumeFile(vol_path)
+
+    my_volume_df['VOLAVG'] = np.where(
+        ((my_volume_df['TUBE'] == 'A01') & (my_volume_df['VOLAVG'].isnull())), 0, my_volume_df['VOLAVG'])
+
+    if my_volume_df['VOLAVG'].isnull().values.any():
+        sys.exit()
+
+    my_volume_df['VOLAVG'] = my_volume_df['VOLAVG'].astype(int)
+
+    new_pos_list = []
+    for index, row in my_volume_df.iterrows():
+        well = row['TUBE']
+        if well[1] == '0':
+            well = well.replace('0', '')
+
+        new_pos_list.append(well)
+
+    my_volume_df["TUBE"] = new_pos_list
+
+    return my_volume_df
+##########################
+##########################
+
+
+##########################
+##########################
+def timeLoader(loader, vol_path, plate_id, repeat):
+
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = loader(vol_path, plate_id)
+        times.append(time.perf_counter() - start)
+
+    return times, df
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ['SIP_INPUT_CACHE'] = '0'
+
+    plate_id = 'SIP0001'
+
+    rng = np.random.default_rng(1)
+
+    volumes = {w: int(v) for w, v in zip(make_sip_project.WELLS_96, rng.integers(38, 50, 96))}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vol_path = Path(tmp_dir) / f'{plate_id}.CSV'
+
+        make_sip_project.writeVolumeFile(vol_path, plate_id, volumes)
+
+        old_times, old_df = timeLoader(getVolumesIterrows, vol_path, plate_id, args.repeat)
+        new_times, new_df = timeLoader(fraction_plate_io.readPlateVolumes, vol_path, plate_id, args.repeat)
+
+    same = old_df.reset_index(drop=True).equals(new_df.reset_index(drop=True))
+
+    print(f'iterrows getVolumes:  best {1000 * min(old_times):.2f} ms   median {1000 * np.median(old_times):.2f} ms per plate')
+    print(f'readPlateVolumes:     best {1000 * min(new_times):.2f} ms   median {1000 * np.median(new_times):.2f} ms per plate')
+    print(f'{np.median(old_times) / np.median(new_times):.1f}x faster, same result: {same}')
+
+    sys.exit(0 if same else 1)
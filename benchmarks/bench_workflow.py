@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+
+# Run the whole SIP workflow, setup.isotope.and.FA.plates.py through
+# finish.pooling.libs.py, on synthetic projects made by make_sip_project.py
+# and report the wall time, peak memory and file i/o of every step.
+#
+# Every question is answered from the project's sip_params.json (SIP_BATCH=1)
+# and the lab work between steps, FA runs, Clarity sheets and so on, is made
+# up by make_sip_project.LAB_STEPS.  Excel files are recalculated with the
+# python engine when xlwings isn't installed.  Each step is run in its own
+# python process, the same as from the GUI, and counts as done only when it
+# writes its success marker.
+#
+# Projects hold at most 90 samples, so larger runs are split over several
+# projects and a step's time and i/o are the totals over all projects and its
+# memory is the largest of any project.
+#
+# Results can be saved as the baseline for their scale (samples x fractions)
+# with --save-baseline.  Later runs at the same scale report steps that are
+# more than --threshold slower or larger than the baseline, and exit with 1.
+#
+# USAGE:   python benchmarks/bench_workflow.py [--samples 20] [--fractions 24] [--seed 1]
+#                                              [--baseline FILE] [--save-baseline] [--threshold 0.25]
+#                                              [--work-dir DIR] [--until STEP]
+
+
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import workflow_runner
+import make_sip_project
+
+# xlwings is only used when excel is installed
+try:
+    import xlwings
+except ImportError:
+    xlwings = None
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'workflow_baseline.json'
+
+# the main chain of the workflow, the optional reworks and plots are left out
+BENCH_STEPS = [s for s, info in workflow_runner.STEPS.items() if not info.get('optional')]
+
+# changes smaller than these are noise
+MIN_SECONDS = 0.5
+MIN_RSS_MB = 20
+
+COMPARED = [('seconds', MIN_SECONDS), ('peak_rss_mb', MIN_RSS_MB)]
+
+
+##########################
+##########################
+def probe(out_path, script, args):
+
+    # runs in the child process: counts the files the script opens and
+    # writes them, with its i/o totals, to out_path when the script exits
+    counts = {'files_read': set(), 'files_written': set(), 'opens': 0}
+
+    def auditOpen(event, event_args):
+        if event != 'open':
+            return
+
+        path, mode, flags = event_args
+
+        if not isinstance(path, (str, bytes, os.PathLike)):
+            return
+
+        counts['opens'] += 1
+
+        if mode is not None:
+            writing = any(m in mode for m in 'wax+')
+        else:
+            writing = bool(flags & (os.O_WRONLY | os.O_RDWR))
+
+        counts['files_written' if writing else 'files_read'].add(os.fsdecode(path))
+
+    def dumpCounts():
+        io = {}
+
+        if os.path.exists('/proc/self/io'):
+            with open('/proc/self/io') as f:
+                for line in f:
+                    k, v = line.split(':')
+                    io[k] = int(v)
+
+        result = {'opens': counts['opens'],
+                  'files_read': len(counts['files_read']),
+                  'files_written': len(counts['files_written']),
+                  'read_mb': io.get('rchar', 0) / 1e6,
+                  'write_mb': io.get('wchar', 0) / 1e6,
+                  'read_calls': io.get('syscr', 0),
+                  'write_calls': io.get('syscw', 0)}
+
+        with open(out_path, 'w') as f:
+            json.dump(result, f)
+
+    atexit.register(dumpCounts)
+
+    sys.addaudithook(auditOpen)
+
+    # the script sees the same argv and import path as when run directly
+    sys.argv = [script] + list(args)
+    sys.path[0] = str(Path(script).parent)
+
+    import runpy
+    runpy.run_path(script, run_name='__main__')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def runStep(project_dir, step, args):
+
+    info = workflow_runner.STEPS[step]
+
+    script = workflow_runner.SCRIPT_DIR / f'{step}.py'
+
+    cwd = Path(project_dir) / info.get('cwd', '.')
+
+    status_dir = workflow_runner.getStatusDir(project_dir)
+    status_dir.mkdir(exist_ok=True)
+
+    probe_path = status_dir / f'{step}.bench.json'
+    log_path = status_dir / f'{step}.log'
+
+    before = workflow_runner.getMarkerTime(project_dir, step)
+
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--probe', str(probe_path), str(script)] + list(args)
+
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+
+        proc = subprocess.Popen(cmd, cwd=cwd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+
+        # wait4 gives the child's own peak memory, in KB on linux
+        _, status, usage = os.wait4(proc.pid, 0)
+
+        seconds = time.perf_counter() - start
+
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    after = workflow_runner.getMarkerTime(project_dir, step)
+
+    result = {'seconds': seconds, 'peak_rss_mb': usage.ru_maxrss / 1024,
+              'ok': (proc.returncode == 0) and (after is not None) and (after != before)}
+
+    if probe_path.exists():
+        with open(probe_path) as f:
+            result.update(json.load(f))
+
+    return result
+##########################
+##########################
+
+
+##########################
+##########################
+def runProject(project_dir, until=None):
+
+    # runs the steps in order until one fails.  Returns {step: result}
+    tube_file = make_sip_project.getProjectInfo(project_dir)['tube_file']
+
+    results = {}
+
+    for step in BENCH_STEPS:
+        make_sip_project.doLabWork(project_dir, step)
+
+        args = [tube_file] if workflow_runner.STEPS[step].get('needs_arg') else []
+
+        results[step] = runStep(project_dir, step, args)
+
+        if not results[step]['ok']:
+            print(f'\n{step} failed in {project_dir}, see {workflow_runner.getStatusDir(project_dir) / step}.log')
+            break
+
+        if step == until:
+            break
+
+    return results
+##########################
+##########################
+
+
+##########################
+##########################
+def addResults(total, results):
+
+    # times and i/o add up over projects, memory is the largest
+    for step, r in results.items():
+        if step not in total:
+            total[step] = dict(r)
+            continue
+
+        for k, v in r.items():
+            if k == 'ok':
+                total[step]['ok'] = total[step]['ok'] and v
+            elif k == 'peak_rss_mb':
+                total[step][k] = max(total[step][k], v)
+            else:
+                total[step][k] = total[step].get(k, 0) + v
+
+    return total
+##########################
+##########################
+
+
+##########################
+##########################
+def report(total):
+
+    print(f"\n{'step':<36} {'s':>8} {'RSS MB':>8} {'read':>6} {'written':>8} {'read MB':>8} {'write MB':>9}")
+
+    for step, r in total.items():
+        print(f"{step:<36} {r['seconds']:8.2f} {r['peak_rss_mb']:8.0f} {r.get('files_read', 0):6d} "
+              f"{r.get('files_written', 0):8d} {r.get('read_mb', 0):8.1f} {r.get('write_mb', 0):9.1f}"
+              f"{'' if r['ok'] else '   FAILED'}")
+
+    print(f"{'total':<36} {sum(r['seconds'] for r in total.values()):8.2f}")
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def findRegressions(total, baseline, threshold):
+
+    regressions = []
+
+    for step, r in total.items():
+        base = baseline.get(step)
+
+        if base is None:
+            continue
+
+        for k, min_change in COMPARED:
+            if (r[k] - base[k] > min_change) and (r[k] > base[k] * (1 + threshold)):
+                regressions.append((step, k, base[k], r[k]))
+
+    return regressions
+##########################
+##########################
+
+
+##########################
+##########################
+def readBaselines(path):
+
+    if not path.exists():
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+##########################
+##########################
+
+
+##########################
+##########################
+def saveBaseline(path, scale, total):
+
+    baselines = readBaselines(path)
+
+    baselines[scale] = {step: {k: r[k] for k, _ in COMPARED} for step, r in total.items()}
+
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=1)
+
+    print(f'\nSaved baseline {scale} to {path}')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    # child process running one workflow script
+    if (len(sys.argv) > 3) and (sys.argv[1] == '--probe'):
+        probe(sys.argv[2], sys.argv[3], sys.argv[4:])
+        sys.exit()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--fractions', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction slower or larger than the baseline reported as a regression')
+    parser.add_argument('--work-dir', type=Path, help='folder for the projects, kept after the run')
+    parser.add_argument('--until', choices=BENCH_STEPS, help='last step to run')
+    args = parser.parse_args()
+
+    os.environ['SIP_BATCH'] = '1'
+
+    if xlwings is None:
+        os.environ.setdefault('SIP_RECALC_ENGINE', 'python')
+
+    if args.work_dir is not None:
+        if args.work_dir.exists() and any(args.work_dir.iterdir()):
+            print(f'\n\n{args.work_dir} is not empty.  Aborting\n\n')
+            sys.exit()
+        work_dir = args.work_dir
+    else:
+        work_dir = Path(tempfile.mkdtemp(prefix='sip_bench_'))
+
+    scale = f'{args.samples}x{args.fractions}'
+
+    projects = make_sip_project.makeProjects(work_dir, args.samples, args.fractions, args.seed)
+
+    print(f'{scale}: {len(projects)} project(s) in {work_dir}')
+
+    total = {}
+
+    for p in projects:
+        addResults(total, runProject(p, args.until))
+
+    report(total)
+
+    all_ok = all(r['ok'] for r in total.values())
+
+    if args.work_dir is None and all_ok:
+        shutil.rmtree(work_dir)
+
+    baseline = readBaselines(args.baseline).get(scale)
+
+    regressions = findRegressions(total, baseline, args.threshold) if baseline else []
+
+    if baseline is None:
+        print(f'\nNo {scale} baseline in {args.baseline}')
+
+    for step, k, old, new in regressions:
+        print(f'REGRESSION  {step}: {k} {old:.2f} -> {new:.2f}')
+
+    if args.save_baseline and all_ok:
+        saveBaseline(args.baseline, scale, total)
+
+    sys.exit(1 if (regressions or not all_ok) else 0)
@@ -0,0 +1,857 @@
+#!/usr/bin/env python3
+
+# Make synthetic SIP project folders for benchmarking and testing the
+# workflow scripts.
+#
+# A project is given the four files setup.isotope.and.FA.plates.py expects
+# (aliquot .xls, SampleScanMini .csv, sip_metadata .csv, metabolomics .xls),
+# the ultracentrifuge tube list, a density .xlsx, volume .CSV and pre/post
+# Quant-iT .txt file for every SIP fraction plate (2 samples x N fractions per
+# plate), and a sip_params.json with the answers the scripts would ask for.
+#
+# Files the lab produces after a script has run, i.e. the Fragment Analyzer
+# "Smear Analysis Result.csv" folders and filled in thresholds.txt, the
+# reviewed updated_*fa_analysis_summary.txt and the Clarity library creation
+# and pool .xls/.xlsx sheets, are made from that script's output by the
+# make*() functions in LAB_STEPS.  bench_workflow.py
+# calls these between steps.
+#
+# setup.isotope.and.FA.plates.py fills one 96 well isotope plate, 6 wells of
+# which hold E. coli controls, so one project holds at most 90 samples.
+# Larger sample counts are split over several project folders.
+#
+# USAGE:   python benchmarks/make_sip_project.py <output folder> [--samples N] [--fractions 24] [--seed 1]
+
+
+import sys
+import csv
+import json
+import math
+import shutil
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import openpyxl
+import xlwt
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+
+# 96 - 6 E. coli control wells in the isotope plate
+MAX_SAMPLES_PER_PROJECT = 90
+
+WELLS_96 = [f'{r}{c}' for c in range(1, 13) for r in 'ABCDEFGH']
+
+# first well of each sample on a SIP fraction plate
+SAMPLE_START_WELL = [0, 48]
+
+# Quant-iT standard curve wells
+STANDARD_WELLS = [f'{r}11' for r in 'ABCDEFGH']
+
+LABELS = ['C13', 'O18', 'N15']
+
+MERGE_DIR = '3_merge_density_vol_conc_files'
+ULTRA_DIR = '2_load_ultracentrifuge'
+LIB_DIR = '4_make_library_analyze_fa'
+POOL_DIR = '5_pooling'
+
+# answers that differ from the defaults in sip_params.example.json
+PARAM_ANSWERS = {
+    'ultracentrifuge.transfer': {
+        'continue_over_16_tubes': 'y',
+        'continue_odd_tubes': 'y'},
+    'make.clarity.summary': {
+        'replace_lib_info_with_final_summary': 'y'},
+}
+
+
+##########################
+##########################
+def makeSamples(n_samples, rng, first_id=3400000):
+
+    # replicate groups of 4, 2 labelled and 2 unlabelled samples
+    rows = []
+
+    for i in range(n_samples):
+        group = i // 4
+        label = LABELS[group % len(LABELS)] if (i % 4) < 2 else 'Unlabeled'
+
+        conc = round(float(rng.uniform(8, 40)), 1)
+
+        # enough DNA for the isotope plate plus 1000 ng for the ultracentrifuge
+        vol = round(float(max(rng.uniform(80, 200), 1800 / conc)), 1)
+
+        rows.append({'its_id': str(first_id + i),
+                     'barcode': f'FR{first_id + i:08d}',
+                     'tube_pos': WELLS_96[i],
+                     'conc': conc,
+                     'vol': vol,
+                     'mass': int(conc * vol),
+                     'group': f'Group_{group + 1:02d}',
+                     'label': label,
+                     'name': f'Site{group + 1:02d}_{label}_rep{(i % 2) + 1}'})
+
+    return pd.DataFrame(rows)
+##########################
+##########################
+
+
+##########################
+##########################
+def writeAliquotFile(path, samples, iso_plate):
+
+    # Clarity aliquot creation sheet, headers start on the 3rd row
+    book = xlwt.Workbook()
+    sheet = book.add_sheet('Sheet1')
+
+    sheet.write(0, 1, 'Aliquot Creation Meta QC')
+
+    cols = ['ITS Sample ID', 'Source Barcode', 'Fluorometer Concentration (ng/ul)', 'Available Volume (ul)',
+            'Available Mass (ng)', 'Destination Barcode', 'Library Queue']
+
+    for c, name in enumerate(cols):
+        sheet.write(2, c, name)
+
+    for r, s in enumerate(samples.itertuples(), start=3):
+        values = [s.its_id, s.barcode, s.conc, s.vol, s.mass, iso_plate, 'SIP']
+        for c, v in enumerate(values):
+            sheet.write(r, c, v)
+
+    book.save(str(path))
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeSampleScanFile(path, samples, rack):
+
+    by_pos = dict(zip(samples['tube_pos'], samples['barcode']))
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['RACK', 'POS', 'BARCODE', 'STATUS'])
+
+        for w in WELLS_96:
+            pos = f'{w[0]}{int(w[1:]):02d}'
+            bc = by_pos.get(w, '')
+            writer.writerow([rack, pos, bc, 'OK' if bc else 'NO TUBE'])
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeSipMetadataFile(path, samples, proposal_id):
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(['proposal_id', 'proposal_pi', 'source_final_deliv_project_name',
+                         'source_sample_id', 'sample_group_name', 'isotope_label'])
+
+        for s in samples.itertuples():
+            writer.writerow([proposal_id, 'Tester, Pat', s.name,
+                             s.its_id, s.group, s.label])
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeMetabolomicsFile(path, samples, iso_plate):
+
+    book = xlwt.Workbook()
+    sheet = book.add_sheet('Sheet1')
+
+    cols = ['PMOS Sample ID', 'Plate Barcode', 'Well', 'Name passed for fraction FD name creation',
+            'Group', 'Label', 'Isotope Enrichment (at%)', 'Metabolomics Sample Id']
+
+    for c, name in enumerate(cols):
+        sheet.write(0, c, name)
+
+    for r, s in enumerate(samples.itertuples(), start=1):
+        values = [s.its_id, iso_plate, '', s.name, s.group, s.label,
+                  '' if s.label == 'Unlabeled' else 98, '']
+        for c, v in enumerate(values):
+            sheet.write(r, c, v)
+
+    book.save(str(path))
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeSetupFiles(project_dir, samples, proposal_id, iso_plate):
+
+    writeAliquotFile(project_dir / f'Aliquot_Creation_Meta_QC_{iso_plate}.xls', samples, iso_plate)
+    writeSampleScanFile(project_dir / f'TS{proposal_id}-1.csv', samples, f'TS{proposal_id}')
+    writeSipMetadataFile(project_dir / f'sip_metadata_{proposal_id}.csv', samples, proposal_id)
+    writeMetabolomicsFile(project_dir / f'Metabolomics_QC_{proposal_id}.xls', samples, iso_plate)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeTubeList(project_dir, samples):
+
+    # one ITS sample id per line, no header
+    tube_path = project_dir / ULTRA_DIR / 'ultracentrifuge_tubes.csv'
+
+    tube_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tube_path.write_text(''.join(f'{i}\n' for i in samples['its_id']))
+
+    return tube_path.relative_to(project_dir).as_posix()
+##########################
+##########################
+
+
+##########################
+##########################
+def makeFractionProfile(label, n_fractions, rng):
+
+    # density falls from the bottom (fraction 1) to the top of the tube.
+    # DNA peaks at a higher density in labelled samples
+    density = np.linspace(1.785, 1.655, n_fractions) + rng.normal(0, 0.002, n_fractions)
+
+    peak = 1.700 if label == 'Unlabeled' else 1.725
+
+    conc = 3.0 * np.exp(-((density - peak) / 0.015) ** 2) + rng.uniform(0.0, 0.05, n_fractions)
+
+    volume = rng.integers(38, 50, n_fractions)
+
+    return density.round(4), conc, volume
+##########################
+##########################
+
+
+##########################
+##########################
+def formatConc(value):
+
+    # values below the standard curve are exported as "<0.010"
+    if value < 0.01:
+        return '<0.010'
+
+    return f'{value:.3f}'
+##########################
+##########################
+
+
+##########################
+##########################
+def writeConcFile(path, plate_wells, conc_by_well):
+
+    # Quant-iT export: title line, blank lines, header line, one row per well
+    lines = ['##BLOCKS= 1', '',
+             'Sample\tWell ID\tWell\tRFU\t[Concentration]\tMean[Concentration]\tDilution']
+
+    for n, w in enumerate(STANDARD_WELLS, start=1):
+        std_conc = [10, 5, 2.5, 1, 0.5, 0.25, 0.1, 0][n - 1]
+        lines.append(f'STD{n}\tSTD{n:02d}\t{w}\t{std_conc * 900 + 40:.0f}\t{std_conc:.3f}\t{std_conc:.3f}\t1')
+
+    for n, w in enumerate(plate_wells, start=1):
+        c = conc_by_well[w]
+        lines.append(f'{n}\tSPL{n}\t{w}\t{c * 900 + 40:.0f}\t{formatConc(c)}\t{formatConc(c)}\t1')
+
+    lines += ['', '~End']
+
+    with open(path, 'w', newline='') as f:
+        f.write('\r\n'.join(lines) + '\r\n')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeVolumeFile(path, plate_id, volume_by_well):
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['RACKID', 'TUBE', 'VOLAVG', 'VOLMIN', 'VOLMAX', 'STATUS'])
+
+        for w in WELLS_96:
+            v = volume_by_well.get(w, 0)
+            writer.writerow([plate_id, f'{w[0]}{int(w[1:]):02d}', v, max(v - 1, 0), v + 1, 'OK'])
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeDensityFile(path, plate_id, rows):
+
+    # rows of (sample, well, fraction #, density), None for the empty row
+    # between the two samples of a plate
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = 'updated'
+
+    sheet.append(['Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density',
+                  'Spike-in Set', 'Spike-in Mass (pg)', 'Refractive Index'])
+
+    for row in rows:
+        if row is None:
+            sheet.append([])
+            continue
+
+        sample, well, fraction, density = row
+
+        sheet.append([plate_id, sample, well, fraction, density, 'Mix_A', None,
+                      round((density + 13.593) / 10.9276, 5)])
+
+    book.save(path)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeFractionPlates(project_dir, samples, n_fractions, rng, first_plate=1):
+
+    merge_dir = project_dir / MERGE_DIR
+    merge_dir.mkdir(parents=True, exist_ok=True)
+
+    plate_ids = []
+
+    # 2 samples per SIP fraction plate
+    for p in range(math.ceil(samples.shape[0] / 2)):
+        plate_id = f'SIP{first_plate + p:04d}'
+        plate_ids.append(plate_id)
+
+        dens_rows = []
+        pre_conc = {}
+        post_conc = {}
+        volumes = {}
+        plate_wells = []
+
+        for k, s in enumerate(samples.iloc[2 * p:2 * p + 2].itertuples()):
+            density, conc, volume = makeFractionProfile(s.label, n_fractions, rng)
+
+            if k == 1:
+                dens_rows.append(None)
+
+            for f in range(n_fractions):
+                w = WELLS_96[SAMPLE_START_WELL[k] + f]
+
+                dens_rows.append((s.its_id, w, f + 1, float(density[f])))
+
+                # DNA is partly lost in the PEG precipitation
+                pre_conc[w] = float(conc[f])
+                post_conc[w] = float(conc[f] * rng.uniform(0.6, 0.9))
+                volumes[w] = int(volume[f])
+                plate_wells.append(w)
+
+        writeDensityFile(merge_dir / f'{plate_id}.xlsx', plate_id, dens_rows)
+        writeVolumeFile(merge_dir / f'{plate_id}.CSV', plate_id, volumes)
+        writeConcFile(merge_dir / f'pre{plate_id}pre.txt', plate_wells, pre_conc)
+        writeConcFile(merge_dir / f'post{plate_id}post.txt', plate_wells, post_conc)
+
+    return plate_ids
+##########################
+##########################
+
+
+##########################
+##########################
+def writeParamFile(project_dir, n_fractions):
+
+    with open(SCRIPT_DIR / 'sip_params.example.json') as f:
+        params = json.load(f)
+
+    params['total_fractions'] = n_fractions
+
+    for script, answers in PARAM_ANSWERS.items():
+        params.setdefault(script, {}).update(answers)
+
+    with open(project_dir / 'sip_params.json', 'w') as f:
+        json.dump(params, f, indent=4)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def makeProject(project_dir, n_samples, n_fractions=24, seed=1, project_num=1):
+
+    if n_samples > MAX_SAMPLES_PER_PROJECT:
+        print(f'\n\nA project holds at most {MAX_SAMPLES_PER_PROJECT} samples.  Aborting\n\n')
+        sys.exit()
+
+    project_dir = Path(project_dir)
+    project_dir.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed * 1000 + project_num)
+
+    proposal_id = 508000 + project_num
+
+    iso_plate = f'27-{640000 + project_num}'
+
+    samples = makeSamples(n_samples, rng, first_id=3400000 + 1000 * project_num)
+
+    writeSetupFiles(project_dir, samples, proposal_id, iso_plate)
+
+    tube_file = writeTubeList(project_dir, samples)
+
+    writeFractionPlates(project_dir, samples, n_fractions, rng, first_plate=100 * project_num)
+
+    writeParamFile(project_dir, n_fractions)
+
+    # seed for the lab results made later, kept with the project
+    with open(project_dir / '.synthetic_project.json', 'w') as f:
+        json.dump({'samples': n_samples, 'fractions': n_fractions, 'seed': seed,
+                   'project_num': project_num, 'tube_file': tube_file}, f, indent=1)
+
+    return project_dir
+##########################
+##########################
+
+
+##########################
+##########################
+def makeProjects(out_dir, n_samples, n_fractions=24, seed=1):
+
+    # split samples over as few projects as possible, evenly
+    n_projects = math.ceil(n_samples / MAX_SAMPLES_PER_PROJECT)
+
+    sizes = [len(a) for a in np.array_split(range(n_samples), n_projects)]
+
+    out_dir = Path(out_dir)
+
+    if n_projects == 1:
+        return [makeProject(out_dir, n_samples, n_fractions, seed)]
+
+    return [makeProject(out_dir / f'project_{i + 1:02d}', size, n_fractions, seed, i + 1)
+            for i, size in enumerate(sizes)]
+##########################
+##########################
+
+
+##########################
+##########################
+def getProjectInfo(project_dir):
+
+    with open(Path(project_dir) / '.synthetic_project.json') as f:
+        return json.load(f)
+##########################
+##########################
+
+
+##########################
+##########################
+def getRng(project_dir, step):
+
+    # a separate, repeatable random stream for each lab step
+    info = getProjectInfo(project_dir)
+
+    return np.random.default_rng([info['seed'], info['project_num'], sum(step.encode())])
+##########################
+##########################
+
+
+##########################
+##########################
+def readUploadFile(path):
+
+    # FA upload files have no header: index, well, sample name
+    return pd.read_csv(path, header=None, names=['n', 'Well', 'name'], dtype=str)
+##########################
+##########################
+
+
+##########################
+##########################
+def makeFAresults(project_dir, upload_dir, result_dir, rng, fail_rate=0.12, threshold=2):
+
+    # Fragment Analyzer smear analysis for every plate in upload_dir, in the
+    # folder layout the instrument writes, plus the DNA conc threshold the lab
+    # adds to thresholds.txt
+    project_dir = Path(project_dir)
+    result_dir = project_dir / result_dir
+
+    run_dir = result_dir / 'FA_run_2024-06-01'
+
+    for upload in sorted((project_dir / upload_dir).glob('FA_upload_*.csv')):
+        plate = upload.stem.replace('FA_upload_', '')
+
+        fa_df = readUploadFile(upload)
+
+        n = fa_df.shape[0]
+
+        failed = rng.random(n) < fail_rate
+
+        nmol = np.where(failed, rng.uniform(0.1, 1.5, n), rng.lognormal(1.7, 0.4, n))
+        size = np.where(failed & (rng.random(n) < 0.5), rng.uniform(300, 500, n), rng.uniform(560, 900, n))
+
+        is_lib = ~fa_df['name'].str.contains('empty|ladder|LibStd', case=False)
+
+        smear_df = pd.DataFrame({'Well': fa_df['Well'],
+                                 'Sample ID': fa_df['name'],
+                                 'Range': '100 bp to 6000 bp',
+                                 'ng/uL': np.where(is_lib, (nmol * size * 660 / 1e6).round(4), np.nan),
+                                 '%Total': np.where(is_lib, 100.0, np.nan),
+                                 'nmole/L': np.where(is_lib, nmol.round(4), np.nan),
+                                 'Avg. Size': np.where(is_lib, size.round(0), np.nan),
+                                 '%CV': np.where(is_lib, 40.0, np.nan)})
+
+        plate_dir = run_dir / f'{plate}F 2024-06-01 10-00-00'
+        plate_dir.mkdir(parents=True, exist_ok=True)
+
+        smear_df.to_csv(plate_dir / f'2024-06-01 10-00-00 {plate}F Smear Analysis Result.csv', index=False)
+
+    thresh_path = result_dir / 'thresholds.txt'
+
+    if thresh_path.exists():
+        thresh_df = pd.read_csv(thresh_path, sep='\t', header=0)
+
+        thresh_df['DNA_conc_threshold_(nmol/L)'] = threshold
+
+        thresh_df.to_csv(thresh_path, sep='\t', index=False)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def makeThresholds(project_dir, result_dir, plates, dilution_factor=20, threshold=2):
+
+    # thresholds.txt for FA results made without running the script that
+    # normally writes it
+    thresh_df = pd.DataFrame({'Destination_plate': plates,
+                              'DNA_conc_threshold_(nmol/L)': threshold,
+                              'Size_theshold_(bp)': 530,
+                              'dilution_factor': dilution_factor})
+
+    thresh_df.to_csv(Path(project_dir) / result_dir / 'thresholds.txt', sep='\t', index=False)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def makeFirstFAresults(project_dir, rng):
+
+    makeFAresults(project_dir, f'{LIB_DIR}/A_first_attempt_make_lib/FA_upload_files',
+                  f'{LIB_DIR}/B_first_attempt_fa_result', rng)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def makeSecondFAresults(project_dir, rng):
+
+    makeFAresults(project_dir, f'{LIB_DIR}/C_second_attempt_make_lib/FA_upload_files',
+                  f'{LIB_DIR}/D_second_attempt_fa_result', rng, fail_rate=0.05)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def reviewFAsummary(project_dir, result_dir, reduced_name, updated_name):
+
+    # the lab reviews the FA summary and saves it as updated_*.txt,
+    # here accepted unchanged
+    result_dir = Path(project_dir) / result_dir
+
+    shutil.copyfile(result_dir / reduced_name, result_dir / updated_name)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def reviewFirstFA(project_dir, rng):
+
+    reviewFAsummary(project_dir, f'{LIB_DIR}/B_first_attempt_fa_result',
+                    'reduced_fa_analysis_summary.txt', 'updated_fa_analysis_summary.txt')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def reviewSecondFA(project_dir, rng):
+
+    reviewFAsummary(project_dir, f'{LIB_DIR}/D_second_attempt_fa_result',
+                    'reduced_2nd_fa_analysis_summary.txt', 'updated_2nd_fa_analysis_summary.txt')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def makeLibraryName(n):
+
+    # 5 letter Clarity library names, e.g. AAXBC
+    letters = ''
+
+    for _ in range(5):
+        n, r = divmod(n, 26)
+        letters = chr(65 + r) + letters
+
+    return letters
+##########################
+##########################
+
+
+##########################
+##########################
+def readSubmittedLibs(project_dir):
+
+    return pd.read_csv(Path(project_dir) / 'lib_info_submitted_to_clarity.csv', header=0,
+                       converters={'Sample Barcode': str})
+##########################
+##########################
+
+
+##########################
+##########################
+def makeClarityLibCreationFiles(project_dir, rng):
+
+    # one library creation .xls per library plate, as downloaded from the
+    # Clarity queue: plate info at the top, one row per library from row 27
+    lib_df = readSubmittedLibs(project_dir)
+
+    out_dir = Path(project_dir) / POOL_DIR / 'B_fill_clarity_lib_creation_file'
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    info = getProjectInfo(project_dir)
+
+    n = 26 ** 3 * info['project_num']
+
+    for p, plate in enumerate(sorted(lib_df['Pool_source_plate'].unique())):
+        clarity_plate = f'27-{700000 + 100 * info["project_num"] + p}'
+
+        book = xlwt.Workbook()
+        sheet = book.add_sheet('Results')
+
+        fields = ['Queue', 'Account', 'Protocol', 'Library Plate ID', 'Plate Name', 'Run Mode',
+                  'Sequencer', 'Read Length', 'Degree of Pooling', 'Library Type',
+                  'Target Aliquot Mass (ng)', 'Target Aliquot Volume (ul)', 'Notes', 'Operator',
+                  'Library QC Result', 'Comments', 'Number of PCR Cycles', 'Index Set']
+
+        for r, name in enumerate(fields):
+            sheet.write(r, 0, name)
+
+        sheet.write(0, 1, 'SIP Metagenome')
+        sheet.write(3, 1, clarity_plate)
+        sheet.write(4, 1, plate)
+
+        cols = ['Well', 'Library LIMS ID', 'Library Name', 'Aliquot Mass (ng)', 'Library Volume (ul)']
+
+        for c, name in enumerate(cols):
+            sheet.write(25, c, name)
+
+        wells = lib_df.loc[lib_df['Pool_source_plate'] == plate, 'Pool_source_well']
+
+        for r, w in enumerate(wells, start=26):
+            n += 1
+            values = [w, f'2-{9000000 + n}', makeLibraryName(n), 1, 35]
+            for c, v in enumerate(values):
+                sheet.write(r, c, v)
+
+        book.save(str(out_dir / f'LibraryCreation_{clarity_plate}.xls'))
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def getPoolNumbers(project_dir):
+
+    sheet_path = Path(project_dir) / POOL_DIR / 'C_assign_libs_to_pools' / 'assign_pool_number_sheet.xlsx'
+
+    pool_df = pd.read_excel(sheet_path, header=1, usecols=['Plate', 'Assigned_Pool'])
+
+    pool_df = pool_df.dropna()
+
+    return dict(zip(pool_df['Plate'], pool_df['Assigned_Pool'].astype(int)))
+##########################
+##########################
+
+
+##########################
+##########################
+def makePoolingPrepFile(project_dir, rng):
+
+    # Clarity pooling prep sheet, one row per library, headers on the 3rd row
+    lib_df = readSubmittedLibs(project_dir)
+
+    cols = ['Library LIMS ID', 'Library Name', 'Plate Map', 'Well', 'Library Plate Barcode', 'DOP',
+            'Pool Number', 'Library Percentage with SOF (%)', 'Library Molarity (pm)', 'Run Mode',
+            'Read Length', 'Sequencer Model', 'Index Name', 'Library Queue', 'Notes']
+
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = 'Pooling Prep'
+
+    sheet.append(['Pooling Prep'])
+    sheet.append([])
+    sheet.append(cols)
+
+    for _, row in lib_df.iterrows():
+        sheet.append([row['Library LIMS ID'], row['Library Name'], row['Pool_source_plate'], row['Pool_source_well'],
+                      row['Clarity_Lib_Plate_ID'], 96, None, None, None, '2x151', 151, 'NovaSeq X',
+                      row['Pool_Illumina_index'], 'SIP', None])
+
+    out_path = Path(project_dir) / POOL_DIR / 'C_assign_libs_to_pools' / 'PoolingPrep_27-000001.xlsx'
+
+    book.save(out_path)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def makePoolCreationFile(project_dir, rng):
+
+    # Clarity pool creation sheet: a Lab sheet with one row per library and
+    # a Lab Summary Table with one row per pool
+    lib_df = readSubmittedLibs(project_dir)
+
+    pool_numbers = getPoolNumbers(project_dir)
+
+    lib_df['Pool_number'] = lib_df['Pool_source_plate'].map(pool_numbers)
+
+    pool_names = {p: (makeLibraryName(26 ** 4 + i), f'2-{9500000 + i}')
+                  for i, p in enumerate(sorted(lib_df['Pool_number'].unique()))}
+
+    lab_cols = [" qPCR'd Sample Name", 'Sample Container Barcode', 'Source Position', 'Library Percentage with SOF',
+                'Library Actual Percentage with SOF', 'Conc (pM) ', 'Library Working Concentration for Pooling',
+                'ul of Undiluted or 1:10 Library', 'Vol TE  to Bring Library up to 10ul', 'Pool Name',
+                'Pool Container Barcode', 'Pool Lab Process Result', 'Pool Concentration pM',
+                'Target Pool Concentration pM', 'Actual Volume Used', 'Repool Volume Present?',
+                'Destination Labware', 'Pool Number', 'DOP', 'Run Mode', 'Sequencer Model', 'Read Length',
+                'Library Queue', 'Account', 'Library Name Alias', 'Notes', 'Index Name', 'Index Sequence',
+                'Library Molarity (pm)', 'Well', 'Comments']
+
+    book = openpyxl.Workbook()
+    lab = book.active
+    lab.title = 'Lab'
+    lab.append(lab_cols)
+
+    pool_sizes = lib_df['Pool_number'].value_counts()
+
+    for _, row in lib_df.iterrows():
+        p = row['Pool_number']
+        name, barcode = pool_names[p]
+
+        values = {" qPCR'd Sample Name": row['Library Name'],
+                  'Sample Container Barcode': row['Clarity_Lib_Plate_ID'],
+                  'Source Position': row['Pool_source_well'],
+                  'Library Percentage with SOF': round(100 / pool_sizes[p], 4),
+                  'Pool Name': name,
+                  'Pool Container Barcode': barcode,
+                  'Pool Number': p}
+
+        lab.append([values.get(c) for c in lab_cols])
+
+    summary = book.create_sheet('Lab Summary Table')
+    summary.append(['Pool Name', 'Pool Container Barcode', 'Number of Libraries', 'Pool Percentage', 'Notes'])
+
+    for p, (name, barcode) in pool_names.items():
+        summary.append([name, barcode, int(pool_sizes[p]), 100, None])
+
+    out_path = Path(project_dir) / POOL_DIR / 'D_finish_pooling' / 'PoolCreation_27-000002.xlsx'
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    book.save(out_path)
+
+    return
+##########################
+##########################
+
+
+# lab work done before a step can run, keyed by step name
+LAB_STEPS = {
+    'first.FA.output.analysis': [makeFirstFAresults],
+    'rework.first.attempt': [reviewFirstFA],
+    'second.FA.output.analysis': [makeSecondFAresults],
+    'conclude.all.fa.analysis': [reviewSecondFA],
+    'fill.clarity.lib.creation.sheet': [makeClarityLibCreationFiles],
+    'complete.clarity.pool.prep.sheet': [makePoolingPrepFile],
+    'finish.pooling.libs': [makePoolCreationFile],
+}
+
+
+##########################
+##########################
+def doLabWork(project_dir, step):
+
+    for fn in LAB_STEPS.get(step, []):
+        fn(Path(project_dir), getRng(project_dir, fn.__name__))
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--fractions', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if (args.samples < 1) or not (2 <= args.fractions <= 48):
+        print('\n\nNeed at least 1 sample and 2-48 fractions.  Aborting\n\n')
+        sys.exit()
+
+    if args.out_dir.exists() and any(args.out_dir.iterdir()):
+        print(f'\n\n{args.out_dir} is not empty.  Aborting\n\n')
+        sys.exit()
+
+    projects = makeProjects(args.out_dir, args.samples, args.fractions, args.seed)
+
+    for p in projects:
+        info = getProjectInfo(p)
+        print(f"{p}: {info['samples']} samples, {math.ceil(info['samples'] / 2)} fraction plates")
@@ -8,24 +8,22 @@ import pandas as pd
 import numpy as np
 import sys
 import os
-import openpyxl
-import shutil
 # from openpyxl import load_workbook
-import xlwings as xw
 from datetime import datetime
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfFileMerger
 
 # call exists() function named 'file_exists'
 from os.path import exists as file_exists
 
+import fraction_plate_io
+import excel_recalc
+import archive_store
+import sip_params
+import plate_geometry
+import step_metrics
+
 
 # define list of destination well positions for a 96-well and 384-well plates
-well_list_96w = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                 'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                 'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                 'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                 'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12', 'H12']
+well_list_96w = plate_geometry.getWellList(96)
 
 
 ##########################
@@ -91,36 +89,9 @@ def getMatchedFiles(dirname, prefix):
 def getVolumes(my_dirname, my_plateid):
     vol_path = my_dirname+"/" + my_plateid+".CSV"
 
-    # import corrsponding volume check file
-    my_volume_df = pd.read_csv(vol_path, header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-        'TUBE': str, 'RACKID': str}, skip_blank_lines=True)
-    # volume_df = pd.read_csv(plateid+".CSV", header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-    #     'TUBE': str, 'RACKID': str})
-
-    # replace missing values with 0 ONLY for well A01.  This seems to be a glitch
-    # in instrument used to measure well volumes
-    my_volume_df['VOLAVG'] = np.where(
-        ((my_volume_df['TUBE'] == 'A01') & (my_volume_df['VOLAVG'].isnull())), 0, my_volume_df['VOLAVG'])
-
-    if my_volume_df['VOLAVG'].isnull().values.any():
-        print(
-            f"\n\nERROR\n\nThe volume plate for {my_plateid} is missing data.  Aborting script\n\n")
-        sys.exit()
-
-    my_volume_df['VOLAVG'] = my_volume_df['VOLAVG'].astype(int)
-
-    # loop to reformat well positions, e.g. A01 --> A1, B01 --> B1
-    new_pos_list = []
-    for index, row in my_volume_df.iterrows():
-        # print(row['TUBE'])
-        well = row['TUBE']
-        if well[1] == '0':
-            well = well.replace('0', '')
-
-        new_pos_list.append(well)
-
-    # replace old well format with new format
-    my_volume_df["TUBE"] = new_pos_list
+    # import corrsponding volume check file, checked and with wells
+    # reformatted, e.g. A01 --> A1
+    my_volume_df = fraction_plate_io.readPlateVolumes(vol_path, my_plateid)
 
     return my_volume_df
 
@@ -143,14 +114,14 @@ def getDensity(my_dirname, my_plateid):
     # book.save()
     # app.kill()
 
-    my_density_df = pd.read_excel(dens_path, header=0, engine=("openpyxl"), usecols=['Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Mass (pg)'],
-                                  converters={'Plate barcode': str, 'Sample barcode': str, 'Fraction #': int})
+    my_density_df = fraction_plate_io.readDensityFile(dens_path, usecols=[
+                                                      'Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Mass (pg)'])
 
     # check if desnity .xlsx file already hase values ented in Spike-in Mass (pg) column
     if not(my_density_df['Spike-in Mass (pg)'].isnull().all()):
 
         keep_going = str(
-            input(f'Density file {my_plateid}.xlsx already has values in column Spike-in Mass (pg)\n\nDo you want to overwrite these data?  (y/n)  ') or 'n')
+            sip_params.ask('overwrite_spike_in_mass', f'Density file {my_plateid}.xlsx already has values in column Spike-in Mass (pg)\n\nDo you want to overwrite these data?  (y/n)  ', key=my_plateid) or 'n')
 
         if (keep_going == 'Y' or keep_going == 'y'):
             print("Ok, we'll keep going and overwrite existing sequin mass data\n\n")
@@ -188,44 +159,9 @@ def getConc(my_dirname, my_dna):
 
     conc_path = my_dirname+"/" + my_dna
 
-    tmp_conc_file = 'tmp_conc.txt'
-
-    with open(tmp_conc_file, 'w') as outfile:
-        with open(conc_path, 'r') as file:
-            for line in file:
-                if not line.isspace():
-                    outfile.write(line)
-
-    my_DNA_conc_df = pd.read_csv(tmp_conc_file, sep='\t', header=1, usecols=['Well ID', 'Well', '[Concentration]'],
-                                 converters={'[Concentration]': str}, skip_blank_lines=True)
-
-    # remove empty lines with NaN
-    my_DNA_conc_df.dropna(inplace=True)
-
-    # remove blanks and standards from dataframe and keep only rows with "SPL" in well ID
-    my_DNA_conc_df = my_DNA_conc_df.loc[my_DNA_conc_df['Well ID'].str.contains(
-        'SPL')]
-
-    my_DNA_conc_df.drop('Well ID', inplace=True, axis=1)
-
-    # remove "<" character from dna conc for samples below detection limit
-    my_DNA_conc_df["[Concentration]"] = my_DNA_conc_df["[Concentration]"].str.replace(
-        '<', '')
-
-    # replace dna conc values <= 0.001 with 0.001 ng/ul.  Clarity/ITS won't accept a conc <= 0
-    my_DNA_conc_df["[Concentration]"] = np.where(my_DNA_conc_df["[Concentration]"].astype(
-        float) <= 0.001, 0.001, my_DNA_conc_df["[Concentration]"].astype(float))
-
-    # round DNA concentration
-    my_DNA_conc_df = my_DNA_conc_df.round({'[Concentration]': 3})
-
-    # append my_DNA_conc_df to larger DF of all files
-
-    try:
-        os.remove(tmp_conc_file)
-
-    except:
-        print(f'\nError deleting {tmp_conc_file}')
+    # parse DNA conc file in memory, keeping only "SPL" wells
+    # with values <= 0.001 set to 0.001 ng/ul and rounded to 3 places
+    my_DNA_conc_df = fraction_plate_io.readConcFile(conc_path)
 
     return my_DNA_conc_df
 
@@ -307,7 +243,7 @@ def calcSequinMassRange(hi_sequin_working_conc, lo_sequin_working_conc, min_tran
 def enterFractionMetadata():
     # ask user for total number of fractions collected
     total_fractions = float(
-        input("Enter the total # fractions collected (default 24): ") or 24)
+        sip_params.ask('total_fractions', "Enter the total # fractions collected (default 24): ") or 24)
 
     if (total_fractions <= 0):
         print('\n\nError.  Fractions must be >0.  Aborting.\n\n')
@@ -315,7 +251,7 @@ def enterFractionMetadata():
 
     # ask user for target % for sequins
     percent_sequin = float(
-        input("Sequin mass should be what % of total mass? (default 1): ") or 1)
+        sip_params.ask('sequin_percent_of_mass', "Sequin mass should be what % of total mass? (default 1): ") or 1)
 
     if ((percent_sequin < 0) | (percent_sequin >= 100)):
         print('\n\nError.  The % sequin should be  >=0 and <100.  Aborting.\n\n')
@@ -323,7 +259,7 @@ def enterFractionMetadata():
 
     # ask user for volume of cscl fraction used to determine DNA conc
     cscl_vol = float(
-        input("Enter the uL's of fraction used to measure DNA conc  (default 2.4): ") or 2.4)
+        sip_params.ask('conc_measure_vol', "Enter the uL's of fraction used to measure DNA conc  (default 2.4): ") or 2.4)
 
     if ((cscl_vol <= 0) | (percent_sequin > 10)):
         print('\n\nError.  Fraction volume should be >0 and <=10uL  Aborting.\n\n')
@@ -331,11 +267,11 @@ def enterFractionMetadata():
 
     # ask user for conc of sequin working stock
     hi_sequin_working_conc = float(
-        input("Enter concentration of HIGH sequin working stock (default 70 pg/uL): ") or 70)
+        sip_params.ask('high_sequin_stock_conc', "Enter concentration of HIGH sequin working stock (default 70 pg/uL): ") or 70)
 
     # ask user for conc of sequin working stock
     lo_sequin_working_conc = float(
-        input("Enter concentration of LOW sequin working stock (default 15 pg/uL): ") or 15)
+        sip_params.ask('low_sequin_stock_conc', "Enter concentration of LOW sequin working stock (default 15 pg/uL): ") or 15)
 
     if ((lo_sequin_working_conc <= 0) | (hi_sequin_working_conc <= 0)):
         print('\n\nError.  Sequin_working_conc >0.  Aborting.\n\n')
@@ -343,14 +279,14 @@ def enterFractionMetadata():
 
     # ask user for minimum transfer volume
     min_trans_vol = float(
-        input("Enter minium transfer volume for sequin addition (default 2.4 uL): ") or 2.4)
+        sip_params.ask('min_sequin_transfer_vol', "Enter minium transfer volume for sequin addition (default 2.4 uL): ") or 2.4)
 
     if (min_trans_vol <= 0):
         print('\n\nError.  minimum transfer volume must be >0.  Aborting.\n\n')
 
     # ask user for minimum transfer volume
     max_trans_vol = float(
-        input("Enter maximum transfer volume for sequin addition (default 35 uL): ") or 35)
+        sip_params.ask('max_sequin_transfer_vol', "Enter maximum transfer volume for sequin addition (default 35 uL): ") or 35)
 
     return total_fractions, percent_sequin, cscl_vol, hi_sequin_working_conc, lo_sequin_working_conc, min_trans_vol, max_trans_vol
 ##########################
@@ -584,8 +520,9 @@ def updateDensityFile(my_merged_df, my_density_emptyrow_df, plateid):
     fn = (f'{plateid}.xlsx')
     full_path = BASE_DIR / fn
 
-    # save copy of unmodified density .xlsx files to a sub folder
-    shutil.copy(full_path, DENSITY_DIR / f'{plateid}_{date}.xlsx')
+    # save copy of unmodified density .xlsx files, kept in the
+    # archive store unless SIP_ARCHIVE_STORE=0
+    archive_store.archiveFile(full_path, DENSITY_DIR / f'{plateid}_{date}.xlsx', move=False)
 
     # # one option for writing sequin mass to density .xlsx file
     # book = openpyxl.load_workbook(full_path)
@@ -638,30 +575,11 @@ def updateDensityFile(my_merged_df, my_density_emptyrow_df, plateid):
     
 
     
-    # rename density .xlsx file with '~$' appened to start of file name
-    # this simulates Microsoft name format for temporary files, and changing
-    # the name to this temporary format is necessary so excel on Mac can open
-    # the .xlsx files the first time without granting access file by file
-    # the name will be changed back to the original format when donde
-    temp_name = BASE_DIR / ("~$"+fn)
-    
-    os.rename(full_path, temp_name)
-    
-    
-    
-    # open modified density .xlsx file in excel, save, and close
+    # refresh cached formula values in the modified density .xlsx file
     # this resovles an error where .xlsx formulas stop working, e.g. density calculations
     # valres are not imported into pandas df in down stream python merging script run after
-    # this script
-    app = xw.App(visible=False)
-    # book = app.books.open(full_path)
-    
-    book = app.books.open(temp_name)
-    book.save()
-    app.kill()
-    
-    #rename density .xlsx file by removing the '~$' from the start of the file name
-    os.rename(temp_name, full_path)
+    # this script.  Uses excel via xlwings, or pure python when SIP_RECALC_ENGINE=python
+    excel_recalc.recalcWorkbook(full_path)
 
     # another option for writing sequin mass to density .xlsx files
     # # load workbook
@@ -832,6 +750,8 @@ def updateDensityFile(my_merged_df, my_density_emptyrow_df, plateid):
 ##########################
 ##########################
 
+step_metrics.timeFunctions(globals())
+
 # get current date and time, will add some file names
 date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
@@ -936,3 +856,4 @@ status_dir = Path.cwd() / ".workflow_status"
 status_dir.mkdir(exist_ok=True)
 success_file = status_dir / "calcSequinAddition.success"
 success_file.touch()
+step_metrics.writeMetrics(success_file)
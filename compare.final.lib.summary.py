@@ -3,13 +3,12 @@
 
 import pandas as pd
 import numpy as np
-import os
 import sys
-import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfFileMerger
-import seaborn as sns
+from pathlib import Path
+
+import density_plot_pdf
+import step_metrics
 
 
 ######################
@@ -97,7 +96,7 @@ def getTMPdf(df, s):
 
 ######################
 ######################
-def plotDensVsConc(s, df, version, all_pdf_files):
+def plotDensVsConc(s, g, df, version, all_pages):
 
     color_dict = {'original': 'b', 'updated': 'r'}
 
@@ -110,25 +109,14 @@ def plotDensVsConc(s, df, version, all_pdf_files):
     # and return name of sample provided by user
     tmp_df, name = getTMPdf(df, s)
 
-    # creation matliplot object
-    f = plt.figure()
-
-    # make line plot of sample DNA concentration, NOT the library concentration
-    sns.lineplot(data=tmp_df, x="Density (g/mL)",
-                 y="DNA Concentration (ng/uL)", hue="Sample Barcode", palette=color, legend=False).set(title=f'{version} {g}: {name}')
-
-    # make scatter plot where marker style indicates if library was successfully created (pass)
-    sns.scatterplot(data=tmp_df, x="Density (g/mL)",
-                    y="DNA Concentration (ng/uL)", style="Lib Pass/Fail",  hue="Sample Barcode", palette=color, markers=marker_form, s=100)
-
-    # save plot to a pdf
-    plt.savefig(f'tmp_{s}_{version}.pdf', format="pdf", dpi=300)
+    # add page for sample to plot pdf.  Line plot is of sample DNA concentration,
+    # NOT the library concentration, and scatter plot marker style indicates if
+    # library was successfully created (pass)
+    all_pages.append((version, density_plot_pdf.makePage(tmp_df, f'{version} {g}: {name}',
+                                                         line_kws={'hue': "Sample Barcode", 'palette': color},
+                                                         scatter_kws={'hue': "Sample Barcode", 'palette': color, 'markers': marker_form})))
 
-    # add name of group figure pdf
-    all_pdf_files.append(f'tmp_{s}_{version}.pdf')
-
-    plt.close(f)
-    return all_pdf_files
+    return all_pages
 
 ######################
 ######################
@@ -136,103 +124,93 @@ def plotDensVsConc(s, df, version, all_pdf_files):
 
 ######################
 ######################
-def mergePDFs(pdf_files, version):
-    # Create and instance of PdfFileMerger() class
-    merger = PdfFileMerger()
-
-    # loop through group figure pdfs and merge them into one
-    for pdf in pdf_files:
-        # Append PDF files
-        merger.append(pdf)
+def writePlotPdf(all_pages, version):
 
     if version == 'all':
-        # Write out the merged PDF
-        merger.write(f"original_vs_updated_PASS-FAIL_plots_{date}.pdf")
-        merger.close()
+        # render every page into one pdf
+        density_plot_pdf.writePlotPdf(
+            [page for v, page in all_pages], f"original_vs_updated_PASS-FAIL_plots_{date}.pdf")
 
     elif version == 'updated':
-        # Write out the merged PDF
-        merger.write(f"DNAvsDensity_PASS-FAIL_plots_{date}.pdf")
-        merger.close()
-
-    # # second loop to separately delete individual files is necessary
-    # # to make script work on PC... for some reason.
-    # for pdf in all_pdf_files:
-    #     # delete indidvidual group figure pdf
-    #     os.remove(pdf)
+        # render only pages from updated df into one pdf
+        density_plot_pdf.writePlotPdf(
+            [page for v, page in all_pages if v == 'updated'], f"DNAvsDensity_PASS-FAIL_plots_{date}.pdf")
 
 ######################
 ######################
 
 
-# get current date and time, will add some file names
-date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
-
-orig_df = pd.read_csv('final_lib_summary.csv', header=0, skip_blank_lines=True)
+# the main program is guarded so worker processes started by SIP_PLOT_WORKERS
+# can import this script without re-running it
+if __name__ == "__main__":
+    step_metrics.timeFunctions(globals())
 
-update_df = pd.read_csv('updated_final_lib_summary.csv',
-                        header=0, skip_blank_lines=True)
+    # get current date and time, will add some file names
+    date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
+    orig_df = pd.read_csv('final_lib_summary.csv', header=0, skip_blank_lines=True)
 
-orig_df, update_df = updateDataFrames(orig_df, update_df)
+    update_df = pd.read_csv('updated_final_lib_summary.csv',
+                            header=0, skip_blank_lines=True)
 
 
-# compare original and updated dataframes to find differences in pass/fail assignments
-# also look for differences in any other columns.  Only columsn with info on pass/fail
-# should be different
-changed_df = compareDataframes(orig_df, update_df)
+    orig_df, update_df = updateDataFrames(orig_df, update_df)
 
 
-# create updated library info file
-changed_df.to_csv('manually_modified_libraries.csv', index=False)
+    # compare original and updated dataframes to find differences in pass/fail assignments
+    # also look for differences in any other columns.  Only columsn with info on pass/fail
+    # should be different
+    changed_df = compareDataframes(orig_df, update_df)
 
 
-# add new column if at least 1 library passed, otherwise fail
-orig_df['Lib Pass/Fail'] = np.where(
-    orig_df['Total_passed_attempts'] > 0, "Pass", "Fail")
+    # create updated library info file
+    changed_df.to_csv('manually_modified_libraries.csv', index=False)
 
-# add new column if at least 1 library passed, otherwise fail
-update_df['Lib Pass/Fail'] = np.where(
-    update_df['Total_passed_attempts'] > 0, "Pass", "Fail")
 
+    # add new column if at least 1 library passed, otherwise fail
+    orig_df['Lib Pass/Fail'] = np.where(
+        orig_df['Total_passed_attempts'] > 0, "Pass", "Fail")
 
-# get list of unique group names in project
-groups = sorted(orig_df['Replicate_Group'].unique().tolist())
+    # add new column if at least 1 library passed, otherwise fail
+    update_df['Lib Pass/Fail'] = np.where(
+        update_df['Total_passed_attempts'] > 0, "Pass", "Fail")
 
 
-# empty list to later hold names of pdfs for each group figure
-# this will be used ot merge multiple pdfs at end of script
-all_pdf_files = []
+    # get list of unique group names in project
+    groups = sorted(orig_df['Replicate_Group'].unique().tolist())
 
-# loop through list of groups
-for g in groups:
 
-    # get list of samples in group
-    samples = sorted(orig_df[orig_df['Replicate_Group'] == g]
-                     ['Sample Barcode'].unique().tolist())
+    # empty list to later hold a page for each sample plot
+    # this will be used to write pdfs at end of script
+    all_pages = []
 
-    # loop through samples and add line to plt.plot
-    for s in samples:
+    # loop through list of groups
+    for g in groups:
 
-        plotDensVsConc(s, orig_df, 'original', all_pdf_files)
+        # get list of samples in group
+        samples = sorted(orig_df[orig_df['Replicate_Group'] == g]
+                         ['Sample Barcode'].unique().tolist())
 
-        plotDensVsConc(s, update_df, 'updated', all_pdf_files)
+        # loop through samples and add pages to plot pdf
+        for s in samples:
 
+            plotDensVsConc(s, g, orig_df, 'original', all_pages)
 
-# merged plots from each individual sample into one
-# pdf with all plots
-mergePDFs(all_pdf_files, 'all')
+            plotDensVsConc(s, g, update_df, 'updated', all_pages)
 
 
-# get list of pdf graphs only from updated df
-list_updated_pdfs = list(filter(lambda a: 'update' in a, all_pdf_files))
+    # write plots from each individual sample into one
+    # pdf with all plots
+    writePlotPdf(all_pages, 'all')
 
-# merged plots from each individual sample into one
-# pdf with all plots
-mergePDFs(list_updated_pdfs, 'updated')
+    # write plots from updated df only into one
+    # pdf with all plots
+    writePlotPdf(all_pages, 'updated')
 
-# second loop to separately delete individual files is necessary
-# to make script work on PC... for some reason.
-for pdf in all_pdf_files:
-    # delete indidvidual group figure pdf
-    os.remove(pdf)
+    # Create success marker to indicate script completed successfully.
+    # This script is run from 5_pooling/A_make_clarity_aliquot_upload_file
+    status_dir = Path.cwd().parent.parent / ".workflow_status"
+    status_dir.mkdir(exist_ok=True)
+    success_file = status_dir / "compare.final.lib.summary.success"
+    success_file.touch()
+    step_metrics.writeMetrics(success_file)
@@ -11,8 +11,15 @@ import os
 import shutil
 from datetime import datetime
 from pathlib import Path
-import openpyxl
-from sqlalchemy import create_engine
+
+import lazy_import
+import archive_store
+import sip_params
+import step_metrics
+
+# imported when first used, see lazy_import.py
+openpyxl = lazy_import.lazyModule('openpyxl')
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
 
 
 ##########################
@@ -23,7 +30,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR / 'lib_info_submitted_to_clarity.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM lib_info_submitted_to_clarity"
@@ -121,8 +128,8 @@ def assignPool(my_lib_df, my_pool_df):
         sys.exit()
 
     # count the number of libs plates in each pool
-    # output is series sorted descending order, so index(0)
-    # should be pool with most lib plates
+    # output is series sorted descending order, so iloc[0]
+    # is the number of plates in the pool with most lib plates
     plates_per_pool = my_pool_df['Assigned_Pool'].value_counts()
 
     # The hamilton pool method only has space for 10 source plates, which means
@@ -130,11 +137,11 @@ def assignPool(my_lib_df, my_pool_df):
     # concentreated and dilute version of each lib plate.
     #
     # Flag if at least one pool as > 5 lib plates and ask if want to continue
-    if plates_per_pool.index[0] > 5:
+    if plates_per_pool.iloc[0] > 5:
         print(
             "\n\nThe number of plates in at least one pool is >5. There probably will not be enough deck space to poo.  Are you sure you want to continue?\n\n")
 
-        val = input()
+        val = sip_params.ask('continue_over_5_plates_per_pool')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -401,7 +408,7 @@ def createSQLdb(updated_df):
 
     sql_db_path = PROJECT_DIR /'lib_info_submitted_to_clarity.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
 
     # Specify the table name and database engine
@@ -419,6 +426,8 @@ def createSQLdb(updated_df):
 ##########################
 # MAIN PROGRAM
 ##########################
+step_metrics.timeFunctions(globals())
+
 PROJECT_DIR = Path.cwd()
 
 ARCHIV_DIR = PROJECT_DIR / "archived_files"
@@ -481,8 +490,8 @@ createSQLdb(lib_df)
 date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
 
-Path(PROJECT_DIR /
-     "lib_info_submitted_to_clarity.csv").rename(ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity{date}.csv")
+archive_store.archiveFile(PROJECT_DIR / "lib_info_submitted_to_clarity.csv",
+                          ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity{date}.csv")
 # Path(ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity_{date}.csv").touch()
 
 # create updated library info file
@@ -493,3 +502,4 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/complete.clarity.pool.prep.sheet.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/complete.clarity.pool.prep.sheet.success')
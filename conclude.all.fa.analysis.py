@@ -10,9 +10,15 @@ from pathlib import Path
 from os.path import exists as file_exists
 from datetime import datetime
 import os
-from sqlalchemy import create_engine
 import shutil
 
+import lazy_import
+import project_db
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+
 
 ##########################
 ##########################
@@ -62,7 +68,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR /'lib_info.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM lib_info"
@@ -186,37 +192,24 @@ def createSQLdb(lib_df):
     # # the copy will be moved to archive folder at a later step
     # shutil.copy(PROJECT_DIR /'lib_info.db', PROJECT_DIR / 'archive_lib_info.db')
     
-    # archive the older version of sql lib_info.db
-    Path(PROJECT_DIR /
-        "lib_info.db").rename(ARCHIV_DIR / f"archive_lib_info_{date}.db")
-    Path(ARCHIV_DIR / f"archive_lib_info_{date}.db").touch()
-
-    sql_db_path = PROJECT_DIR /'lib_info.db'
+    # write only the rows that changed to lib_info.db.  The old .db is
+    # archived in full only when the table's columns change
+    project_db.upsertTable(PROJECT_DIR / 'lib_info.db', 'lib_info', lib_df,
+                           project_db.LIB_INFO_KEYS, ARCHIV_DIR / f"archive_lib_info_{date}.db")
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-
-    # Specify the table name and database engine
-    table_name = 'lib_info'
-    
-    # Export the DataFrame to the SQLite database
-    lib_df.to_sql(table_name, engine, if_exists='replace', index=False) 
-
-    engine.dispose()
-
-    # archive the current lib_info.csv
-    Path(PROJECT_DIR /
-        "lib_info.csv").rename(ARCHIV_DIR / f"archive_lib_info_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_lib_info_{date}.csv").touch()
-
-    # create updated library info file
-    lib_df.to_csv(PROJECT_DIR / 'lib_info.csv', index=False)
+    # archive the current lib_info.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(PROJECT_DIR / 'lib_info.csv', lib_df,
+                        ARCHIV_DIR / f"archive_lib_info_{date}")
 
     return 
 #########################
 #########################
 
 
+step_metrics.timeFunctions(globals())
+
+
 ###########################
 # set up folder organiztion
 ###########################
@@ -272,3 +265,4 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/conclude.all.fa.analysis.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/conclude.all.fa.analysis.success')
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+# Shared renderer for the DNA concentration vs density plots made by
+# first.FA.output.analysis.py, second.FA.output.analysis.py,
+# emergency.third.FA.output.analysis.py, plot.manually.updated.fa.results.py
+# and compare.final.lib.summary.py.
+#
+# Every sample page is written straight into one multi-page pdf, re-using a
+# single figure, instead of saving a tmp_{sample}.pdf per sample and merging
+# them afterwards.  Set SIP_PLOT_WORKERS=N to render pages in N worker
+# processes.  Each worker writes one part of the pdf and the parts are
+# joined in order, so the page order never depends on the number of workers.
+#
+# USAGE:   import density_plot_pdf
+#          pages.append(density_plot_pdf.makePage(tmp_df, title, line_kws, scatter_kws))
+#          density_plot_pdf.writePlotPdf(pages, pdf_path)
+
+
+import os
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+
+##########################
+##########################
+def makePage(tmp_df, title, line_kws, scatter_kws):
+
+    # everything needed to draw one sample's plot.  Kept as plain data
+    # so pages can be sent to worker processes
+    return {'data': tmp_df, 'title': title, 'line': line_kws, 'scatter': scatter_kws}
+##########################
+##########################
+
+
+##########################
+##########################
+def getWorkers():
+
+    workers = int(os.environ.get('SIP_PLOT_WORKERS', 1))
+
+    return max(workers, 1)
+##########################
+##########################
+
+
+##########################
+##########################
+def drawPage(ax, page):
+
+    # seaborn and matplotlib are imported on the first page, not when a
+    # script imports this module
+    import seaborn as sns
+
+    # make line plot of sample DNA concentration, NOT the library concentration
+    sns.lineplot(data=page['data'], x="Density (g/mL)",
+                 y="DNA Concentration (ng/uL)", legend=False, ax=ax, **page['line']).set(title=page['title'])
+
+    # make scatter plot where marker style indicates if library was successfully created (pass)
+    sns.scatterplot(data=page['data'], x="Density (g/mL)",
+                    y="DNA Concentration (ng/uL)", style="Lib Pass/Fail", s=100, ax=ax, **page['scatter'])
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def renderPages(pages, pdf_path):
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    # one figure and axes are cleared and re-drawn for every page
+    f = Figure()
+    ax = f.add_subplot()
+
+    with PdfPages(pdf_path) as pdf:
+        for page in pages:
+            ax.clear()
+
+            drawPage(ax, page)
+
+            pdf.savefig(f, dpi=300)
+
+    return pdf_path
+##########################
+##########################
+
+
+##########################
+##########################
+def joinPdfs(part_paths, pdf_path):
+
+    # only needed when pages were rendered by several workers
+    try:
+        from PyPDF2 import PdfMerger
+    except ImportError:
+        from PyPDF2 import PdfFileMerger as PdfMerger
+
+    merger = PdfMerger()
+
+    for part in part_paths:
+        merger.append(str(part))
+
+    merger.write(str(pdf_path))
+
+    merger.close()
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writePlotPdf(pages, pdf_path, workers=None):
+
+    if workers is None:
+        workers = getWorkers()
+
+    workers = min(workers, len(pages))
+
+    if workers <= 1:
+        renderPages(pages, pdf_path)
+        return
+
+    # split pages into contiguous, similar sized chunks, one per worker
+    bounds = [round(i * len(pages) / workers) for i in range(workers + 1)]
+    chunks = [pages[bounds[i]:bounds[i + 1]] for i in range(workers)]
+
+    with tempfile.TemporaryDirectory(dir=Path(pdf_path).parent) as tmp_dir:
+        part_paths = [Path(tmp_dir) / f'part_{i}.pdf' for i in range(workers)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            part_paths = list(executor.map(renderPages, chunks, part_paths))
+
+        joinPdfs(part_paths, pdf_path)
+
+    return
+##########################
+##########################
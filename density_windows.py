@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# Density windows of the fractions made into libraries, by isotope label.
+#
+# The window of each isotope is listed in isotope_density_windows.csv:
+#
+#     isotope_label,Min_density,Max_density
+#     O18,1.68,1.78
+#
+# A replicate group uses the window of the first label in the file found in
+# the group, e.g. a group of O18 and Unlabeled samples uses the O18 window, and
+# a label with blank bounds, e.g. Unlabeled, keeps every fraction.  Labels that
+# aren't in the file abort the script.  Windows can be changed, or isotopes
+# added, by editing the file, and SIP_DENSITY_WINDOW_FILE can point to a
+# different file.
+#
+# setMakeLib() finds the window of every group with one groupby and joins the
+# bounds onto the fractions, instead of rescanning the frame for each group.
+#
+# USAGE:   import density_windows
+#          result_df = density_windows.setMakeLib(result_df)
+
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+WINDOW_FILE = Path(os.environ.get('SIP_DENSITY_WINDOW_FILE', SCRIPT_DIR / 'isotope_density_windows.csv'))
+
+
+##########################
+##########################
+def readWindows(window_file=WINDOW_FILE):
+
+    if not Path(window_file).exists():
+        print(f'\n\nCould not find the isotope density window file {window_file}.  Aborting\n\n')
+        sys.exit()
+
+    window_df = pd.read_csv(window_file, dtype={'isotope_label': str, 'Min_density': float, 'Max_density': float})
+
+    window_df['isotope_label'] = window_df['isotope_label'].str.strip()
+
+    if window_df['isotope_label'].duplicated().any():
+        print(f'\n\nIsotope labels are listed twice in {window_file}.  Aborting\n\n')
+        sys.exit()
+
+    return window_df
+##########################
+##########################
+
+
+# isotope windows in order of precedence within a group
+WINDOWS = readWindows()
+
+
+##########################
+##########################
+def getGroupWindows(result_df, window_df=WINDOWS):
+
+    # precedence of each fraction's label, -1 for labels not in the file
+    rank = pd.Index(window_df['isotope_label']).get_indexer(result_df['isotope_label'])
+
+    rank = pd.Series(rank, index=result_df.index)
+
+    groups = result_df['Replicate_Group']
+
+    unknown = groups[(rank < 0) & groups.notna()]
+
+    if not unknown.empty:
+        print(f"\n\nUnexpeced isotope value in group {sorted(unknown.unique())[0]}\n\nAborting script\n")
+        sys.exit()
+
+    # one row per group with the bounds of its first label in the file
+    group_df = rank.groupby(groups).min().rename('rank').reset_index()
+
+    return group_df.join(window_df[['Min_density', 'Max_density']], on='rank')
+##########################
+##########################
+
+
+##########################
+##########################
+def setMakeLib(result_df, window_df=WINDOWS):
+
+    group_df = getGroupWindows(result_df, window_df)
+
+    # left join keeps the fractions in order
+    bounds = result_df[['Replicate_Group']].merge(group_df, on='Replicate_Group', how='left')
+
+    density = result_df['Density (g/mL)'].to_numpy()
+
+    # blank bounds keep every fraction
+    outside = (density > bounds['Max_density'].to_numpy()) | (density < bounds['Min_density'].to_numpy())
+
+    result_df['Make_Lib'] = np.where(outside, 0, 1)
+
+    return result_df
+##########################
+##########################
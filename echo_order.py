@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# Order of the transfers in the Echo transfer files.
+#
+# The transfer files listed the buffer transfers of each destination plate
+# first and then the DNA transfers by destination column and row.  Fractions
+# from several SIP plates are mixed on a destination plate, so the Echo
+# swapped source plates back and forth and jumped around the source plate.
+#
+# estimateSeconds() gives a rough time for the source plate swaps and the
+# moves of each destination plate, using the constants below.
+# orderTransfers() keeps the destination plates and the buffer-first rule,
+# and for each destination plate tries the file order and orders that group
+# the transfers by source plate, in the order the plates are first used, then
+# run down each source, or destination, column and back up the next.  The
+# fastest estimate is kept, so a plate is never slower than before.  Only the
+# order of the rows changes, every transfer is still there.  reportSavings()
+# prints the estimate before and after.  Set SIP_ECHO_ORDER=0 to write the
+# transfers in the old order.
+#
+# USAGE:   import echo_order
+#          echo_df = echo_order.orderEchoTransfers(echo_df)
+
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# rough Echo timings, only used for the time estimate
+PLATE_SWAP_SECONDS = 10.0
+MM_PER_SECOND = 100.0
+
+# well spacing of the 384 well source plate, and of 96 / 384 well destination plates
+SOURCE_PITCH_MM = 4.5
+PITCH_MM = {96: 9.0, 384: 4.5}
+
+BUFFER_SOURCE = 'Buffer'
+
+
+##########################
+##########################
+def useEchoOrder():
+
+    return os.environ.get('SIP_ECHO_ORDER', '1') != '0'
+##########################
+##########################
+
+
+##########################
+##########################
+def getPitch(dest_rows, dest_cols):
+
+    return PITCH_MM[96] if (dest_rows.max(initial=0) <= 8) and (dest_cols.max(initial=0) <= 12) else PITCH_MM[384]
+##########################
+##########################
+
+
+##########################
+##########################
+def getArrays(echo_df):
+
+    return (echo_df['Source Plate Name'].to_numpy().astype(str),
+            pd.to_numeric(echo_df['Source Row']).to_numpy(),
+            pd.to_numeric(echo_df['Source Column']).to_numpy(),
+            pd.to_numeric(echo_df['Destination Row']).to_numpy(),
+            pd.to_numeric(echo_df['Destination Column']).to_numpy())
+##########################
+##########################
+
+
+##########################
+##########################
+def blockSeconds(source, src_rows, src_cols, dest_rows, dest_cols, dest_pitch):
+
+    # source plate loads and estimated swap and move time of the transfers
+    # to one destination plate, in the order given
+    new_plate = source[1:] != source[:-1]
+
+    swaps = 1 + np.count_nonzero(new_plate)
+
+    # source and destination move at the same time, a new source plate is
+    # loaded at its first well
+    src_mm = SOURCE_PITCH_MM * np.maximum(np.abs(np.diff(src_rows)), np.abs(np.diff(src_cols)))
+    src_mm[new_plate] = 0
+
+    dest_mm = dest_pitch * np.maximum(np.abs(np.diff(dest_rows)), np.abs(np.diff(dest_cols)))
+
+    return swaps, swaps * PLATE_SWAP_SECONDS + np.maximum(src_mm, dest_mm).sum() / MM_PER_SECOND
+##########################
+##########################
+
+
+##########################
+##########################
+def candidateOrders(source, src_rows, src_cols, dest_rows, dest_cols):
+
+    # orders of one destination plate's transfers to choose from, all with
+    # the buffer transfers first.  The file order is always one of them
+    n = np.arange(len(source))
+
+    buffer_last = source != BUFFER_SOURCE
+
+    # source plates in order of first use
+    plate_rank = pd.factorize(pd.Series(source))[0]
+
+    yield n
+
+    yield np.lexsort((n, plate_rank, buffer_last))
+
+    # down odd columns and back up even ones, of the source or destination plate
+    for rows, cols in [(src_rows, src_cols), (dest_rows, dest_cols)]:
+        yield np.lexsort((n, np.where(cols % 2 == 1, rows, -rows), cols, plate_rank, buffer_last))
+##########################
+##########################
+
+
+##########################
+##########################
+def orderTransfers(echo_df):
+
+    # the fastest candidate order of each destination plate, destination
+    # plates stay in the same order
+    source, src_rows, src_cols, dest_rows, dest_cols = getArrays(echo_df)
+
+    dest_pitch = getPitch(dest_rows, dest_cols)
+
+    order = []
+
+    for d, idx in echo_df.groupby('Destination Plate Name', sort=False).indices.items():
+        arrays = [a[idx] for a in (source, src_rows, src_cols, dest_rows, dest_cols)]
+
+        best = min(candidateOrders(*arrays),
+                   key=lambda o: blockSeconds(*[a[o] for a in arrays], dest_pitch)[1])
+
+        order.append(idx[best])
+
+    return echo_df.iloc[np.concatenate(order)] if order else echo_df
+##########################
+##########################
+
+
+##########################
+##########################
+def estimateSeconds(echo_df):
+
+    # source plate loads and estimated swap and move time of each destination plate
+    source, src_rows, src_cols, dest_rows, dest_cols = getArrays(echo_df)
+
+    dest_pitch = getPitch(dest_rows, dest_cols)
+
+    return {d: blockSeconds(source[idx], src_rows[idx], src_cols[idx], dest_rows[idx], dest_cols[idx], dest_pitch)
+            for d, idx in echo_df.groupby('Destination Plate Name', sort=False).indices.items()}
+##########################
+##########################
+
+
+##########################
+##########################
+def reportSavings(before_df, after_df):
+
+    before = estimateSeconds(before_df)
+    after = estimateSeconds(after_df)
+
+    print('\n\nEstimated Echo swap and move time of each destination plate:\n')
+
+    print(f"{'plate':<20} {'swaps':>11} {'seconds':>15} {'saved':>7}")
+
+    for d, (swaps, seconds) in before.items():
+        new_swaps, new_seconds = after[d]
+
+        print(f'{d:<20} {swaps:>5} -> {new_swaps:<3} {seconds:>7.0f} -> {new_seconds:<5.0f} {seconds - new_seconds:>7.0f}')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def orderEchoTransfers(echo_df):
+
+    if not useEchoOrder() or echo_df.empty:
+        return echo_df
+
+    ordered_df = orderTransfers(echo_df)
+
+    reportSavings(echo_df, ordered_df)
+
+    return ordered_df
+##########################
+##########################
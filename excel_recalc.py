@@ -0,0 +1,1541 @@
+#!/usr/bin/env python3
+
+# Refresh the cached formula values stored in an .xlsx file.
+#
+# openpyxl drops cached formula values when it saves a workbook, so pandas
+# (which reads cached values) sees empty cells, e.g. the Density column of
+# a density .xlsx after calcSequinAddition.py writes sequin masses into it.
+# The scripts used to fix this by opening, saving, and closing the file in
+# Excel through xlwings.  This module can do the same with Excel, or recalculate
+# the formulas in pure Python and write the values back into the sheet XML,
+# which also works on machines without Excel.
+#
+# The engine is picked with the SIP_RECALC_ENGINE environment variable:
+#   SIP_RECALC_ENGINE=xlwings   open/save/close in Excel (default)
+#   SIP_RECALC_ENGINE=python    pure Python recalculation
+#
+# USAGE:   import excel_recalc
+#          excel_recalc.recalcWorkbook(path_to_xlsx)
+
+
+import os
+import re
+import sys
+import math
+import zipfile
+import posixpath
+from pathlib import Path
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+
+NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+      'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+      'rel': 'http://schemas.openxmlformats.org/package/2006/relationships'}
+
+ERRORS = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+
+
+##########################
+##########################
+class XLError(str):
+    # Excel error value, e.g. #N/A.  Subclass of str so it prints as is,
+    # but is never confused with a text value
+    pass
+
+
+class UnsupportedFormula(Exception):
+    pass
+##########################
+##########################
+
+
+##########################
+##########################
+def recalcWorkbook(path, engine=None):
+
+    if engine is None:
+        engine = os.environ.get('SIP_RECALC_ENGINE', 'xlwings')
+
+    if engine == 'xlwings':
+        recalcWithExcel(path)
+
+    elif engine == 'python':
+        try:
+            recalcWithPython(path)
+
+        except UnsupportedFormula as e:
+            print(
+                f'\n\nCould not recalculate formulas in {path}\n{e}\n\nRun again with SIP_RECALC_ENGINE=xlwings.  Aborting script\n\n')
+            sys.exit()
+
+    else:
+        print(
+            f"\n\nUnknown SIP_RECALC_ENGINE '{engine}'.  Must be 'xlwings' or 'python'.  Aborting script\n\n")
+        sys.exit()
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def recalcWithExcel(path):
+
+    # only needed when Excel does the recalculation
+    import xlwings as xw
+
+    path = Path(path)
+
+    # rename .xlsx file with '~$' appened to start of file name
+    # this simulates Microsoft name format for temporary files, and changing
+    # the name to this temporary format is necessary so excel on Mac can open
+    # the .xlsx files the first time without granting access file by file
+    # the name will be changed back to the original format when done
+    temp_name = path.parent / ("~$" + path.name)
+
+    os.rename(path, temp_name)
+
+    # open .xlsx file in excel, save, and close
+    # this refreshes the cached values of all formulas
+    app = xw.App(visible=False)
+    book = app.books.open(str(temp_name))
+    book.save()
+    app.kill()
+
+    # rename .xlsx file by removing the '~$' from the start of the file name
+    os.rename(temp_name, path)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def recalcWithPython(path):
+
+    path = Path(path)
+
+    book = readWorkbook(path)
+
+    values = evaluateWorkbook(book)
+
+    # patch cached values into the sheet xml and leave everything else,
+    # e.g. styles and formulas, untouched
+    new_xml = {}
+    for sheet in book['sheets'].values():
+        if len(sheet['formulas']) > 0:
+            new_xml[sheet['xml_path']] = patchSheetXml(
+                book['xml'][sheet['xml_path']], values[sheet['name']])
+
+    # write to a temporary copy and rename, so a failure can't leave a broken workbook
+    tmp_path = path.parent / (path.name + '.tmp')
+
+    with zipfile.ZipFile(path, 'r') as zin, zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            if item.filename in new_xml:
+                zout.writestr(item, new_xml[item.filename].encode('utf-8'))
+            else:
+                zout.writestr(item, zin.read(item.filename))
+
+    os.replace(tmp_path, path)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def readWorkbook(path):
+
+    book = {'sheets': {}, 'xml': {}}
+
+    with zipfile.ZipFile(path, 'r') as z:
+        names = z.namelist()
+
+        # shared strings table
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            root = ET.fromstring(z.read('xl/sharedStrings.xml'))
+            for si in root.findall('m:si', NS):
+                shared.append(''.join(t.text or '' for t in si.iter(
+                    f"{{{NS['m']}}}t")))
+
+        # map relationship id to worksheet xml path
+        rels = {}
+        root = ET.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+        for rel in root.findall('rel:Relationship', NS):
+            target = rel.get('Target')
+            if target.startswith('/'):
+                target = target.lstrip('/')
+            else:
+                target = posixpath.normpath(posixpath.join('xl', target))
+            rels[rel.get('Id')] = target
+
+        root = ET.fromstring(z.read('xl/workbook.xml'))
+        for sh in root.find('m:sheets', NS).findall('m:sheet', NS):
+            xml_path = rels[sh.get(f"{{{NS['r']}}}id")]
+            xml_text = z.read(xml_path).decode('utf-8')
+
+            book['xml'][xml_path] = xml_text
+            book['sheets'][sh.get('name').upper()] = readSheet(
+                sh.get('name'), xml_path, xml_text, shared)
+
+    return book
+##########################
+##########################
+
+
+##########################
+##########################
+def readSheet(name, xml_path, xml_text, shared):
+
+    sheet = {'name': name, 'xml_path': xml_path, 'cells': {}, 'formulas': {},
+             'max_row': 0, 'max_col': 0}
+
+    # master formula of each shared formula group, key is the 'si' index
+    shared_formulas = {}
+    followers = []
+
+    # formulas already parsed, keyed by their position independent form
+    parsed = {}
+
+    root = ET.fromstring(xml_text)
+
+    for c in root.iter(f"{{{NS['m']}}}c"):
+        row, col = splitCellRef(c.get('r'))
+
+        sheet['max_row'] = max(sheet['max_row'], row)
+        sheet['max_col'] = max(sheet['max_col'], col)
+
+        f = c.find('m:f', NS)
+        v = c.find('m:v', NS)
+        t = c.get('t', 'n')
+
+        if f is not None:
+            if f.get('t') == 'shared' and not f.text:
+                followers.append((row, col, f.get('si')))
+                continue
+
+            formula, offset = parseCellFormula(f.text or '', row, col, parsed)
+
+            if f.get('t') == 'shared':
+                shared_formulas[f.get('si')] = (formula, row - offset[0], col - offset[1])
+
+            sheet['formulas'][(row, col)] = {'ast': formula, 'offset': offset,
+                                             'array': f.get('t') == 'array', 'ref': f.get('ref')}
+            continue
+
+        # constant cell value
+        if t == 'inlineStr':
+            sheet['cells'][(row, col)] = ''.join(
+                x.text or '' for x in c.iter(f"{{{NS['m']}}}t"))
+        elif v is None or v.text is None:
+            continue
+        elif t == 's':
+            sheet['cells'][(row, col)] = shared[int(v.text)]
+        elif t == 'str':
+            sheet['cells'][(row, col)] = v.text
+        elif t == 'b':
+            sheet['cells'][(row, col)] = (v.text == '1')
+        elif t == 'e':
+            sheet['cells'][(row, col)] = XLError(v.text)
+        else:
+            sheet['cells'][(row, col)] = float(v.text)
+
+    # cells sharing a formula re-use the master formula shifted by their offset
+    for row, col, si in followers:
+        formula, mrow, mcol = shared_formulas[si]
+        sheet['formulas'][(row, col)] = {'ast': formula, 'offset': (row - mrow, col - mcol),
+                                         'array': False, 'ref': None}
+
+    return sheet
+##########################
+##########################
+
+
+##########################
+##########################
+def splitCellRef(ref):
+
+    m = re.match(r'\$?([A-Za-z]{1,3})\$?(\d+)$', ref)
+
+    return int(m.group(2)), columnNumber(m.group(1))
+##########################
+##########################
+
+
+##########################
+##########################
+def columnNumber(letters):
+
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + (ord(ch) - 64)
+
+    return n
+##########################
+##########################
+
+
+##########################
+##########################
+#   formula tokenizer and parser
+##########################
+##########################
+
+TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<err>\#NULL!|\#DIV/0!|\#VALUE!|\#REF!|\#NAME\?|\#NUM!|\#N/A)
+  | (?P<ref>(?:(?:'(?:[^']|'')+'|[A-Za-z_][\w\.]*)!)?
+        (?:\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?(?![\w(])
+          |\$?[A-Za-z]{1,3}:\$?[A-Za-z]{1,3}(?![\w(])))
+  | (?P<func>(?:_xlfn\.|_xlws\.)?[A-Za-z][\w\.]*(?=\())
+  | (?P<bool>(?:TRUE|FALSE)(?![\w(]))
+  | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<op><>|<=|>=|[-+*/^&=<>%(),{};])
+''', re.VERBOSE)
+
+
+##########################
+##########################
+def tokenize(text):
+
+    tokens = []
+    pos = 0
+
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+
+        if m is None:
+            raise UnsupportedFormula(
+                f'Could not parse formula "{text}" at "{text[pos:]}"')
+
+        pos = m.end()
+
+        if m.lastgroup != 'ws':
+            tokens.append((m.lastgroup, m.group(m.lastgroup)))
+
+    return tokens
+##########################
+##########################
+
+
+##########################
+##########################
+def parseRef(text):
+
+    # split off an optional sheet name, e.g. individual_lib_info!F:F or 'my sheet'!A1
+    sheet = None
+    if '!' in text:
+        sheet, text = text.rsplit('!', 1)
+        if sheet.startswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+        sheet = sheet.upper()
+
+    parts = text.split(':')
+
+    # whole column range, e.g. F:F, runs to the last used row of the sheet
+    if not any(ch.isdigit() for ch in text):
+        c1 = columnNumber(parts[0].replace('$', ''))
+        c2 = columnNumber(parts[1].replace('$', ''))
+
+        return ('ref', sheet, 1, c1, None, c2, True, parts[0].startswith('$'), True, parts[1].startswith('$'))
+
+    bounds = []
+    for p in parts:
+        m = re.match(r'(\$?)([A-Za-z]{1,3})(\$?)(\d+)$', p)
+        bounds.append((int(m.group(4)), columnNumber(m.group(2)),
+                       m.group(3) == '$', m.group(1) == '$'))
+
+    if len(bounds) == 1:
+        bounds.append(bounds[0])
+
+    (r1, c1, r1abs, c1abs), (r2, c2, r2abs, c2abs) = bounds
+
+    return ('ref', sheet, r1, c1, r2, c2, r1abs, c1abs, r2abs, c2abs)
+##########################
+##########################
+
+
+##########################
+##########################
+def parseCellFormula(text, row, col, parsed):
+
+    # formulas copied down a column, e.g. =G2/D2*1000, =G3/D3*1000, ...
+    # only differ in their relative references.  Parse each distinct formula
+    # once and evaluate it shifted by the cell's offset from the parsed copy
+    tokens = tokenize(text)
+
+    key = []
+    for kind, tok in tokens:
+        if kind == 'ref':
+            ref = parseRef(tok)
+            key.append((ref[1],
+                        ref[2] if (ref[6] or ref[4] is None) else ref[2] - row,
+                        ref[3] if ref[7] else ref[3] - col,
+                        ref[4] if (ref[8] or ref[4] is None) else ref[4] - row,
+                        ref[5] if ref[9] else ref[5] - col) + ref[6:])
+        else:
+            key.append((kind, tok))
+
+    key = tuple(key)
+
+    if key not in parsed:
+        node, pos = parseComparison(tokens, 0)
+
+        if pos != len(tokens):
+            raise UnsupportedFormula(f'Could not parse formula "{text}"')
+
+        parsed[key] = (node, row, col)
+
+    node, prow, pcol = parsed[key]
+
+    return node, (row - prow, col - pcol)
+##########################
+##########################
+
+
+##########################
+##########################
+def peek(tokens, pos):
+
+    return tokens[pos] if pos < len(tokens) else (None, None)
+##########################
+##########################
+
+
+##########################
+##########################
+def parseBinary(tokens, pos, ops, parse_next):
+
+    node, pos = parse_next(tokens, pos)
+
+    while (pos < len(tokens)) and (tokens[pos][0] == 'op') and (tokens[pos][1] in ops):
+        op = tokens[pos][1]
+        right, pos = parse_next(tokens, pos + 1)
+        node = ('binop', op, node, right)
+
+    return node, pos
+##########################
+##########################
+
+
+def parseComparison(tokens, pos):
+    return parseBinary(tokens, pos, ('=', '<>', '<', '>', '<=', '>='), parseConcat)
+
+
+def parseConcat(tokens, pos):
+    return parseBinary(tokens, pos, ('&',), parseAdditive)
+
+
+def parseAdditive(tokens, pos):
+    return parseBinary(tokens, pos, ('+', '-'), parseTerm)
+
+
+def parseTerm(tokens, pos):
+    return parseBinary(tokens, pos, ('*', '/'), parsePower)
+
+
+def parsePower(tokens, pos):
+    return parseBinary(tokens, pos, ('^',), parseUnary)
+
+
+##########################
+##########################
+def parseUnary(tokens, pos):
+
+    # in excel unary minus binds tighter than ^, e.g. -2^2 = 4
+    if peek(tokens, pos) in (('op', '-'), ('op', '+')):
+        op = tokens[pos][1]
+        node, pos = parseUnary(tokens, pos + 1)
+
+        return ('unop', op, node), pos
+
+    node, pos = parsePrimary(tokens, pos)
+
+    while peek(tokens, pos) == ('op', '%'):
+        node = ('binop', '/', node, ('num', 100.0))
+        pos += 1
+
+    return node, pos
+##########################
+##########################
+
+
+##########################
+##########################
+def parsePrimary(tokens, pos):
+
+    kind, text = peek(tokens, pos)
+
+    if kind == 'num':
+        return ('num', float(text)), pos + 1
+
+    elif kind == 'str':
+        return ('str', text[1:-1].replace('""', '"')), pos + 1
+
+    elif kind == 'bool':
+        return ('bool', text == 'TRUE'), pos + 1
+
+    elif kind == 'err':
+        return ('err', XLError(text)), pos + 1
+
+    elif kind == 'ref':
+        return parseRef(text), pos + 1
+
+    elif kind == 'func':
+        name = text.upper().replace('_XLFN.', '').replace('_XLWS.', '')
+        pos += 2  # skip name and '('
+        args = []
+
+        if peek(tokens, pos) == ('op', ')'):
+            return ('func', name, args), pos + 1
+
+        while True:
+            # allow empty arguments, e.g. IF(A1,,1)
+            if peek(tokens, pos) in (('op', ','), ('op', ')')):
+                args.append(('missing',))
+            else:
+                arg, pos = parseComparison(tokens, pos)
+                args.append(arg)
+
+            if peek(tokens, pos) == ('op', ','):
+                pos += 1
+            elif peek(tokens, pos) == ('op', ')'):
+                return ('func', name, args), pos + 1
+            else:
+                raise UnsupportedFormula(
+                    f'Could not parse arguments of {name}')
+
+    elif (kind, text) == ('op', '('):
+        node, pos = parseComparison(tokens, pos + 1)
+
+        if peek(tokens, pos) != ('op', ')'):
+            raise UnsupportedFormula('Unbalanced parentheses in formula')
+
+        return node, pos + 1
+
+    raise UnsupportedFormula(f'Unexpected "{text}" in formula')
+##########################
+##########################
+
+
+##########################
+##########################
+#   formula evaluation
+##########################
+##########################
+
+##########################
+##########################
+def evaluateWorkbook(book):
+
+    # deep chains of formulas referencing formulas are evaluated recursively
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    state = {'book': book, 'values': {}, 'pending': set(), 'ranges': {}}
+
+    results = {}
+
+    for key, sheet in book['sheets'].items():
+        results[sheet['name']] = {}
+
+        # evaluate in row order so chains down a column stay shallow
+        for (row, col) in sorted(sheet['formulas']):
+            value = cellValue(state, key, row, col)
+
+            # an empty reference shows as 0 in excel
+            if value is None:
+                value = 0.0
+
+            results[sheet['name']][(row, col)] = value
+
+    return results
+##########################
+##########################
+
+
+##########################
+##########################
+def cellValue(state, sheet_key, row, col):
+
+    key = (sheet_key, row, col)
+
+    if key in state['values']:
+        return state['values'][key]
+
+    sheet = state['book']['sheets'][sheet_key]
+
+    if (row, col) not in sheet['formulas']:
+        return sheet['cells'].get((row, col))
+
+    if key in state['pending']:
+        raise UnsupportedFormula(
+            f'Circular reference at {sheet["name"]}!{cellName(row, col)}')
+
+    state['pending'].add(key)
+
+    formula = sheet['formulas'][(row, col)]
+    ctx = {'sheet': sheet_key, 'row': row, 'col': col,
+           'offset': formula['offset'], 'array': formula['array']}
+
+    try:
+        value = evaluate(state, formula['ast'], ctx)
+    except UnsupportedFormula as e:
+        raise UnsupportedFormula(
+            f'{e} in {sheet["name"]}!{cellName(row, col)}')
+
+    # a formula returning a range or array shows its top left value
+    # in the cell, unless it's an array formula spanning several cells
+    if isinstance(value, tuple):
+        value = rangeValues(state, value)
+
+    if isinstance(value, list):
+        value = arrayFormulaValue(state, sheet_key, row, col, formula, value)
+
+    state['pending'].discard(key)
+    state['values'][key] = value
+
+    return value
+##########################
+##########################
+
+
+##########################
+##########################
+def arrayFormulaValue(state, sheet_key, row, col, formula, value):
+
+    # fill the other cells covered by a multi cell array formula
+    if formula['array'] and formula['ref'] and (':' in formula['ref']):
+        ref = parseRef(formula['ref'])
+
+        for r in range(ref[2], ref[4] + 1):
+            for c in range(ref[3], ref[5] + 1):
+                i, j = r - ref[2], c - ref[3]
+
+                if (i < len(value)) and (j < len(value[0])):
+                    v = value[i][j]
+                else:
+                    v = XLError('#N/A')
+
+                state['values'][(sheet_key, r, c)] = v
+
+    return value[0][0]
+##########################
+##########################
+
+
+##########################
+##########################
+def cellName(row, col):
+
+    letters = ''
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+
+    return f'{letters}{row}'
+##########################
+##########################
+
+
+##########################
+##########################
+def resolveRef(state, node, ctx):
+
+    # returns ('range', sheet, r1, c1, r2, c2) with relative
+    # parts shifted for cells that share a formula
+    _, sheet, r1, c1, r2, c2, r1abs, c1abs, r2abs, c2abs = node
+
+    sheet = sheet or ctx['sheet']
+
+    if sheet not in state['book']['sheets']:
+        return XLError('#REF!')
+
+    drow, dcol = ctx['offset']
+
+    if r2 is None:
+        r2 = state['book']['sheets'][sheet]['max_row']
+    else:
+        r1 = r1 if r1abs else r1 + drow
+        r2 = r2 if r2abs else r2 + drow
+
+    c1 = c1 if c1abs else c1 + dcol
+    c2 = c2 if c2abs else c2 + dcol
+
+    return ('range', sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+##########################
+##########################
+
+
+##########################
+##########################
+def rangeValues(state, rng):
+
+    if rng in state['ranges']:
+        return state['ranges'][rng]
+
+    _, sheet, r1, c1, r2, c2 = rng
+
+    values = [[cellValue(state, sheet, r, c) for c in range(c1, c2 + 1)]
+              for r in range(r1, r2 + 1)]
+
+    state['ranges'][rng] = values
+
+    return values
+##########################
+##########################
+
+
+##########################
+##########################
+def evaluate(state, node, ctx):
+
+    # returns a scalar, or a list of rows when the formula works on arrays
+    value = evaluateRef(state, node, ctx)
+
+    if isinstance(value, tuple):
+        value = scalarOrArray(state, value, ctx)
+
+    return value
+##########################
+##########################
+
+
+##########################
+##########################
+def evaluateRef(state, node, ctx):
+
+    # like evaluate(), but references are returned as ranges so that
+    # functions such as SUMIF can see the cells themselves
+    kind = node[0]
+
+    if kind in ('num', 'str', 'bool', 'err'):
+        return node[1]
+
+    elif kind == 'missing':
+        return None
+
+    elif kind == 'ref':
+        return resolveRef(state, node, ctx)
+
+    elif kind == 'unop':
+        value = evaluate(state, node[2], ctx)
+        sign = -1.0 if node[1] == '-' else 1.0
+
+        return elementwise(lambda x: numberOp(lambda a: sign * a, x), value)
+
+    elif kind == 'binop':
+        left = evaluate(state, node[2], ctx)
+        right = evaluate(state, node[3], ctx)
+
+        return elementwise(lambda a, b: binaryOp(node[1], a, b), left, right)
+
+    elif kind == 'func':
+        name = node[1]
+
+        if name not in FUNCTIONS:
+            raise UnsupportedFormula(f'Unsupported Excel function {name}')
+
+        return FUNCTIONS[name](state, node[2], ctx)
+
+    raise UnsupportedFormula(f'Unsupported formula element {kind}')
+##########################
+##########################
+
+
+##########################
+##########################
+def scalarOrArray(state, value, ctx):
+
+    if isinstance(value, XLError):
+        return value
+
+    _, sheet, r1, c1, r2, c2 = value
+
+    if (r1 == r2) and (c1 == c2):
+        return cellValue(state, sheet, r1, c1)
+
+    # array formulas work on the whole range
+    if ctx['array']:
+        return rangeValues(state, value)
+
+    # otherwise excel takes the cell in the same row or column as the formula
+    if (c1 == c2) and (r1 <= ctx['row'] <= r2):
+        return cellValue(state, sheet, ctx['row'], c1)
+
+    if (r1 == r2) and (c1 <= ctx['col'] <= c2):
+        return cellValue(state, sheet, r1, ctx['col'])
+
+    return XLError('#VALUE!')
+##########################
+##########################
+
+
+##########################
+##########################
+def elementwise(fn, *args):
+
+    arrays = [a for a in args if isinstance(a, list)]
+
+    if len(arrays) == 0:
+        return fn(*args)
+
+    nrows = max(len(a) for a in arrays)
+    ncols = max(len(a[0]) for a in arrays)
+
+    def pick(a, i, j):
+        if not isinstance(a, list):
+            return a
+        i = 0 if len(a) == 1 else i
+        j = 0 if len(a[0]) == 1 else j
+        if (i >= len(a)) or (j >= len(a[0])):
+            return XLError('#N/A')
+        return a[i][j]
+
+    return [[fn(*[pick(a, i, j) for a in args]) for j in range(ncols)]
+            for i in range(nrows)]
+##########################
+##########################
+
+
+##########################
+##########################
+def toNumber(x):
+
+    if isinstance(x, XLError):
+        return x
+    if x is None:
+        return 0.0
+    if isinstance(x, bool):
+        return 1.0 if x else 0.0
+    if isinstance(x, float):
+        return x
+    try:
+        return float(x)
+    except ValueError:
+        return XLError('#VALUE!')
+##########################
+##########################
+
+
+##########################
+##########################
+def toText(x):
+
+    if x is None:
+        return ''
+    if isinstance(x, bool):
+        return 'TRUE' if x else 'FALSE'
+    if isinstance(x, float):
+        return formatNumber(x)
+
+    return x
+##########################
+##########################
+
+
+##########################
+##########################
+def toBool(x):
+
+    if isinstance(x, XLError):
+        return x
+    if x is None:
+        return False
+    if isinstance(x, bool):
+        return x
+    if isinstance(x, float):
+        return x != 0
+    if x.upper() in ('TRUE', 'FALSE'):
+        return x.upper() == 'TRUE'
+
+    return XLError('#VALUE!')
+##########################
+##########################
+
+
+##########################
+##########################
+def formatNumber(x):
+
+    if x == int(x) and abs(x) < 1e15:
+        return str(int(x))
+
+    return repr(x)
+##########################
+##########################
+
+
+##########################
+##########################
+def numberOp(fn, *args):
+
+    nums = [toNumber(a) for a in args]
+
+    for n in nums:
+        if isinstance(n, XLError):
+            return n
+
+    try:
+        result = fn(*nums)
+    except ZeroDivisionError:
+        return XLError('#DIV/0!')
+    except (ValueError, OverflowError):
+        return XLError('#NUM!')
+
+    if isinstance(result, complex):
+        return XLError('#NUM!')
+
+    return float(result)
+##########################
+##########################
+
+
+##########################
+##########################
+def compareValues(a, b):
+
+    # excel ordering is numbers < text < booleans.  An empty
+    # cell takes the type of the value it is compared with
+    def rank(x):
+        return 0 if isinstance(x, float) else (2 if isinstance(x, bool) else 1)
+
+    if a is None:
+        a = {0: 0.0, 1: '', 2: False}[rank(b)] if b is not None else 0.0
+    if b is None:
+        b = {0: 0.0, 1: '', 2: False}[rank(a)]
+
+    if rank(a) != rank(b):
+        return -1 if rank(a) < rank(b) else 1
+
+    if isinstance(a, str):
+        a, b = a.lower(), b.lower()
+
+    return (a > b) - (a < b)
+##########################
+##########################
+
+
+##########################
+##########################
+def binaryOp(op, a, b):
+
+    for x in (a, b):
+        if isinstance(x, XLError):
+            return x
+
+    if op == '+':
+        return numberOp(lambda x, y: x + y, a, b)
+    elif op == '-':
+        return numberOp(lambda x, y: x - y, a, b)
+    elif op == '*':
+        return numberOp(lambda x, y: x * y, a, b)
+    elif op == '/':
+        return numberOp(lambda x, y: x / y, a, b)
+    elif op == '^':
+        return numberOp(lambda x, y: x ** y, a, b)
+    elif op == '&':
+        return toText(a) + toText(b)
+
+    cmp = compareValues(a, b)
+
+    return {'=': cmp == 0, '<>': cmp != 0, '<': cmp < 0, '>': cmp > 0,
+            '<=': cmp <= 0, '>=': cmp >= 0}[op]
+##########################
+##########################
+
+
+##########################
+##########################
+def flatten(state, value):
+
+    # all values of a range, array, or scalar
+    if isinstance(value, tuple):
+        value = rangeValues(state, value)
+
+    if isinstance(value, list):
+        return [v for row in value for v in row]
+
+    return [value]
+##########################
+##########################
+
+
+##########################
+##########################
+def collectNumbers(state, args, ctx):
+
+    # numbers for SUM, COUNT, MIN, etc.  Text and empty cells in ranges are
+    # skipped, but values typed directly as arguments are converted
+    nums = []
+
+    for arg in args:
+        value = evaluateRef(state, arg, ctx)
+
+        if isinstance(value, (tuple, list)):
+            for v in flatten(state, value):
+                if isinstance(v, XLError):
+                    return v
+                if isinstance(v, float):
+                    nums.append(v)
+        else:
+            n = toNumber(value)
+            if isinstance(n, XLError):
+                return n
+            nums.append(n)
+
+    return nums
+##########################
+##########################
+
+
+##########################
+##########################
+def makeCriteria(criteria):
+
+    # returns a function testing a cell value against COUNTIF/SUMIF style
+    # criteria, e.g. 3, ">5", "<>dilute", "=", or "conc*"
+    if isinstance(criteria, XLError):
+        return lambda v: isinstance(v, XLError) and v == criteria
+
+    if criteria is None:
+        criteria = 0.0
+
+    if isinstance(criteria, (float, bool)):
+        return lambda v: (v is not None) and (not isinstance(v, XLError)) and compareValues(toNumber(v) if isinstance(v, str) and not isinstance(toNumber(v), XLError) else v, criteria) == 0
+
+    m = re.match(r'(<>|<=|>=|=|<|>)?(.*)$', criteria, re.S)
+    op, operand = m.group(1) or '=', m.group(2)
+
+    if operand == '':
+        if op == '=':
+            return lambda v: v is None or v == ''
+        if op == '<>':
+            return lambda v: not (v is None or v == '')
+
+        # e.g. ">" from ">"&A1 with A1 empty, matches nothing
+        return lambda v: False
+
+    try:
+        target = float(operand)
+    except ValueError:
+        target = {'TRUE': True, 'FALSE': False}.get(operand.upper(), operand)
+
+    if isinstance(target, str) and op in ('=', '<>'):
+        # text match is case insensitive and supports ? and * wildcards
+        pattern = re.compile(''.join(
+            '.*' if ch == '*' else '.' if ch == '?' else re.escape(ch)
+            for ch in re.findall(r'~[*?]|.', target, re.S)
+        ).replace(r'\~\*', r'\*').replace(r'\~\?', r'\?') + r'\Z', re.I | re.S)
+
+        if op == '=':
+            return lambda v: isinstance(v, str) and not isinstance(v, XLError) and pattern.match(v) is not None
+
+        return lambda v: not (isinstance(v, str) and not isinstance(v, XLError) and pattern.match(v) is not None)
+
+    def test(v):
+        if v is None or isinstance(v, XLError):
+            return op == '<>'
+
+        # numeric criteria only match numbers, and text only matches text
+        if isinstance(target, float) and isinstance(v, str):
+            n = toNumber(v)
+            if isinstance(n, XLError):
+                return op == '<>'
+            v = n
+
+        if type(v) is not type(target) and not (isinstance(v, float) and isinstance(target, float)):
+            return op == '<>'
+
+        cmp = compareValues(v, target)
+
+        return {'=': cmp == 0, '<>': cmp != 0, '<': cmp < 0, '>': cmp > 0,
+                '<=': cmp <= 0, '>=': cmp >= 0}[op]
+
+    return test
+##########################
+##########################
+
+
+##########################
+##########################
+def criteriaMask(state, pairs, ctx):
+
+    # pairs of (range node, criteria node).  Returns the cells matching all
+    # criteria, once per criteria value when criteria is an array
+    ranges = []
+    for range_node, crit_node in pairs:
+        rng = evaluateRef(state, range_node, ctx)
+        if not isinstance(rng, tuple):
+            raise UnsupportedFormula('Criteria range must be a cell range')
+        ranges.append(rangeValues(state, rng))
+
+    criteria = [evaluate(state, crit_node, ctx) for _, crit_node in pairs]
+
+    def mask(*crit_values):
+        tests = [makeCriteria(c) for c in crit_values]
+
+        return [[all(t(vals[i][j]) for t, vals in zip(tests, ranges))
+                 for j in range(len(ranges[0][0]))] for i in range(len(ranges[0]))]
+
+    # criteria that are arrays give one mask per element
+    return elementwise(lambda *c: ('mask', mask(*c)), *criteria)
+##########################
+##########################
+
+
+##########################
+##########################
+def applyMask(result, fn):
+
+    return elementwise(lambda m: fn(m[1]), result)
+##########################
+##########################
+
+
+##########################
+##########################
+#   supported excel functions
+##########################
+##########################
+
+def fnSUM(state, args, ctx):
+    nums = collectNumbers(state, args, ctx)
+    return nums if isinstance(nums, XLError) else float(sum(nums))
+
+
+def fnCOUNT(state, args, ctx):
+    count = 0
+    for arg in args:
+        value = evaluateRef(state, arg, ctx)
+        count += sum(1 for v in flatten(state, value) if isinstance(v, float))
+    return float(count)
+
+
+def fnCOUNTA(state, args, ctx):
+    count = 0
+    for arg in args:
+        value = evaluateRef(state, arg, ctx)
+        count += sum(1 for v in flatten(state, value) if v is not None)
+    return float(count)
+
+
+def fnAVERAGE(state, args, ctx):
+    nums = collectNumbers(state, args, ctx)
+    if isinstance(nums, XLError):
+        return nums
+    return float(sum(nums) / len(nums)) if len(nums) > 0 else XLError('#DIV/0!')
+
+
+def fnMIN(state, args, ctx):
+    nums = collectNumbers(state, args, ctx)
+    return nums if isinstance(nums, XLError) else (min(nums) if len(nums) > 0 else 0.0)
+
+
+def fnMAX(state, args, ctx):
+    nums = collectNumbers(state, args, ctx)
+    return nums if isinstance(nums, XLError) else (max(nums) if len(nums) > 0 else 0.0)
+
+
+def fnABS(state, args, ctx):
+    return elementwise(lambda x: numberOp(abs, x), evaluate(state, args[0], ctx))
+
+
+def fnSQRT(state, args, ctx):
+    return elementwise(lambda x: numberOp(math.sqrt, x), evaluate(state, args[0], ctx))
+
+
+def fnINT(state, args, ctx):
+    return elementwise(lambda x: numberOp(math.floor, x), evaluate(state, args[0], ctx))
+
+
+def roundHalfUp(x, digits):
+    # excel rounds halves away from zero
+    factor = 10 ** digits
+    return math.copysign(math.floor(abs(x) * factor + 0.5) / factor, x)
+
+
+def fnROUND(state, args, ctx):
+    digits = evaluate(state, args[1], ctx) if len(args) > 1 else 0.0
+    return elementwise(lambda x, d: numberOp(lambda a, b: roundHalfUp(a, int(b)), x, d),
+                       evaluate(state, args[0], ctx), digits)
+
+
+def fnROUNDUP(state, args, ctx):
+    digits = evaluate(state, args[1], ctx) if len(args) > 1 else 0.0
+    return elementwise(lambda x, d: numberOp(lambda a, b: math.copysign(math.ceil(abs(a) * 10 ** int(b)) / 10 ** int(b), a), x, d),
+                       evaluate(state, args[0], ctx), digits)
+
+
+def fnROUNDDOWN(state, args, ctx):
+    digits = evaluate(state, args[1], ctx) if len(args) > 1 else 0.0
+    return elementwise(lambda x, d: numberOp(lambda a, b: math.copysign(math.floor(abs(a) * 10 ** int(b)) / 10 ** int(b), a), x, d),
+                       evaluate(state, args[0], ctx), digits)
+
+
+def fnIF(state, args, ctx):
+    cond = evaluate(state, args[0], ctx)
+
+    def branch(i):
+        if (i >= len(args)) or (args[i] == ('missing',)):
+            return False if i >= len(args) else 0.0
+        return evaluate(state, args[i], ctx)
+
+    if isinstance(cond, list):
+        yes, no = branch(1), branch(2)
+        return elementwise(lambda c, y, n: c if isinstance(toBool(c), XLError) else (y if toBool(c) else n),
+                           cond, yes, no)
+
+    cond = toBool(cond)
+    if isinstance(cond, XLError):
+        return cond
+
+    return branch(1) if cond else branch(2)
+
+
+def fnIFS(state, args, ctx):
+    for i in range(0, len(args) - 1, 2):
+        cond = toBool(evaluate(state, args[i], ctx))
+        if isinstance(cond, XLError):
+            return cond
+        if cond:
+            return evaluate(state, args[i + 1], ctx)
+    return XLError('#N/A')
+
+
+def fnIFERROR(state, args, ctx):
+    value = evaluate(state, args[0], ctx)
+    alt = evaluate(state, args[1], ctx)
+    return elementwise(lambda v, a: a if isinstance(v, XLError) else v, value, alt)
+
+
+def fnIFNA(state, args, ctx):
+    value = evaluate(state, args[0], ctx)
+    alt = evaluate(state, args[1], ctx)
+    return elementwise(lambda v, a: a if v == XLError('#N/A') and isinstance(v, XLError) else v, value, alt)
+
+
+def logical(state, args, ctx, combine):
+    values = []
+    for arg in args:
+        value = evaluateRef(state, arg, ctx)
+        if isinstance(value, (tuple, list)):
+            # text and empty cells in ranges are ignored
+            values += [v for v in flatten(state, value)
+                       if isinstance(v, (float, bool, XLError))]
+        else:
+            values.append(value)
+
+    bools = [toBool(v) for v in values]
+    for b in bools:
+        if isinstance(b, XLError):
+            return b
+
+    return combine(bools) if len(bools) > 0 else XLError('#VALUE!')
+
+
+def fnAND(state, args, ctx):
+    return logical(state, args, ctx, all)
+
+
+def fnOR(state, args, ctx):
+    return logical(state, args, ctx, any)
+
+
+def fnNOT(state, args, ctx):
+    return elementwise(lambda x: x if isinstance(toBool(x), XLError) else not toBool(x),
+                       evaluate(state, args[0], ctx))
+
+
+def fnSUMIF(state, args, ctx):
+    result = criteriaMask(state, [(args[0], args[1])], ctx)
+    sum_node = args[2] if len(args) > 2 else args[0]
+    sum_rng = evaluateRef(state, sum_node, ctx)
+
+    # sum range is sized like the criteria range from its top left cell
+    crit_rng = evaluateRef(state, args[0], ctx)
+    nrows, ncols = crit_rng[4] - crit_rng[2], crit_rng[5] - crit_rng[3]
+    sum_rng = ('range', sum_rng[1], sum_rng[2], sum_rng[3],
+               sum_rng[2] + nrows, sum_rng[3] + ncols)
+    sums = rangeValues(state, sum_rng)
+
+    def total(mask):
+        s = 0.0
+        for i, row in enumerate(mask):
+            for j, m in enumerate(row):
+                if m:
+                    if isinstance(sums[i][j], XLError):
+                        return sums[i][j]
+                    if isinstance(sums[i][j], float):
+                        s += sums[i][j]
+        return s
+
+    return applyMask(result, total)
+
+
+def fnSUMIFS(state, args, ctx):
+    pairs = [(args[i], args[i + 1]) for i in range(1, len(args) - 1, 2)]
+    result = criteriaMask(state, pairs, ctx)
+    sums = rangeValues(state, evaluateRef(state, args[0], ctx))
+
+    def total(mask):
+        return float(sum(sums[i][j] for i, row in enumerate(mask)
+                         for j, m in enumerate(row) if m and isinstance(sums[i][j], float)))
+
+    return applyMask(result, total)
+
+
+def fnCOUNTIF(state, args, ctx):
+    result = criteriaMask(state, [(args[0], args[1])], ctx)
+    return applyMask(result, lambda mask: float(sum(sum(row) for row in mask)))
+
+
+def fnCOUNTIFS(state, args, ctx):
+    pairs = [(args[i], args[i + 1]) for i in range(0, len(args) - 1, 2)]
+    result = criteriaMask(state, pairs, ctx)
+    return applyMask(result, lambda mask: float(sum(sum(row) for row in mask)))
+
+
+def fnAVERAGEIF(state, args, ctx):
+    count = fnCOUNTIF(state, args[:2], ctx)
+    total = fnSUMIF(state, args, ctx)
+    return elementwise(lambda s, c: numberOp(lambda a, b: a / b, s, c), total, count)
+
+
+def lookupTable(state, node, ctx):
+    table = evaluateRef(state, node, ctx)
+    if isinstance(table, tuple):
+        table = rangeValues(state, table)
+    if not isinstance(table, list):
+        table = [[table]]
+    return table
+
+
+def fnVLOOKUP(state, args, ctx):
+    lookup = evaluate(state, args[0], ctx)
+    table = lookupTable(state, args[1], ctx)
+    col = evaluate(state, args[2], ctx)
+    approx = toBool(evaluate(state, args[3], ctx)) if len(args) > 3 else True
+
+    def find(value, col):
+        col = toNumber(col)
+        if isinstance(value, XLError):
+            return value
+        if isinstance(col, XLError):
+            return col
+        col = int(col)
+        if (col < 1) or (col > len(table[0])):
+            return XLError('#REF!')
+        if value is None:
+            return XLError('#N/A')
+
+        match = None
+        for row in table:
+            key = row[0]
+            if key is None or isinstance(key, XLError):
+                continue
+            cmp = compareValues(key, value)
+            if not approx:
+                if cmp == 0 and (isinstance(key, str) == isinstance(value, str)):
+                    match = row
+                    break
+            else:
+                # approximate match assumes first column is sorted ascending
+                if cmp <= 0 and (isinstance(key, str) == isinstance(value, str)):
+                    match = row
+                elif cmp > 0:
+                    break
+
+        if match is None:
+            return XLError('#N/A')
+
+        return 0.0 if match[col - 1] is None else match[col - 1]
+
+    return elementwise(find, lookup, col)
+
+
+def fnMATCH(state, args, ctx):
+    lookup = evaluate(state, args[0], ctx)
+    values = [v for row in lookupTable(state, args[1], ctx) for v in row]
+    match_type = toNumber(evaluate(state, args[2], ctx)) if len(args) > 2 else 1.0
+
+    def find(value):
+        if isinstance(value, XLError):
+            return value
+        found = None
+        for i, v in enumerate(values):
+            if v is None or isinstance(v, XLError):
+                continue
+            cmp = compareValues(v, value)
+            if match_type == 0:
+                if cmp == 0:
+                    return float(i + 1)
+            elif (match_type > 0 and cmp <= 0) or (match_type < 0 and cmp >= 0):
+                found = float(i + 1)
+            else:
+                break
+        return found if (found is not None and match_type != 0) else XLError('#N/A')
+
+    return elementwise(find, lookup)
+
+
+def fnINDEX(state, args, ctx):
+    table = lookupTable(state, args[0], ctx)
+    row = toNumber(evaluate(state, args[1], ctx))
+    col = toNumber(evaluate(state, args[2], ctx)) if len(args) > 2 else 1.0
+    for n in (row, col):
+        if isinstance(n, XLError):
+            return n
+    # a single row or column can be indexed by position alone
+    if len(table) == 1 and len(args) == 2:
+        row, col = 1.0, row
+    row, col = int(row), int(col)
+    if (row < 1) or (col < 1) or (row > len(table)) or (col > len(table[0])):
+        return XLError('#REF!')
+    value = table[row - 1][col - 1]
+    return 0.0 if value is None else value
+
+
+def fnISBLANK(state, args, ctx):
+    return elementwise(lambda v: v is None, evaluate(state, args[0], ctx))
+
+
+def fnISNUMBER(state, args, ctx):
+    return elementwise(lambda v: isinstance(v, float), evaluate(state, args[0], ctx))
+
+
+def fnISERROR(state, args, ctx):
+    return elementwise(lambda v: isinstance(v, XLError), evaluate(state, args[0], ctx))
+
+
+def fnISNA(state, args, ctx):
+    return elementwise(lambda v: isinstance(v, XLError) and v == '#N/A', evaluate(state, args[0], ctx))
+
+
+def fnCONCATENATE(state, args, ctx):
+    values = [evaluate(state, a, ctx) for a in args]
+    return elementwise(lambda *v: next((x for x in v if isinstance(x, XLError)), None) or ''.join(toText(x) for x in v), *values)
+
+
+def textFunction(fn):
+    def wrapped(state, args, ctx):
+        values = [evaluate(state, a, ctx) for a in args]
+        return elementwise(lambda *v: next((x for x in v if isinstance(x, XLError)), None) or fn(*v), *values)
+    return wrapped
+
+
+FUNCTIONS = {
+    'SUM': fnSUM, 'COUNT': fnCOUNT, 'COUNTA': fnCOUNTA, 'AVERAGE': fnAVERAGE,
+    'MIN': fnMIN, 'MAX': fnMAX, 'ABS': fnABS, 'SQRT': fnSQRT, 'INT': fnINT,
+    'ROUND': fnROUND, 'ROUNDUP': fnROUNDUP, 'ROUNDDOWN': fnROUNDDOWN,
+    'IF': fnIF, 'IFS': fnIFS, 'IFERROR': fnIFERROR, 'IFNA': fnIFNA,
+    'AND': fnAND, 'OR': fnOR, 'NOT': fnNOT,
+    'SUMIF': fnSUMIF, 'SUMIFS': fnSUMIFS, 'COUNTIF': fnCOUNTIF, 'COUNTIFS': fnCOUNTIFS,
+    'AVERAGEIF': fnAVERAGEIF, 'VLOOKUP': fnVLOOKUP, 'MATCH': fnMATCH, 'INDEX': fnINDEX,
+    'ISBLANK': fnISBLANK, 'ISNUMBER': fnISNUMBER, 'ISERROR': fnISERROR, 'ISNA': fnISNA,
+    'CONCATENATE': fnCONCATENATE,
+    'LEFT': textFunction(lambda s, n=1.0: toText(s)[:int(toNumber(n))]),
+    'RIGHT': textFunction(lambda s, n=1.0: toText(s)[-int(toNumber(n)):] if int(toNumber(n)) > 0 else ''),
+    'MID': textFunction(lambda s, start, n: toText(s)[int(toNumber(start)) - 1:int(toNumber(start)) - 1 + int(toNumber(n))]),
+    'LEN': textFunction(lambda s: float(len(toText(s)))),
+    'VALUE': textFunction(lambda s: toNumber(s)),
+}
+
+
+##########################
+##########################
+#   writing cached values back
+##########################
+##########################
+
+CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+
+
+##########################
+##########################
+def patchSheetXml(xml_text, values):
+
+    # rewrite the <v> element and type attribute of every formula cell.
+    # Done on the raw xml so namespaces, styles, etc. are kept exactly
+    def patch(m):
+        attrs, inner = m.group(1), m.group(2)
+
+        if (inner is None) or ('<f' not in inner):
+            return m.group(0)
+
+        ref = re.search(r'\br="([A-Z]+\d+)"', attrs).group(1)
+        value = values.get(splitCellRef(ref))
+
+        if value is None:
+            return m.group(0)
+
+        if isinstance(value, XLError):
+            t, text = 'e', str(value)
+        elif isinstance(value, bool):
+            t, text = 'b', '1' if value else '0'
+        elif isinstance(value, float):
+            t, text = None, formatNumber(value)
+        else:
+            t, text = 'str', escape(value)
+
+        attrs = re.sub(r'\st="[^"]*"', '', attrs)
+        if t is not None:
+            attrs += f' t="{t}"'
+
+        inner = re.sub(r'<v>.*?</v>|<v/>', '', inner, flags=re.S)
+        inner = re.sub(r'(<f\b[^>]*?/>|<f\b[^>]*>.*?</f>)',
+                       lambda f: f.group(1) + f'<v>{text}</v>', inner, count=1, flags=re.S)
+
+        return f'<c{attrs}>{inner}</c>'
+
+    return CELL_RE.sub(patch, xml_text)
+##########################
+##########################
+
+
+##########################
+##########################
+def readCachedValues(path):
+
+    # cached value of every formula cell, as last written by excel or this module.
+    # Used to compare engines
+    book = readWorkbook(Path(path))
+    cached = {}
+
+    with zipfile.ZipFile(path, 'r') as z:
+        shared = []
+        if 'xl/sharedStrings.xml' in z.namelist():
+            root = ET.fromstring(z.read('xl/sharedStrings.xml'))
+            shared = [''.join(t.text or '' for t in si.iter(f"{{{NS['m']}}}t"))
+                      for si in root.findall('m:si', NS)]
+
+    for sheet in book['sheets'].values():
+        root = ET.fromstring(book['xml'][sheet['xml_path']])
+        for c in root.iter(f"{{{NS['m']}}}c"):
+            if c.find('m:f', NS) is None:
+                continue
+            v = c.find('m:v', NS)
+            t = c.get('t', 'n')
+            if v is None or v.text is None:
+                value = None
+            elif t == 'e':
+                value = XLError(v.text)
+            elif t == 'b':
+                value = v.text == '1'
+            elif t == 's':
+                value = shared[int(v.text)]
+            elif t == 'str':
+                value = v.text
+            else:
+                value = float(v.text)
+            cached[(sheet['name'], c.get('r'))] = value
+
+    return cached
+##########################
+##########################
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+# Find the Fragment Analyzer "Smear Analysis Result.csv" files of an FA step.
+#
+# The FA output is copied into the step's folder as
+# <folder>/<run folder>/<plate folder>/... Smear Analysis Result.csv, where
+# the plate folder name starts with the FA plate barcode, e.g. "XNQYOQ-1F 2024
+# 05 01".  findFAfiles() lists the plate folders and checks them on several
+# threads.  It only reads the Sample ID column of each file, and stops at the
+# first sample from the folder's plate.  The files are used where they are,
+# they are no longer copied into the step's folder as <plate>.csv.
+#
+# The files found are saved in fa_result_manifest.json in the step's folder,
+# with the paths, sizes and modification times of the files and folders.  If
+# nothing has changed since, the next run of the step reuses the manifest
+# instead of searching and checking the folders again.  Set SIP_FA_MANIFEST=0
+# to always search.
+#
+# readSmearFiles() reads all the files into one frame of library wells.  The
+# ladder, empty and LibStd wells are dropped with one regex, and the sample
+# names are split into destination plate, sample and fraction columns in one
+# pass over all plates.  Plate and sample are categorical.  Column names get
+# the attempt's prefix, e.g. Redo_nmole/L.
+#
+# USAGE:   import fa_results
+#          fa_files = fa_results.findFAfiles(crnt_dir)          {'XNQYOQ-1F.csv': path, ...}
+#          fa_files = fa_results.findFAfiles(crnt_dir, plate_name=fa_results.fa12PlateName)
+#          fa_df, fa_dest_plates = fa_results.readSmearFiles(fa_files, prefix='Redo_')
+
+
+import os
+import re
+import sys
+import csv
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+RESULT_SUFFIX = 'Smear Analysis Result.csv'
+
+MANIFEST_FILE = 'fa_result_manifest.json'
+
+WORKERS = 8
+
+# wells of the FA plate that don't hold libraries, case insensitive
+CONTROL_WELLS = re.compile('empty|ladder|LibStd', re.IGNORECASE)
+
+# <destination plate>_<sample>_<fraction>
+SAMPLE_ID = r'^(?P<plate>[^_]*)_(?P<sample>[^_]*)_(?P<fraction>[^_]*)$'
+
+SMEAR_COLS = ['Well', 'Sample ID', 'ng/uL', 'nmole/L', 'Avg. Size']
+
+# smear analysis column: name in the FA frame, before the attempt's prefix
+SMEAR_NAMES = {'Well': 'FA_Well', 'Sample ID': 'FA_Sample_ID'}
+
+
+##########################
+##########################
+def useManifest():
+
+    return os.environ.get('SIP_FA_MANIFEST', '1') != '0'
+##########################
+##########################
+
+
+##########################
+##########################
+def smearPlateName(sample_id):
+
+    # library sample names are <destination plate>_<sample>_<fraction>, and
+    # the FA plate barcode is the destination plate + 'F'
+    return sample_id.split('_')[0] + 'F'
+##########################
+##########################
+
+
+##########################
+##########################
+def fa12PlateName(sample_id):
+
+    # FA12 pool sample names are <FA plate>.<pool>
+    return sample_id.split('.')[0]
+##########################
+##########################
+
+
+##########################
+##########################
+def hasPlateSample(path, folder_name, plate_name=smearPlateName):
+
+    # read the Sample ID column row by row until a sample from folder_name is found
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        reader = csv.reader(f)
+
+        header = next(reader, [])
+
+        if 'Sample ID' not in header:
+            return False
+
+        col = header.index('Sample ID')
+
+        for row in reader:
+            if (len(row) > col) and row[col] and (plate_name(row[col]) == folder_name):
+                return True
+
+    return False
+##########################
+##########################
+
+
+##########################
+##########################
+def listPlateFolders(crnt_dir):
+
+    # folders two levels down, run folder / plate folder
+    folders = []
+
+    for direct in os.scandir(crnt_dir):
+        if direct.is_dir():
+            for fa in os.scandir(direct.path):
+                if fa.is_dir():
+                    folders.append(fa.path)
+
+    return folders
+##########################
+##########################
+
+
+##########################
+##########################
+def scanPlateFolder(folder):
+
+    # plate name from the folder name, and the smear analysis files in the folder
+    folder_name = os.path.basename(folder).split(' ')[0]
+
+    return [(folder_name, os.path.join(folder, file)) for file in os.listdir(folder) if file.endswith(RESULT_SUFFIX)]
+##########################
+##########################
+
+
+##########################
+##########################
+def getStamps(crnt_dir, paths):
+
+    # size and modification time of each file or folder, keyed by path relative to crnt_dir
+    stamps = {}
+
+    for p in paths:
+        st = os.stat(p)
+        stamps[os.path.relpath(p, crnt_dir)] = [st.st_size, st.st_mtime_ns]
+
+    return stamps
+##########################
+##########################
+
+
+##########################
+##########################
+def getRunFolders(crnt_dir):
+
+    return sorted(d.path for d in os.scandir(crnt_dir) if d.is_dir())
+##########################
+##########################
+
+
+##########################
+##########################
+def writeManifest(crnt_dir, fa_files, folders, plate_name):
+
+    # folder modification times change when files or folders are added or removed
+    manifest = {'plate_name': plate_name.__name__,
+                'files': {k: os.path.relpath(p, crnt_dir) for k, p in fa_files.items()},
+                'stamps': getStamps(crnt_dir, getRunFolders(crnt_dir) + folders + list(fa_files.values()))}
+
+    with open(Path(crnt_dir) / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def readManifest(crnt_dir, plate_name):
+
+    # files of the last search, or None if anything may have changed since
+    manifest_path = Path(crnt_dir) / MANIFEST_FILE
+
+    if not useManifest() or not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        if manifest['plate_name'] != plate_name.__name__:
+            return None
+
+        stamps = manifest['stamps']
+
+        run_folders = [os.path.relpath(p, crnt_dir) for p in getRunFolders(crnt_dir)]
+
+        if any(r not in stamps for r in run_folders):
+            return None
+
+        if getStamps(crnt_dir, [os.path.join(crnt_dir, p) for p in stamps]) != stamps:
+            return None
+
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    return {k: os.path.join(crnt_dir, p) for k, p in manifest['files'].items()}
+##########################
+##########################
+
+
+##########################
+##########################
+def findFAfiles(crnt_dir, plate_name=smearPlateName, workers=WORKERS):
+
+    # returns {'<plate>.csv': path to its smear analysis file}
+    fa_files = readManifest(crnt_dir, plate_name)
+
+    if fa_files is not None:
+        print(f'\nUsing the FA output files found last time, see {MANIFEST_FILE}\n')
+        return fa_files
+
+    folders = listPlateFolders(crnt_dir)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        found = [r for rs in executor.map(scanPlateFolder, folders) for r in rs]
+
+        # confirm folder name matches plate name parsed from smear analysis
+        # .csv sample names
+        matched = list(executor.map(lambda r: hasPlateSample(r[1], r[0], plate_name), found))
+
+    fa_files = {}
+
+    for (folder_name, path), ok in zip(found, matched):
+        if not ok:
+            print(f'\n\nThere is a mismatch between FA plate ID and sample names for plate {folder_name}.  Aborting script\n')
+            sys.exit()
+
+        if f'{folder_name}.csv' in fa_files:
+            print(f'\n\nFound more than one FA output file for plate {folder_name}.  Aborting script\n')
+            sys.exit()
+
+        fa_files[f'{folder_name}.csv'] = path
+
+    # quit script if directory doesn't contain FA .csv files
+    if len(fa_files) == 0:
+        print("\n\n Did not find any FA output files.  Aborting program\n\n")
+        sys.exit()
+
+    writeManifest(crnt_dir, fa_files, folders, plate_name)
+
+    return fa_files
+##########################
+##########################
+
+
+##########################
+##########################
+def dropControlWells(fa_df, id_col='Sample ID'):
+
+    # rows without a sample name are dropped too
+    return fa_df[~fa_df[id_col].str.contains(CONTROL_WELLS, na=True)]
+##########################
+##########################
+
+
+##########################
+##########################
+def readSmearFiles(fa_files, prefix=''):
+
+    # returns the library wells of all files in one frame, and the
+    # destination plates found in each file
+    frames = [pd.read_csv(path, usecols=SMEAR_COLS, dtype={'Well': str, 'Sample ID': str})
+              for path in fa_files.values()]
+
+    if len(frames) == 0:
+        print("\n\n Did not sucessfully extract FA files\n\n")
+        sys.exit()
+
+    file_num = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+
+    fa_df = pd.concat(frames, ignore_index=True)
+
+    keep = ~fa_df['Sample ID'].str.contains(CONTROL_WELLS, na=True).to_numpy()
+
+    fa_df = fa_df[keep].reset_index(drop=True)
+    file_num = file_num[keep]
+
+    fa_df['Well'] = fa_df['Well'].str.replace(':', '', regex=False)
+
+    parts = fa_df['Sample ID'].str.extract(SAMPLE_ID)
+
+    if parts.isnull().any(axis=None) or not parts['fraction'].str.isdigit().all():
+        bad = fa_df.loc[parts.isnull().any(axis=1) | ~parts['fraction'].str.isdigit().fillna(False), 'Sample ID']
+        print(f'\n\nCould not parse FA sample names, expected <plate>_<sample>_<fraction>: {bad.tolist()[:5]}.  Aborting script\n')
+        sys.exit()
+
+    for c in ['ng/uL', 'nmole/L', 'Avg. Size']:
+        fa_df[c] = fa_df[c].fillna(0).astype(float)
+
+    fa_df['FA_Destination_plate'] = parts['plate'].astype('category')
+    fa_df['FA_Sample'] = parts['sample'].astype('category')
+    fa_df['FA_Fraction'] = parts['fraction'].astype(int)
+
+    fa_df = fa_df.rename(columns=SMEAR_NAMES)
+    fa_df = fa_df.rename(columns={c: f'{prefix}{c}' for c in fa_df.columns})
+
+    # destination plates of each file, in file order
+    plates = pd.DataFrame({'file': file_num, 'plate': parts['plate'].to_numpy()}).drop_duplicates()
+
+    return fa_df, plates['plate'].tolist()
+##########################
+##########################
@@ -10,9 +10,16 @@ from xlutils.copy import copy
 import xlwt
 from datetime import datetime
 from pathlib import Path
-from sqlalchemy import create_engine
 import shutil
 
+import lazy_import
+import archive_store
+import sip_params
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+
 
 ##########################
 ##########################
@@ -22,7 +29,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR / 'lib_info_submitted_to_clarity.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM lib_info_submitted_to_clarity"
@@ -54,7 +61,7 @@ def updateSQLdb(lb_info_df):
 
     sql_db_path = PROJECT_DIR /'lib_info.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
 
     # Specify the table name and database engine
@@ -202,8 +209,8 @@ def updateLibCreationFile(my_sheet, my_merged_df, my_lib_plate):
 
     target_aliquot_vol = 5
 
-    pcr_cycle = int(input(
-        f"\nEnter number of PCR cycles used in library creation for {my_lib_plate} (default = 12):") or 12)
+    pcr_cycle = int(sip_params.ask('pcr_cycles', 
+        f"\nEnter number of PCR cycles used in library creation for {my_lib_plate} (default = 12):", key=my_lib_plate) or 12)
 
     # overwrite all cell values from row 26-500 and col 1-21 to create blank slate in lib info area of .xls file
     for r in range(26, 500, 1):
@@ -333,7 +340,7 @@ def findMissingPlateFiles(lib_df, completed_plates):
         print(
             f'\n\nWARNING!!!   WARNING!!!   WARNING!!!\n\nThe library plates below were NOT processed in clarity lib creation files:\n\n{missing_plates}\n\n')
 
-        keep_going = input(
+        keep_going = sip_params.ask('continue_missing_plates', 
             'Would you like to autofill clarity creation files for ONLY some the library plates? (Y/N)\n')
 
         if (keep_going == 'Y' or keep_going == 'y'):
@@ -369,7 +376,7 @@ def addClarityInfoToLibInfo(summary_df, lib_name_df):
         """
         print(f'\n\n{message}\n\n')
 
-        keep_going = input(
+        keep_going = sip_params.ask('continue_missing_clarity_ids', 
             'Would you like to autofill clarity creation files for ONLY some the library plates? (Y/N)\n')
 
         if (keep_going == 'Y' or keep_going == 'y'):
@@ -432,7 +439,7 @@ def createSQLdb(updated_df):
 
     sql_db_path = PROJECT_DIR /'lib_info_submitted_to_clarity.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
 
     # Specify the table name and database engine
@@ -452,6 +459,8 @@ def createSQLdb(updated_df):
 ##########################
 # MAIN PROGRAM
 ##########################
+step_metrics.timeFunctions(globals())
+
 
 prjct_dir = os.getcwd()
 
@@ -523,9 +532,8 @@ createSQLdb(updated_df)
 
 
 # arive the current lib_info_submitted_to_clarity.csv
-Path(PROJECT_DIR /
-     "lib_info_submitted_to_clarity.csv").rename(ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity_{date}.csv")
-Path(ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity_{date}.csv").touch()
+archive_store.archiveFile(PROJECT_DIR / "lib_info_submitted_to_clarity.csv",
+                          ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity_{date}.csv")
 
 # create updated lib_info_submitted_to_clarity.csv file
 updated_df.to_csv(
@@ -536,3 +544,4 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/fill.clarity.lib.creation.sheet.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/fill.clarity.lib.creation.sheet.success')
@@ -6,15 +6,21 @@ import pandas as pd
 import numpy as np
 import sys
 import os
-import xlwings as xw
 import shutil
 from datetime import datetime
 from pathlib import Path
-import openpyxl
 import string
 import random
 import math
-from sqlalchemy import create_engine
+
+import lazy_import
+import excel_recalc
+import plate_geometry
+import step_metrics
+
+# imported when first used, see lazy_import.py
+openpyxl = lazy_import.lazyModule('openpyxl')
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
 
 
 
@@ -26,7 +32,7 @@ def readSQLdb(my_prjct_dir):
     sql_db_path = f'{my_prjct_dir}/lib_info_submitted_to_clarity.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM lib_info_submitted_to_clarity"
@@ -80,30 +86,13 @@ def findPoolFile(crnt_dir):
 ##########################
 def fixExcelFile(pool_file):
     
-    # rename Pool prep .xlsx file with '~$' appened to start of file name
-    # this simulates Microsoft name format for temporary files, and changing
-    # the name to this temporary format is necessary so excel on Mac can open
-    # the .xlsx files the first time without granting access file by file
-    # the name will be changed back to the original format when donde
-    
-    # Use full path for file operations
-    pool_file_path = Path(crnt_dir) / pool_file
-    temp_name_path = Path(crnt_dir) / ("~$" + pool_file)
-    
-    os.rename(pool_file_path, temp_name_path)
-    
-    
-    
-    # open pool prep .xlsx file in excel, save, and close
+    # refresh cached formula values in pool prep .xlsx file
     # this resovles an error where .xlsx formulas stop working, e.g.
-    # values are not imported into pandas
-    app = xw.App(visible=False)
-    book = app.books.open(str(temp_name_path))
-    book.save()
-    app.kill()
-    
-    #rename density .xlsx file by removing the '~$' from the start of the file name
-    os.rename(temp_name_path, pool_file_path)
+    # values are not imported into pandas.  Uses excel via xlwings,
+    # or pure python when SIP_RECALC_ENGINE=python
+    pool_file_path = Path(crnt_dir) / pool_file
+
+    excel_recalc.recalcWorkbook(pool_file_path)
     
 ##########################
 ##########################
@@ -574,28 +563,12 @@ def makePippinBarcodeFile(my_pippin_df):
 # this verseion fo function assuming pool will be split into 1 pippin lane
 def getWellList(my_FA_df):
 
-    # list will be refernced to convert row number into row letter
-    row_list = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-
-    well_list = []
-
     num_fa_wells = len(my_FA_df['Dest_Tube_Size_Selected'].unique().tolist())
 
     num_rows = math.ceil(num_fa_wells/10)
 
-    for i in range(1, (12*num_rows)+1):
-
-        # set row number as floor after dividing by 12
-        r = math.floor((i-1)/12)
-
-        # set column number as modulo of 12
-        c = ((i) % 12)
-
-        if c == 0:
-            well_list.append(row_list[r]+'12')
-
-        else:
-            well_list.append(row_list[r]+str(c))
+    # whole rows of the FA plate, A1, A2, ... A12, B1, ...
+    well_list = plate_geometry.getWellList(96, order='row')[:12*num_rows]
 
     return well_list, num_rows
 ##########################
@@ -706,6 +679,8 @@ def makeFAinputFiles(my_pippin_df, my_dest_list):
 ##########################
 # MAIN PROGRAM
 ##########################
+step_metrics.timeFunctions(globals())
+
 
 PROJECT_DIR = Path.cwd()
 
@@ -809,3 +784,4 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/finish.pooling.libs.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/finish.pooling.libs.success')
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+# Shared readers for the per-plate instrument files found in
+# 3_merge_density_vol_conc_files, i.e. the Quant-iT DNA conc .txt,
+# the VolumeCheck .CSV, and the density .xlsx for each SIP fraction plate.
+#
+# Parsed frames are kept in a project-local cache (.input_cache) so that
+# calcSequinAddition.py, plot_DNAconc_vs_Density.py, pre_vs_post_dna_conc_plots.py
+# and merge.SIP.fraction.files.loop.py don't each re-parse the same files.
+# readPlateVolumes() also checks a plate's volume file and converts its tube
+# positions, A01 --> A1, for the whole column at once.
+# Entries are keyed by file path, size, mtime, and content hash, so an edited
+# file (e.g. a density .xlsx updated with sequin masses) is always re-parsed,
+# and by CACHE_VERSION, which must be bumped whenever a parser changes the
+# frame it returns so frames cached by the old parser aren't used.
+# Set SIP_INPUT_CACHE=0 to turn the cache off.
+#
+# USAGE:   import fraction_plate_io
+#          conc_df = fraction_plate_io.readConcFile(conc_path)
+
+
+import io
+import os
+import sys
+import hashlib
+from pathlib import Path
+import pandas as pd
+import numpy as np
+
+# parquet is used for cache entries when pyarrow is installed
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+# project-local folder holding parsed input frames
+CACHE_DIR = Path.cwd() / ".input_cache"
+
+# least recently used entries are removed once the cache exceeds this size
+CACHE_MAX_BYTES = int(os.environ.get(
+    'SIP_INPUT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# part of every cache key, bump it when any parser's output changes
+CACHE_VERSION = 2
+
+
+##########################
+##########################
+def parseConcFile(conc_path, clamp_at=0.001, decimals=3):
+
+    # read the plate reader export once into memory, dropping the blank
+    # lines it contains, instead of round-tripping through a tmp_conc.txt
+    # file in the working directory
+    with open(conc_path, 'r') as file:
+        conc_text = ''.join(line for line in file if not line.isspace())
+
+    my_DNA_conc_df = pd.read_csv(io.StringIO(conc_text), sep='\t', header=1, usecols=['Well ID', 'Well', '[Concentration]'],
+                                 converters={'[Concentration]': str}, skip_blank_lines=True)
+
+    # remove empty lines with NaN
+    my_DNA_conc_df.dropna(inplace=True)
+
+    # remove blanks and standards from dataframe and keep only rows with "SPL" in well ID
+    my_DNA_conc_df = my_DNA_conc_df.loc[my_DNA_conc_df['Well ID'].str.contains(
+        'SPL')]
+
+    my_DNA_conc_df = my_DNA_conc_df.drop(columns=['Well ID'])
+
+    # remove "<" character from dna conc for samples below detection limit
+    # and convert to float in the same pass
+    conc = my_DNA_conc_df["[Concentration]"].str.replace(
+        '<', '', regex=False).astype(float)
+
+    # replace dna conc values <= clamp_at with 0.001 ng/ul.  Clarity/ITS won't accept a conc <= 0
+    my_DNA_conc_df["[Concentration]"] = np.where(conc <= clamp_at, 0.001, conc)
+
+    # round DNA concentration
+    if decimals is not None:
+        my_DNA_conc_df = my_DNA_conc_df.round({'[Concentration]': decimals})
+
+    return my_DNA_conc_df
+##########################
+##########################
+
+
+##########################
+##########################
+def parseVolumeFile(vol_path):
+
+    # import volume check file
+    my_volume_df = pd.read_csv(vol_path, header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], dtype={
+        'TUBE': str, 'RACKID': str, 'VOLAVG': 'float64'}, skip_blank_lines=True)
+
+    return my_volume_df
+##########################
+##########################
+
+
+##########################
+##########################
+def parseDensityFile(dens_path):
+
+    # import the whole density sheet.  Scripts select the columns they need,
+    # so one cached copy of the sheet can be shared by all of them
+    my_density_df = pd.read_excel(dens_path, header=0, engine=("openpyxl"),
+                                  converters={'Plate barcode': str, 'Sample barcode': str, 'Fraction #': int, 'Spike-in Mass (pg)': float})
+
+    return my_density_df
+##########################
+##########################
+
+
+##########################
+##########################
+def useCache():
+
+    return os.environ.get('SIP_INPUT_CACHE', '1') != '0'
+##########################
+##########################
+
+
+##########################
+##########################
+def getCacheKey(path, parser, args):
+
+    stat = os.stat(path)
+
+    # hash file contents so a file replaced with an identical size and mtime
+    # is still detected as changed
+    with open(path, 'rb') as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+
+    key = f'{CACHE_VERSION}|{parser.__name__}|{args!r}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{content_hash}'
+
+    return hashlib.sha256(key.encode()).hexdigest()
+##########################
+##########################
+
+
+##########################
+##########################
+def loadCacheEntry(key):
+
+    for entry in [CACHE_DIR / f'{key}.parquet', CACHE_DIR / f'{key}.pkl']:
+        if entry.exists():
+            try:
+                if entry.suffix == '.parquet':
+                    df = pd.read_parquet(entry)
+                else:
+                    df = pd.read_pickle(entry)
+            except Exception:
+                # unreadable entry, e.g. partly written. Drop it and re-parse
+                entry.unlink(missing_ok=True)
+                return None
+
+            # refresh mtime so entry counts as recently used for eviction
+            os.utime(entry)
+
+            return df
+
+    return None
+##########################
+##########################
+
+
+##########################
+##########################
+def storeCacheEntry(key, df):
+
+    CACHE_DIR.mkdir(exist_ok=True)
+
+    # write to a process specific tmp file and rename, so parallel
+    # workers never see a partly written entry
+    tmp = CACHE_DIR / f'{key}.{os.getpid()}.tmp'
+
+    try:
+        # use parquet if frame comes back exactly as it went in, otherwise
+        # fall back to pickle, e.g. object columns mixing ints and NaN
+        if pyarrow is not None:
+            df.to_parquet(tmp)
+            back = pd.read_parquet(tmp)
+
+            if back.equals(df) and back.index.equals(df.index) and (back.index.dtype == df.index.dtype):
+                os.replace(tmp, CACHE_DIR / f'{key}.parquet')
+                return
+
+        df.to_pickle(tmp)
+        os.replace(tmp, CACHE_DIR / f'{key}.pkl')
+
+    except Exception:
+        # caching is best effort.  The parsed frame is still returned to the caller
+        print(f'\nWarning: could not add entry to {CACHE_DIR}')
+
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def evictCache():
+
+    # collect (mtime, size, path) of every entry.  Entries can disappear
+    # while looping if another process is evicting at the same time
+    entries = []
+    for e in CACHE_DIR.iterdir():
+        if e.suffix in ('.parquet', '.pkl'):
+            try:
+                stat = e.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, e))
+
+    total_bytes = sum(size for mtime, size, e in entries)
+
+    # remove oldest mtime == least recently used entries first
+    for mtime, size, e in sorted(entries, key=lambda x: x[0]):
+        if total_bytes <= CACHE_MAX_BYTES:
+            break
+
+        total_bytes -= size
+        e.unlink(missing_ok=True)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def cachedParse(path, parser, *args):
+
+    if not useCache():
+        return parser(path, *args)
+
+    key = getCacheKey(path, parser, args)
+
+    df = loadCacheEntry(key)
+
+    if df is None:
+        df = parser(path, *args)
+
+        storeCacheEntry(key, df)
+
+        evictCache()
+
+    return df
+##########################
+##########################
+
+
+##########################
+##########################
+def selectColumns(df, usecols, path):
+
+    # keep columns in the order they appear in the file, same as read_excel(usecols=...)
+    missing = [c for c in usecols if c not in df.columns]
+
+    if len(missing) > 0:
+        raise ValueError(
+            f'Columns expected but not found in {path}: {missing}')
+
+    return df[[c for c in df.columns if c in usecols]]
+##########################
+##########################
+
+
+##########################
+##########################
+def readConcFile(conc_path, clamp_at=0.001, decimals=3):
+
+    return cachedParse(conc_path, parseConcFile, clamp_at, decimals)
+##########################
+##########################
+
+
+##########################
+##########################
+def readVolumeFile(vol_path):
+
+    return cachedParse(vol_path, parseVolumeFile)
+##########################
+##########################
+
+
+##########################
+##########################
+def readPlateVolumes(vol_path, plate_id):
+
+    my_volume_df = readVolumeFile(vol_path)
+
+    # one volume file is one rack, i.e. one SIP fraction plate
+    rack_ids = my_volume_df['RACKID'].dropna().unique()
+
+    if len(rack_ids) > 1:
+        print(
+            f"\n\nERROR\n\nThe volume file for {plate_id} has more than one RACKID: {', '.join(rack_ids)}.  Aborting script\n\n")
+        sys.exit()
+
+    if (len(rack_ids) == 1) and (rack_ids[0] != plate_id):
+        print(f"\nWarning: RACKID {rack_ids[0]} in the volume file for {plate_id} doesn't match the plate id")
+
+    volume = my_volume_df['VOLAVG']
+
+    # replace missing values with 0 ONLY for well A01.  This seems to be a glitch
+    # in instrument used to measure well volumes
+    volume = volume.mask((my_volume_df['TUBE'] == 'A01') & volume.isnull(), 0)
+
+    if volume.isnull().any():
+        print(
+            f"\n\nERROR\n\nThe volume plate for {plate_id} is missing data.  Aborting script\n\n")
+        sys.exit()
+
+    # reformat well positions, e.g. A01 --> A1, B01 --> B1, A10 stays A10
+    tube = my_volume_df['TUBE'].str.replace(r'^([A-Za-z])0(\d)$', r'\1\2', regex=True)
+
+    return pd.DataFrame({'RACKID': my_volume_df['RACKID'], 'TUBE': tube, 'VOLAVG': volume.astype(int)})
+##########################
+##########################
+
+
+##########################
+##########################
+def readDensityFile(dens_path, usecols):
+
+    my_density_df = cachedParse(dens_path, parseDensityFile)
+
+    return selectColumns(my_density_df, usecols, dens_path).copy()
+##########################
+##########################
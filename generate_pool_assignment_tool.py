@@ -8,10 +8,17 @@ import numpy as np
 import sys
 from datetime import datetime
 from pathlib import Path
-import openpyxl
 import shutil
 import os
-from sqlalchemy import create_engine
+
+import lazy_import
+import sip_params
+import pool_solver
+import step_metrics
+
+# imported when first used, see lazy_import.py
+openpyxl = lazy_import.lazyModule('openpyxl')
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
 
 
 
@@ -39,7 +46,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR / 'lib_info_submitted_to_clarity.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM lib_info_submitted_to_clarity"
@@ -65,25 +72,29 @@ def getConstants():
 
     # user provides min conc threshold for successful lib creation.
     target_pool_mass = float(
-        input("Enter the target pool MASS needed (default 2.75 pmol): ") or 2.75)
+        sip_params.ask('target_pool_pmol', "Enter the target pool MASS needed (default 2.75 pmol): ") or 2.75)
 
     max_conc_vol = float(
-        input("Enter the max CONCENTRATED volume used for individual libraries.  Should be <= half lib volume (default = 20uL): ") or 20)
+        sip_params.ask('max_conc_lib_vol', "Enter the max CONCENTRATED volume used for individual libraries.  Should be <= half lib volume (default = 20uL): ") or 20)
 
     max_dilut_vol = float(
-        input("Enter the max DILUTED volume used for individual libraries.  Should be <= half lib volume (default = 45uL): ") or 45)
+        sip_params.ask('max_dilute_lib_vol', "Enter the max DILUTED volume used for individual libraries.  Should be <= half lib volume (default = 45uL): ") or 45)
 
     min_tran_vol = float(
-        input("Enter the MINIMUM accurate pipet volume of instrument (efault = 2.4uL): ") or 2.4)
+        sip_params.ask('min_pipet_vol', "Enter the MINIMUM accurate pipet volume of instrument (efault = 2.4uL): ") or 2.4)
+
+    # hamilton deck has space for 10 source plates, i.e. concentrated and dilute copy of 5 lib plates
+    max_plates = int(
+        sip_params.ask('max_plates_per_pool', f"Enter the max # of lib plates in a pool (default = {pool_solver.MAX_PLATES_PER_POOL}): ") or pool_solver.MAX_PLATES_PER_POOL)
 
-    return target_pool_mass, max_conc_vol, max_dilut_vol, min_tran_vol
+    return target_pool_mass, max_conc_vol, max_dilut_vol, min_tran_vol, max_plates
 ##########################
 ##########################
 
 
 ##########################
 ##########################
-def fillPoolingSheet(my_passed_df, target_pool_mass, max_conc_vol, max_dilut_vol, min_tran_vol):
+def fillPoolingSheet(my_passed_df, target_pool_mass, max_conc_vol, max_dilut_vol, min_tran_vol, max_plates):
     
     file_path = ASSIGN_DIR / "tmp_BLANK.xlsx"
     
@@ -99,6 +110,14 @@ def fillPoolingSheet(my_passed_df, target_pool_mass, max_conc_vol, max_dilut_vol
 
     x_df.rename(columns={'Pool_Illumina_index': '#_of_libs'}, inplace=True)
 
+    # assign plates to pools so no pool has the same index set twice or more
+    # than max_plates plates, with about the same number of libs in each pool
+    x_df['Assigned_Pool'] = pool_solver.assignPools(x_df, max_plates)
+
+    print('\n\nPlates were assigned to pools as follows.  Pool numbers can still be changed in assign_pool_number_sheet.xlsx:\n\n')
+
+    print(pool_solver.summarisePools(x_df))
+
     # make each column of x_df into own df, then loop through
     # each row and write to corresponding column in .xslx file
     plate_df = x_df[['Pool_source_plate']].copy()
@@ -107,6 +126,12 @@ def fillPoolingSheet(my_passed_df, target_pool_mass, max_conc_vol, max_dilut_vol
         cell = 'A%d' % (index + 3)
         poolsheet[cell] = row['Pool_source_plate']
 
+    pool_num_df = x_df[['Assigned_Pool']].copy()
+
+    for index, row in pool_num_df.iterrows():
+        cell = 'B%d' % (index + 3)
+        poolsheet[cell] = int(row['Assigned_Pool'])
+
     index_df = x_df[['Pool_Illumina_index_set']].copy()
 
     for index, row in index_df.iterrows():
@@ -129,7 +154,7 @@ def fillPoolingSheet(my_passed_df, target_pool_mass, max_conc_vol, max_dilut_vol
     poolsheet['Q8'] = target_pool_mass
 
 
-    # save as new .xlsx file for users to manually assign pool numbers
+    # save as new .xlsx file, users can still change the assigned pool numbers
     output_file_path = ASSIGN_DIR / "assign_pool_number_sheet.xlsx"
     workbook.save(filename=output_file_path)
     
@@ -151,6 +176,8 @@ def fillPoolingSheet(my_passed_df, target_pool_mass, max_conc_vol, max_dilut_vol
 ##########################
 # MAIN PROGRAM
 ##########################
+step_metrics.timeFunctions(globals())
+
 PROJECT_DIR = Path.cwd()
 SCRIPT_DIR = Path(__file__).parent  # Directory where this script is located
 
@@ -189,12 +216,12 @@ shutil.copy(blank_tool_path, ASSIGN_DIR / 'tmp_BLANK.xlsx')
 passed_df = readSQLdb()
 
 # get library and pipetting specs from user
-target_pool_mass, max_conc_vol, max_dilut_vol, min_tran_vol = getConstants()
+target_pool_mass, max_conc_vol, max_dilut_vol, min_tran_vol, max_plates = getConstants()
 
 
-# fill a blank pooling tool .xlsx file with plate, illumina index, and # of libs in each plate
+# fill a blank pooling tool .xlsx file with plate, assigned pool, illumina index, and # of libs in each plate
 fillPoolingSheet(passed_df, target_pool_mass,
-                 max_conc_vol, max_dilut_vol, min_tran_vol)
+                 max_conc_vol, max_dilut_vol, min_tran_vol, max_plates)
 
 # delete temporary copy of blank pooling tool .xlsx
 os.remove(ASSIGN_DIR / 'tmp_BLANK.xlsx')
@@ -204,3 +231,4 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/generate_pool_assignment_tool.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/generate_pool_assignment_tool.success')
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# Illumina index sets used on the library creation plates.
+#
+# Each destination plate gets one 96 well index set, and the index in a well
+# is named after the set and the zero padded well, e.g. PE17_A01.  The sets
+# are listed in illumina_index_sets.csv, in the order they are used, with the
+# format of their index names:
+#
+#     Illumina_index_set,Index_name_format
+#     PE17,PE17_{well}
+#
+# Adding a set, e.g. PE21, only needs a new line in the file.  The table of
+# every (set, well) -> index is made once when the module is imported, with
+# categorical columns, and addIndexes() looks up the index of every library
+# with a single merge on Illumina_index_set and Destination_Well.
+# ILLUMINA_INDEX_FILE can point to a different file.
+#
+# USAGE:   import illumina_index
+#          set_by_plate = illumina_index.assignIndexSets(df['Destination_ID'], first=random.randrange(len(illumina_index.INDEX_SETS)))
+#          df = illumina_index.addIndexes(df, set_by_plate)
+
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+import plate_geometry
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+INDEX_SET_FILE = Path(os.environ.get('ILLUMINA_INDEX_FILE', SCRIPT_DIR / 'illumina_index_sets.csv'))
+
+
+##########################
+##########################
+def readIndexSets(index_set_file=INDEX_SET_FILE):
+
+    if not Path(index_set_file).exists():
+        print(f'\n\nCould not find the Illumina index set file {index_set_file}.  Aborting\n\n')
+        sys.exit()
+
+    set_df = pd.read_csv(index_set_file, dtype=str).dropna()
+
+    set_df['Illumina_index_set'] = set_df['Illumina_index_set'].str.strip()
+
+    if set_df.empty or set_df['Illumina_index_set'].duplicated().any():
+        print(f'\n\nIllumina index sets in {index_set_file} are missing or listed twice.  Aborting\n\n')
+        sys.exit()
+
+    return set_df
+##########################
+##########################
+
+
+##########################
+##########################
+def makeIndexTable(set_df):
+
+    # one row per index set and well, wells in column order as on the plates
+    wells = plate_geometry.getWellArray(96)
+    padded = plate_geometry.rowColToWell(*plate_geometry.wellToRowCol(wells), pad=True)
+
+    sets = set_df['Illumina_index_set'].tolist()
+
+    index_names = [fmt.format(well=w) for fmt in set_df['Index_name_format'] for w in padded]
+
+    return pd.DataFrame({'Illumina_index_set': pd.Categorical([s for s in sets for w in wells], categories=sets),
+                         'Destination_Well': pd.Categorical(list(wells) * len(sets), categories=wells),
+                         'Illumina_index': index_names})
+##########################
+##########################
+
+
+# index sets in the order they are used, and the index of every set and well
+_set_df = readIndexSets()
+
+INDEX_SETS = _set_df['Illumina_index_set'].tolist()
+
+INDEX_TABLE = makeIndexTable(_set_df)
+
+
+##########################
+##########################
+def nextSetNumber(last_set):
+
+    # position after last_set in INDEX_SETS, so a rework continues with the
+    # set after the last one used
+    if last_set not in INDEX_SETS:
+        print(f'\n\nIllumina index set {last_set} is not listed in {INDEX_SET_FILE}.  Aborting\n\n')
+        sys.exit()
+
+    return 1 + INDEX_SETS.index(last_set)
+##########################
+##########################
+
+
+##########################
+##########################
+def assignIndexSets(plate_ids, first=0):
+
+    # sorted destination plates get the index sets in turn starting with
+    # INDEX_SETS[first], wrapping around when there are more plates than sets
+    plates = sorted(pd.unique(pd.Series(plate_ids)).tolist())
+
+    return {p: INDEX_SETS[(cnt + first) % len(INDEX_SETS)] for cnt, p in enumerate(plates)}
+##########################
+##########################
+
+
+##########################
+##########################
+def addIndexes(my_import_df, set_by_plate):
+
+    my_import_df['Illumina_index_set'] = my_import_df['Destination_ID'].map(set_by_plate)
+
+    keys = my_import_df[['Illumina_index_set', 'Destination_Well']].astype(str)
+
+    # left merge keeps the rows in order, one match per set and well
+    found = keys.merge(INDEX_TABLE, on=['Illumina_index_set', 'Destination_Well'], how='left')['Illumina_index']
+
+    # wells that aren't on a 96 well index plate keep set + well, as before
+    my_import_df['Illumina_index'] = found.fillna(keys['Illumina_index_set'] + keys['Destination_Well']).values
+
+    return my_import_df
+##########################
+##########################
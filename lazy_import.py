@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Deferred imports of the slow plotting, pdf, excel and database packages.
+#
+# matplotlib.pyplot, seaborn, openpyxl and sqlalchemy each take 0.2-1.3 s to
+# import, and the scripts imported all of them at the top even when a run
+# stops at its first missing-file check.  lazyModule() returns a stand-in that
+# imports the real module the first time one of its attributes is used, so
+# e.g. plt.figure() imports matplotlib.pyplot, and a script that never plots
+# never imports it.  pandas and numpy are still imported at the top, nearly
+# every step uses them straight away.
+#
+# benchmarks/bench_startup.py tracks the import time of each script.
+#
+# USAGE:   import lazy_import
+#          plt = lazy_import.lazyModule('matplotlib.pyplot')
+#          sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+#          engine = sqlalchemy.create_engine(f"sqlite:///{db_path}")
+
+
+import types
+import importlib
+
+
+##########################
+##########################
+class LazyModule(types.ModuleType):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self.__dict__['_module'] is None:
+            self.__dict__['_module'] = importlib.import_module(self.__name__)
+
+        return self.__dict__['_module']
+
+    # only called for attributes the stand-in doesn't have itself
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'imported' if self.__dict__['_module'] is not None else 'not imported yet'
+        return f"<lazy module '{self.__name__}', {state}>"
+##########################
+##########################
+
+
+##########################
+##########################
+def lazyModule(name):
+
+    return LazyModule(name)
+##########################
+##########################
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Pick which library creation attempt of each fraction is used for pooling.
+#
+# A fraction can be made into a library up to three times, and the results
+# of each attempt are kept in their own group of columns in lib_info.csv:
+# Destination_ID, Passed_library, ... for the first attempt, Redo_Destination_ID,
+# Redo_Passed_library, ... for the rework and Third_Destination_ID, ... for the
+# emergency third attempt.  The latest attempt that passed is pooled.
+#
+# winningAttempt() finds it for every fraction at once from a pass matrix with
+# one column per attempt, and resolveAttempts() copies the plate, well, index,
+# concentration, size and dilution of the winning attempt into the Pool_*
+# columns in one step.  An attempt is used when its <prefix>Passed_library
+# column is in the frame, so a further attempt only needs its prefix added to
+# ATTEMPT_PREFIXES.
+#
+# USAGE:   import library_attempts
+#          passed_df = library_attempts.resolveAttempts(passed_df)
+
+
+import sys
+import numpy as np
+import pandas as pd
+
+
+# column prefix of each attempt, in the order the attempts are made
+ATTEMPT_PREFIXES = ['', 'Redo_', 'Third_']
+
+# pooling column: column of each attempt it's copied from
+POOL_FIELDS = {'Pool_source_plate': 'Destination_ID',
+               'Pool_source_well': 'Destination_Well',
+               'Pool_Illumina_index_set': 'Illumina_index_set',
+               'Pool_Illumina_index': 'Illumina_index',
+               'Pool_DNA_conc_ng/uL': 'ng/uL',
+               'Pool_nmole/L': 'nmole/L',
+               'Pool_Avg. Size': 'Avg. Size',
+               'Pool_dilution_factor': 'FA_dilution_factor'}
+
+
+##########################
+##########################
+def getAttemptPrefixes(my_lib_df):
+
+    # the first attempt, and the later attempts that have been made
+    return [p for p in ATTEMPT_PREFIXES if p == '' or f'{p}Passed_library' in my_lib_df.columns]
+##########################
+##########################
+
+
+##########################
+##########################
+def winningAttempt(my_lib_df, prefixes):
+
+    # pass matrix, one column per attempt.  The first attempt is always marked
+    # as passed so it's used when no later attempt passed
+    passed = np.column_stack([np.ones(len(my_lib_df), dtype=bool)] +
+                             [(my_lib_df[f'{p}Passed_library'] == 1).to_numpy() for p in prefixes[1:]])
+
+    # position of the last passed attempt of each fraction
+    return len(prefixes) - 1 - np.argmax(passed[:, ::-1], axis=1)
+##########################
+##########################
+
+
+##########################
+##########################
+def resolveAttempts(my_lib_df, fields=POOL_FIELDS, prefixes=None):
+
+    if prefixes is None:
+        prefixes = getAttemptPrefixes(my_lib_df)
+
+    # values of every attempt, shaped (fractions, attempts, fields)
+    columns = [f'{p}{c}' for p in prefixes for c in fields.values()]
+
+    missing = [c for c in columns if c not in my_lib_df.columns]
+
+    if missing:
+        print(f'\n\nlib_info.csv is missing the pooling columns {missing}.  Aborting\n\n')
+        sys.exit()
+
+    winner = winningAttempt(my_lib_df, prefixes)
+
+    values = my_lib_df[columns].to_numpy(dtype=object).reshape(
+        len(my_lib_df), len(prefixes), len(fields))
+
+    pool_df = pd.DataFrame(values[np.arange(len(my_lib_df)), winner], index=my_lib_df.index,
+                           columns=list(fields)).infer_objects()
+
+    my_lib_df[list(fields)] = pool_df
+
+    return my_lib_df
+##########################
+##########################
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# Pass or fail the libraries of an FA step, and find the plates that need a
+# whole plate rework.
+#
+# thresholds.txt, written in the FA folder when the libraries are made, has
+# one row per library plate:
+#
+#     Destination_plate  DNA_conc_threshold_(nmol/L)  Size_theshold_(bp)  dilution_factor
+#
+# readThresholds() reads it as a typed table through the fraction_plate_io
+# cache, so it's only parsed again when the file changes.  applyThresholds()
+# looks up each library's plate in the table instead of merging the table onto
+# the libraries, passes libraries above both thresholds, and scales the FA
+# concentrations by the plate's dilution factor.  findWholePlates() counts the
+# failed libraries of every plate with one groupby.
+#
+# USAGE:   import library_qc
+#          thresh_df = library_qc.readThresholds(FA_DIR)
+#          lib_df = library_qc.applyThresholds(lib_df, thresh_df, 'Destination_ID')
+#          fa_df = library_qc.applyThresholds(fa_df, thresh_df, 'Redo_FA_Destination_plate', prefix='Redo_')
+#          whole_plate_redo = library_qc.findWholePlates(lib_df, min_failed_libs=36)
+
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import fraction_plate_io
+
+
+THRESHOLD_FILE = 'thresholds.txt'
+
+THRESHOLD_DTYPES = {'Destination_plate': str,
+                    'DNA_conc_threshold_(nmol/L)': float,
+                    'Size_theshold_(bp)': float,
+                    'dilution_factor': float}
+
+
+##########################
+##########################
+def parseThresholds(thresh_path):
+
+    return pd.read_csv(thresh_path, sep='\t', header=0, dtype=THRESHOLD_DTYPES)
+##########################
+##########################
+
+
+##########################
+##########################
+def readThresholds(fa_dir):
+
+    thresh_path = Path(fa_dir) / THRESHOLD_FILE
+
+    if not thresh_path.exists():
+        print(f'\n\nCould not find {thresh_path}.  Aborting\n\n')
+        sys.exit()
+
+    thresh_df = fraction_plate_io.cachedParse(thresh_path, parseThresholds)
+
+    # make sure threshold file has values for all threshold parameters
+    if thresh_df.isnull().values.any():
+        print(f'\nThe {THRESHOLD_FILE} file is missing needed values.  Aborting\n\n')
+        sys.exit()
+
+    if thresh_df['Destination_plate'].duplicated().any():
+        print(f'\nSome plates are listed more than once in {THRESHOLD_FILE}.  Aborting\n\n')
+        sys.exit()
+
+    return thresh_df
+##########################
+##########################
+
+
+##########################
+##########################
+def applyThresholds(my_df, thresh_df, plate_col, prefix=''):
+
+    # row of each library's plate in thresh_df, -1 if the plate isn't listed
+    row = pd.Index(thresh_df['Destination_plate']).get_indexer(my_df[plate_col].astype(object))
+
+    missing = sorted(set(thresh_df['Destination_plate']) - set(my_df[plate_col].dropna()))
+
+    if missing:
+        print(f'\nWarning: no FA results for plates {", ".join(missing)} in {THRESHOLD_FILE}\n')
+
+    def lookup(col):
+        values = np.append(thresh_df[col].to_numpy(dtype=float), np.nan)
+        return values[row]
+
+    my_df = my_df.copy()
+
+    my_df[f'{prefix}dilution_factor'] = lookup('dilution_factor')
+
+    # assign pass or fail to each lib based on dna conc and size thresholds.
+    # Libraries of plates not in thresholds.txt fail
+    my_df[f'{prefix}Passed_library'] = np.where((my_df[f'{prefix}nmole/L'] > lookup('DNA_conc_threshold_(nmol/L)')) &
+                                                (my_df[f'{prefix}Avg. Size'] > lookup('Size_theshold_(bp)')), 1, 0)
+
+    # update lib conc info based on the dilution factor.  This is conc in original library plate
+    for c in [f'{prefix}ng/uL', f'{prefix}nmole/L']:
+        my_df[c] = (my_df[c] * my_df[f'{prefix}dilution_factor']).round(3)
+
+    # plates in order, libraries without a plate last, as merging the
+    # thresholds onto the libraries used to leave them
+    return my_df.sort_values(plate_col, kind='stable', na_position='last').reset_index(drop=True)
+##########################
+##########################
+
+
+##########################
+##########################
+def findWholePlates(my_df, min_failed_libs, plate_col='Destination_ID', pass_col='Passed_library'):
+
+    # sorted plates with at least min_failed_libs failed libraries
+    failed = my_df.loc[my_df[pass_col] == 0].groupby(plate_col, observed=True).size()
+
+    return sorted(failed.index[failed >= min_failed_libs])
+##########################
+##########################
@@ -0,0 +1,816 @@
+#!/usr/bin/env python3
+
+# Make the files for another attempt at library creation, for the libraries
+# that failed, or were picked for rework, in the last FA analysis.
+#
+# rework.first.attempt.py (the second attempt) and
+# emergency.third.attempt.rework.py (the third) both call runRework() with
+# their attempt number.  The attempt's folders, the reviewed FA summary it
+# reads and how its libraries are picked are listed in REWORK_ATTEMPTS, and
+# its column prefix, e.g. Redo_, comes from library_attempts.ATTEMPT_PREFIXES:
+#
+#   - every library of a plate marked <prefix>whole_plate in the summary is
+#     remade on a new plate, in the same wells
+#   - libraries marked in the attempt's request column, Make_new_library or
+#     Emergency_third_attempt, are cherry picked onto new plates
+#
+# Both sets are found with one pass over lib_info.db, and the Echo, Illumina
+# index, dilution, barcode, thresholds.txt and FA upload files are all written
+# from the one rework frame.  lib_info.db and project_database.db are read
+# once.  Another attempt needs its prefix in ATTEMPT_PREFIXES and a row in
+# REWORK_ATTEMPTS, not a new copy of the script.
+#
+# USAGE:   import library_rework
+#          library_rework.runRework(2)
+
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import lazy_import
+import project_db
+import sip_params
+import plate_geometry
+import illumina_index
+import echo_order
+import library_attempts
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+
+# define list of destination well positions for a 96-well
+well_list_96w = plate_geometry.getWellList(96)
+
+# define list of destination well positions for a 96-well plate with empty corners
+well_list_96w_emptycorner = plate_geometry.getWellList(96, empty_corners=True)
+
+LIB_DIR = "4_make_library_analyze_fa"
+
+# attempt number: folders, reviewed FA summary, and how the libraries are picked.
+#   reviewed_cols   columns taken from the reviewed summary instead of lib_info.db
+#   request_col     libraries marked 1 here are cherry picked
+#   check_passed    abort if a cherry picked library passed the last attempt
+#   check_total     abort if Total_passed_attempts doesn't match the pass results
+#   count_made      add one to Made_Library in project_database.db for the samples
+REWORK_ATTEMPTS = {
+    2: {'step': 'rework.first.attempt',
+        'make_dir': 'C_second_attempt_make_lib',
+        'fa_dir': 'D_second_attempt_fa_result',
+        'review_dir': 'B_first_attempt_fa_result',
+        'review_file': 'updated_fa_analysis_summary.txt',
+        'reviewed_cols': ['FA_dilution_factor'],
+        'request_col': 'Make_new_library',
+        'check_passed': True,
+        'check_total': False,
+        'count_made': True,
+        'echo_name': 'REDO_echo_transfer',
+        'barcode_file': 'BARTENDER_barcode_labels.txt',
+        'label': 'redo'},
+    3: {'step': 'emergency.third.attempt.rework',
+        'make_dir': 'E_third_attempt_make_lib',
+        'fa_dir': 'F_third_attempt_fa_result',
+        'review_dir': 'D_second_attempt_fa_result',
+        'review_file': 'updated_2nd_fa_analysis_summary.txt',
+        'reviewed_cols': ['Passed_library', 'Redo_FA_dilution_factor'],
+        'request_col': 'Emergency_third_attempt',
+        'check_passed': False,
+        'check_total': True,
+        'count_made': False,
+        'echo_name': 'Third_echo_transfer',
+        'barcode_file': 'echo_barcode.txt',
+        'label': 'third'},
+}
+
+
+##########################
+##########################
+def getAttempt(attempt, project_dir):
+
+    if attempt not in REWORK_ATTEMPTS or attempt > len(library_attempts.ATTEMPT_PREFIXES):
+        print(f'\n\nLibrary creation attempt {attempt} is not set up in library_rework.py.  Aborting\n\n')
+        sys.exit()
+
+    cfg = dict(REWORK_ATTEMPTS[attempt])
+
+    # column prefix of this attempt and of the earlier ones, '' for the first
+    cfg['earlier'] = library_attempts.ATTEMPT_PREFIXES[:attempt - 1]
+    cfg['prefix'] = library_attempts.ATTEMPT_PREFIXES[attempt - 1]
+    cfg['previous'] = cfg['earlier'][-1]
+
+    lib_dir = Path(project_dir) / LIB_DIR
+
+    cfg['PROJECT_DIR'] = Path(project_dir)
+    cfg['ARCHIV_DIR'] = Path(project_dir) / "archived_files"
+    cfg['REVIEW_DIR'] = lib_dir / cfg['review_dir']
+    cfg['ATMPT_DIR'] = lib_dir / cfg['make_dir']
+    cfg['FA_DIR'] = lib_dir / cfg['fa_dir']
+    cfg['DILUTE_DIR'] = cfg['ATMPT_DIR'] / "Dultion_plate_transfer_files"
+    cfg['ECHO_DIR'] = cfg['ATMPT_DIR'] / "Echo_transfer_files"
+    cfg['FAUPLOAD_DIR'] = cfg['ATMPT_DIR'] / "FA_upload_files"
+    cfg['ILLUMINA_DIR'] = cfg['ATMPT_DIR'] / "Illumina_index_transfer_files"
+
+    for d in ['ATMPT_DIR', 'FA_DIR', 'DILUTE_DIR', 'ECHO_DIR', 'FAUPLOAD_DIR', 'ILLUMINA_DIR']:
+        cfg[d].mkdir(parents=True, exist_ok=True)
+
+    return cfg
+##########################
+##########################
+
+
+##########################
+##########################
+def readSQLdb(project_dir):
+
+    # path to sqlite db lib_info.db
+    sql_db_path = Path(project_dir) / 'lib_info.db'
+
+    # create sqlalchemy engine
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}')
+
+    # import sql db into pandas df
+    sql_df = pd.read_sql("SELECT * FROM lib_info", engine)
+
+    sql_df['Sample Barcode'] = sql_df['Sample Barcode'].astype('str')
+
+    sql_df['Fraction #'] = sql_df['Fraction #'].astype('int')
+
+    engine.dispose()
+
+    return sql_df
+##########################
+##########################
+
+
+##########################
+##########################
+def readSQLProjectdb(project_dir):
+
+    # path to sqlite db project_database.db
+    sql_db_path = Path(project_dir) / 'project_database.db'
+
+    # create sqlalchemy engine
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}')
+
+    # import sql db into pandas df
+    project_df = pd.read_sql("SELECT * FROM project_database", engine)
+
+    project_df['ITS_sample_id'] = project_df['ITS_sample_id'].astype('str')
+
+    engine.dispose()
+
+    return project_df
+##########################
+##########################
+
+
+##########################
+##########################
+def updateLibInfo(cfg):
+
+    updated_file_name = cfg['REVIEW_DIR'] / cfg['review_file']
+
+    # create df from the reviewed fa_analysis_summary.txt file
+    reduced_df = pd.read_csv(updated_file_name, sep='\t',
+                             header=0, converters={'Sample Barcode': str, 'Fraction #': int})
+
+    # fill in NA values in the whole plate column with ''
+    whole_col = f"{cfg['prefix']}whole_plate"
+
+    if whole_col in reduced_df.columns:
+        reduced_df[whole_col] = reduced_df[whole_col].fillna('')
+
+    # create df from lib_info.db sqlite file
+    lib_df = readSQLdb(cfg['PROJECT_DIR'])
+
+    lib_df = lib_df.merge(reduced_df, how='outer', left_on=[
+                          'Sample Barcode', 'Fraction #'], right_on=['Sample Barcode', 'Fraction #'], suffixes=('', '_y'))
+
+    # use the reviewed pass/fail results and fa dilution factors from the summary
+    for c in cfg['reviewed_cols']:
+        lib_df[c] = lib_df[f'{c}_y']
+
+    # remove redundant columns after merging
+    lib_df.drop(lib_df.filter(regex='_y$').columns, axis=1, inplace=True)
+
+    # sort df based on sample and fraction number in case user manually
+    # changed sorting when generated the updated summary
+    lib_df.sort_values(by=['Sample Barcode', 'Fraction #'], inplace=True)
+
+    if cfg['check_total']:
+        # confirm all samples and fraction numbers in reduced_df
+        # matched up with all samples and fraction numbers in lib_df
+        if lib_df['Total_passed_attempts'].isnull().values.any():
+            print(f"\nProblem updating lib_info.csv with pass/fail results from {cfg['review_file']}. Aborting script\n\n")
+            sys.exit()
+
+        passed = sum(lib_df[f'{p}Passed_library'].fillna(0) for p in cfg['earlier'])
+
+        # abort script if the total passed attempts count does not match the sum of individual pass/fail results for each fraction
+        if (lib_df['Total_passed_attempts'] != passed).any():
+            print('\nTotal_passed_attempts does not equal sum of pass/fail results. Aborting script\n\n')
+            sys.exit()
+
+    return lib_df
+##########################
+##########################
+
+
+##########################
+##########################
+def addDestplate(my_redo_df, my_plate_num):
+
+    # fill plates with empty corners, numbered from my_plate_num, see
+    # plate_geometry.allocateWells()
+    plate_num, wells = plate_geometry.allocateWells(my_redo_df.shape[0], empty_corners=True)
+
+    if len(plate_num) == 0:
+        print('\n\nError.  Problem with number of plates.  Aborting.\n\n')
+        sys.exit()
+
+    # parse first row entry for "Destination_ID" to get base ID without "-#"
+    my_destbc = my_redo_df['Destination_ID'].iloc[0].split("-")[0]
+
+    my_redo_df['Destination_ID'] = np.char.add(f'{my_destbc}-', (plate_num + my_plate_num - 1).astype(str))
+    my_redo_df['Destination_Well'] = wells
+
+    # parse destination well position into row and col, and convert row to a number
+    my_redo_df['Destination_row'] = my_redo_df['Destination_Well'].astype(
+        str).str[0]
+    my_redo_df['Destination_col'] = my_redo_df['Destination_Well'].astype(
+        str).str[1:]
+
+    my_redo_df['Destination_row'] = plate_geometry.rowNumber(my_redo_df['Destination_row'], plate=96)
+
+    return my_redo_df
+##########################
+##########################
+
+
+##########################
+##########################
+def getRequested(my_lib_df, request_col):
+
+    # libraries marked 1 in the request column.  Blanks count as not marked,
+    # and spaces typed around the 1 are ignored
+    flag = my_lib_df[request_col]
+
+    if flag.dtype == 'object':
+        flag = flag.astype(str).str.replace(r'\s+', '', regex=True)
+
+    return pd.to_numeric(flag, errors='coerce').fillna(0).to_numpy() == 1
+##########################
+##########################
+
+
+##########################
+##########################
+def getNextPlateNum(my_lib_df, cfg):
+
+    # the number of library plates made in earlier attempts, incremented by 1
+    return sum(my_lib_df[f'{p}Destination_ID'].nunique() for p in cfg['earlier']) + 1
+##########################
+##########################
+
+
+##########################
+##########################
+def selectRework(my_lib_df, cfg):
+
+    # masks of the libraries remade by whole plate and by cherry picking
+    last_plate = my_lib_df[f"{cfg['previous']}Destination_ID"]
+
+    whole_col = f"{cfg['prefix']}whole_plate"
+
+    if whole_col in my_lib_df.columns:
+        whole_plate_redo = sorted(last_plate[my_lib_df[whole_col] == True].dropna().unique())
+    else:
+        whole_plate_redo = []
+
+    whole = last_plate.isin(whole_plate_redo).to_numpy()
+
+    cherry = last_plate.notna().to_numpy() & ~whole & getRequested(my_lib_df, cfg['request_col'])
+
+    # abort script if partial plate redo include lib marked as passed
+    if cfg['check_passed'] and (my_lib_df.loc[cherry, f"{cfg['previous']}Passed_library"] == 1).any():
+        print(f"\n\nThe {cfg['review_file']} file contains a passed library that is also scheduled for rework, and the library is not part of a whole plate redo. Aborting script\n\n")
+        sys.exit()
+
+    if not whole.any() and not cherry.any():
+        print(f"\n\nNo libraries are marked for rework in {cfg['review_file']}.  Aborting script\n\n")
+        sys.exit()
+
+    return whole_plate_redo, whole, cherry
+##########################
+##########################
+
+
+##########################
+##########################
+def getReworkFiles(my_lib_df, my_next_plate_num, cfg):
+
+    # ask user for relative size of nextera lib creation reaction
+    rxn_size = float(
+        sip_params.ask('nextera_rxn_fraction', "Enter the fraction of full nextera reaction (default 0.4): ") or 0.4)
+
+    if ((rxn_size <= 0) | (rxn_size > 1)):
+        print('\n\nError.  Fraction must be between 0-1.  Aborting.\n\n')
+        sys.exit()
+
+    # this is temporary limitation until I can make different dilution modules for
+    # for different reaction sizes
+    if rxn_size != 0.4:
+        print("\n\nReaction size must be 0.4.  ABORTING script\n\n")
+        sys.exit()
+
+    whole_plate_redo, whole, cherry = selectRework(my_lib_df, cfg)
+
+    prev = cfg['previous']
+
+    rework_cols = ['Plate Barcode', 'Source_row', 'Source_col', 'Destination_ID', 'Destination_Well',
+                   'Destination_row', 'Destination_col', 'DNA_transfer_vol_(nl)', 'Buffer_transfer_vol_(nl)']
+
+    # parse first entry for "Destination_ID" to get base destination barcode ID without "-#"
+    my_destbc = my_lib_df['Destination_ID'].dropna().iloc[0].split("-")[0]
+
+    # whole plates are remade in the same wells on new plates, numbered in order
+    new_plate = {wp: f'{my_destbc}-{my_next_plate_num + i}' for i, wp in enumerate(whole_plate_redo)}
+
+    wp_redo_df = pd.DataFrame({'Plate Barcode': my_lib_df.loc[whole, 'Plate Barcode'],
+                               'Source_row': my_lib_df.loc[whole, 'Source_row'],
+                               'Source_col': my_lib_df.loc[whole, 'Source_col'],
+                               'Destination_ID': my_lib_df.loc[whole, f'{prev}Destination_ID'].map(new_plate)})
+
+    for c in rework_cols[4:]:
+        wp_redo_df[c] = my_lib_df.loc[whole, f'{prev}{c}' if c.startswith('Destination') else c]
+
+    # cherry picked libs fill the plates after the whole plates
+    pt_redo_df = my_lib_df.loc[cherry, ['Plate Barcode', 'Source_row', 'Source_col',
+                                        'Destination_ID', 'DNA_transfer_vol_(nl)', 'Buffer_transfer_vol_(nl)']].copy()
+
+    if not pt_redo_df.empty:
+        # call subroutine to add destination plate ID and desitination well/row/col,
+        # the original index is kept so this df can be merged with whole lib_df using index
+        pt_redo_df = addDestplate(pt_redo_df, my_next_plate_num + len(whole_plate_redo))
+
+    combo_redo_df = pd.concat([wp_redo_df, pt_redo_df.reindex(columns=rework_cols)])
+
+    # add reaction size to dataframe
+    combo_redo_df[f"{cfg['prefix']}Lib_rxn_size(X)"] = rxn_size
+
+    # set DNA transfer to max volume
+    combo_redo_df['DNA_transfer_vol_(nl)'] = 5000 * rxn_size
+
+    # set Buffer transfer to 0
+    combo_redo_df['Buffer_transfer_vol_(nl)'] = 0
+
+    return combo_redo_df, rxn_size
+##########################
+##########################
+
+
+#########################
+#########################
+def addIlluminaIndex(my_import_df, lib_df, cfg):
+
+    # index sets are listed in illumina_index_sets.csv, see illumina_index.py
+    prev = cfg['previous']
+
+    made_df = lib_df[lib_df[f'{prev}Destination_ID'].notna()]
+
+    # create dict where key is destination plate name from the last round of lib creation
+    # and value is Illumina index set used
+    dest_set_dict = dict(zip(made_df[f'{prev}Destination_ID'], made_df[f'{prev}Illumina_index_set']))
+
+    # find the index set used in the last destination plate from the last round of lib creation
+    # that is, the value in the last key of the dest_set_dict
+    last_set = dest_set_dict[list(dest_set_dict)[-1]]
+
+    # the first rework plate gets the set after the last one used in the last attempt at lib creation,
+    # the other new destination plates get the next sets in turn
+    next_set_num = illumina_index.nextSetNumber(last_set)
+
+    dest_id_dict = illumina_index.assignIndexSets(my_import_df['Destination_ID'], first=next_set_num)
+
+    # add illumina index set of each destination plate and the JGI illumina
+    # index ID of each well
+    my_import_df = illumina_index.addIndexes(my_import_df, dest_id_dict)
+
+    return my_import_df
+#########################
+#########################
+
+
+##########################
+##########################
+def makeEchoFiles(my_rework_df, cfg):
+
+    # create two copies of subsets of import_df
+    dna_df = my_rework_df[['Plate Barcode', 'Source_row', 'Source_col',
+                           'Destination_ID', 'Destination_row', 'Destination_col', 'DNA_transfer_vol_(nl)']].copy()
+    buffer_df = my_rework_df[['Plate Barcode', 'Source_row', 'Source_col',
+                              'Destination_ID', 'Destination_row', 'Destination_col', 'Buffer_transfer_vol_(nl)']].copy()
+
+    # rename transfer volume headers
+    dna_df = dna_df.rename(columns={"Plate Barcode": "Source_ID",
+                                    "DNA_transfer_vol_(nl)": "Transfer_vol_(nl)"})
+    buffer_df = buffer_df.rename(
+        columns={"Plate Barcode": "Source_ID", "Buffer_transfer_vol_(nl)": "Transfer_vol_(nl)"})
+
+    # add "buffer" as source plate id
+    buffer_df['Source_ID'] = 'Buffer'
+
+    # add "e" to source plate ID because echo plates have "e" as prefix  to plate ID
+    dna_df['Source_ID'] = 'e' + dna_df['Source_ID']
+
+    # combine two dna_ and buffer_df into new df
+    echo_df = pd.concat([dna_df, buffer_df], ignore_index=True)
+
+    # add new column to help sorting rows so that buffer rows are always
+    # the first rows in the df and echo transfer file
+    echo_df['sorter'] = np.where(
+        (echo_df['Source_ID'] == 'Buffer'), 1, 2)
+
+    # convert row and column values to integers to aid in df sorting
+    echo_df['Destination_col'] = echo_df['Destination_col'].astype(int)
+    echo_df['Destination_row'] = echo_df['Destination_row'].astype(int)
+
+    # sort dataframe
+    echo_df.sort_values(by=['Destination_ID', 'sorter',
+                            'Destination_col', 'Destination_row'], inplace=True)
+
+    # rename columns to match echo software expected format
+    echo_df = echo_df.rename(
+        columns={"Source_ID": "Source Plate Name",
+                 "Source_row": "Source Row",
+                 "Source_col": "Source Column",
+                 "Destination_ID": "Destination Plate Name",
+                 "Destination_row": "Destination Row",
+                 "Destination_col": "Destination Column",
+                 "Transfer_vol_(nl)": "Transfer Volume"})
+
+    # add column with plate barcodes, which is same as plate name, to meet echo expectations
+    echo_df['Source Plate Barcode'] = echo_df['Source Plate Name']
+    echo_df['Destination Plate Barcode'] = echo_df['Destination Plate Name']
+
+    # rearrange columns into final order
+    echo_df = echo_df[['Source Plate Name',	'Source Plate Barcode',	'Source Row',	'Source Column',
+                       'Destination Plate Name',	'Destination Plate Barcode',	'Destination Row',	'Destination Column',	'Transfer Volume']]
+
+    # order transfers of each destination plate to cut source plate swaps and
+    # moves, buffer transfers stay first.  See echo_order.py
+    echo_df = echo_order.orderEchoTransfers(echo_df)
+
+    dest_list = echo_df['Destination Plate Barcode'].unique().tolist()
+
+    # create echo transfer files
+    for d, tmp_df in echo_df.groupby('Destination Plate Barcode', sort=False):
+        tmp_df.to_csv(cfg['ECHO_DIR'] / f"{cfg['echo_name']}_{d}.csv", index=False)
+
+    return echo_df, dest_list
+##########################
+##########################
+
+
+##########################
+##########################
+def makeBarcodeFils(my_dest_list, cfg):
+
+    my_dest_list.sort(reverse=True)
+
+    label = cfg['label']
+
+    # add info to start of barcode print file indicating the template and printer to use
+    x = '%BTW% /AF="\\\\BARTENDER\\shared\\templates\\ECHO_BCode8.btw" /D="%Trigger File Name%" /PRN="bcode8" /R=3 /P /DD\r\n\r\n%END%\r\n\r\n\r\n'
+
+    with open(cfg['ATMPT_DIR'] / cfg['barcode_file'], "w") as bc_file:
+        bc_file.writelines(x)
+
+        # add barcodes of library destination plates, dna source plates, and buffer plate
+        for p in my_dest_list:
+            bc_file.writelines(f'{p}F,"{label}.FA.run {p}F"\r\n')
+
+        for p in my_dest_list:
+            bc_file.writelines(f'{p}D,"{label}.FA.dilute {p}D"\r\n')
+
+        for p in my_dest_list:
+            bc_file.writelines(f'h{p},"    h{p}"\r\n')
+            bc_file.writelines(f'{p},"{label}.SIP.lib {p}"\r\n')
+
+        bc_file.writelines('Buffer,"Buffer.plate"\r\n')
+
+    return
+##########################
+##########################
+
+
+#########################
+#########################
+def createIllumDataframe(rework_df, rxn_size):
+
+    illum_df = rework_df[['Destination_ID',
+                          'Destination_Well', 'Illumina_index_set']].copy()
+
+    # adjuste volume of primer addition based on tagementation reactions size
+    illum_df['Primer_volume_(uL)'] = 10*rxn_size
+
+    illum_df['Illumina_source_well'] = illum_df['Destination_Well']
+
+    illum_df = illum_df.rename(
+        columns={'Destination_Well': 'Lib_plate_well', 'Destination_ID': 'Lib_plate_ID'})
+
+    # rearrange column order
+    illum_column_list = ['Illumina_index_set',
+                         'Illumina_source_well', 'Lib_plate_ID', 'Lib_plate_well', 'Primer_volume_(uL)']
+
+    illum_df = illum_df.reindex(columns=illum_column_list)
+
+    return illum_df
+#########################
+#########################
+
+
+#########################
+#########################
+def makeDilution(rework_df, cfg):
+
+    rxn_col = f"{cfg['prefix']}Lib_rxn_size(X)"
+
+    dilution_df = pd.DataFrame({'Library_Plate_Barcode': rework_df['Destination_ID'],
+                                'Dilution_Plate_Barcode': rework_df['Destination_ID'] + "D",
+                                'FA_Plate_Barcode': rework_df['Destination_ID'] + "F",
+                                'Library_Well': rework_df['Destination_Well']})
+
+    is_04 = rework_df[rxn_col] == 0.4
+
+    dilution_df['Nextera_Vol_Add'] = np.where(is_04, 30, np.nan)
+    dilution_df['Dilution_Vol'] = np.where(is_04, 5, np.nan)
+    dilution_df['FA_Vol_Add'] = np.where(is_04, 2.4, np.nan)
+    dilution_df['Dilution_Plate_Preload'] = np.where(is_04, 125, np.nan)
+
+    # calculate the dilution factor used to make the FA plate
+    rework_df[f"{cfg['prefix']}FA_dilution_factor"] = (dilution_df['Dilution_Plate_Preload'] +
+                                                       dilution_df['Dilution_Vol']-dilution_df['Nextera_Vol_Add'])/dilution_df['Dilution_Vol']
+
+    return dilution_df, rework_df
+#########################
+#########################
+
+
+#########################
+#########################
+def makeIlluminaFiles(illum_df, cfg):
+
+    # create illumina index transfer files
+    for d, tmp_illum_df in illum_df.groupby('Lib_plate_ID', sort=False):
+        tmp_illum_df = tmp_illum_df.copy()
+
+        # add "h" prefix to lib plate ID because barcode label on plate side read by
+        # hamilton scanner has "h" prefix
+        tmp_illum_df['Lib_plate_ID'] = "h" + tmp_illum_df['Lib_plate_ID'].astype(str)
+
+        tmp_illum_df.to_csv(cfg['ILLUMINA_DIR'] / f'Illumina_index_transfer_{d}.csv', index=False)
+
+    return
+#########################
+#########################
+
+
+#########################
+#########################
+def makeDilutionFile(dilution_df, cfg):
+
+    # create dilution plate transfer files
+    for d, tmp_df in dilution_df.groupby('Library_Plate_Barcode', sort=False):
+        tmp_df = tmp_df.copy()
+
+        # had "h" prefix to library plate for reading barcode on Hamilton Star
+        tmp_df['Library_Plate_Barcode'] = 'h'+tmp_df['Library_Plate_Barcode']
+
+        tmp_df.to_csv(cfg['DILUTE_DIR'] / f'dilution_plate_transfer_{d}.csv', index=False)
+
+    return
+#########################
+#########################
+
+
+#########################
+#########################
+def makeThreshold(rework_df, cfg):
+
+    # make df with only unique destination ids and the ave dilution factor per plate
+    thresh_df = rework_df.groupby(['Destination_ID'], as_index=False)[
+        f"{cfg['prefix']}FA_dilution_factor"].mean().round(0)
+
+    thresh_df = thresh_df.rename(columns={
+                                 'Destination_ID': 'Destination_plate', f"{cfg['prefix']}FA_dilution_factor": 'dilution_factor'})
+
+    # add blank column
+    thresh_df['DNA_conc_threshold_(nmol/L)'] = ""
+
+    # add minimum library size to be used in FA analysis thresholds later
+    thresh_df['Size_theshold_(bp)'] = 530
+
+    # make list of column  headers to rearrange by column
+    thresh_col_list = ['Destination_plate',
+                       'DNA_conc_threshold_(nmol/L)', 'Size_theshold_(bp)', 'dilution_factor']
+
+    thresh_df = thresh_df.reindex(columns=thresh_col_list)
+
+    # create thresholds.txt file for use in later FA analysis
+    thresh_df.to_csv(cfg['FA_DIR'] / 'thresholds.txt', index=False, sep='\t')
+
+    return
+#########################
+#########################
+
+
+##########################
+##########################
+def makeFAinputFiles(my_update_lib_df, my_dest_list, my_well_list, cfg):
+
+    dest_col = f"{cfg['prefix']}Destination_ID"
+    well_col = f"{cfg['prefix']}Destination_Well"
+
+    FA_df = my_update_lib_df.loc[my_update_lib_df[dest_col].notna(), [well_col, dest_col, 'Sample Barcode', 'Fraction #']]
+
+    FA_df = FA_df.astype({dest_col: str, 'Sample Barcode': str, 'Fraction #': str})
+
+    FA_df['name'] = FA_df[dest_col] + '_' + FA_df['Sample Barcode'] + '_' + FA_df['Fraction #']
+
+    # drop unecessary columns so only have df with destination well, destination ID, and 'name'
+    FA_df.drop(['Sample Barcode', 'Fraction #'], inplace=True, axis=1)
+
+    # create FA upload files
+    for d in my_dest_list:
+
+        tmp_fa_df = pd.DataFrame({'Well': my_well_list})
+
+        tmp_fa_df = tmp_fa_df.merge(FA_df.loc[FA_df[dest_col] == d], how='outer', left_on=['Well'],
+                                    right_on=[well_col])
+
+        tmp_fa_df.index = range(1, tmp_fa_df.shape[0]+1)
+
+        tmp_fa_df.drop([dest_col, well_col], inplace=True, axis=1)
+
+        tmp_fa_df['name'] = tmp_fa_df['name'].fillna('empty_well')
+
+        tmp_fa_df.loc[tmp_fa_df.Well == 'H12', 'name'] = "ladder_1"
+
+        tmp_fa_df.loc[tmp_fa_df.Well == 'A1', 'name'] = "LibStd_A1"
+
+        tmp_fa_df.loc[tmp_fa_df.Well == 'A12', 'name'] = "LibStd_A12"
+
+        tmp_fa_df.loc[tmp_fa_df.Well == 'H1', 'name'] = "LibStd_H1"
+
+        tmp_fa_df.to_csv(cfg['FAUPLOAD_DIR'] /
+                         f'FA_upload_{d}.csv', index=True, header=False)
+
+    return FA_df
+##########################
+##########################
+
+
+##########################
+##########################
+# update project database with samples the went into Library creation
+def updateProjectDatabase(my_update_lib_df, cfg):
+
+    # import project_database.db into dataframe
+    project_df = readSQLProjectdb(cfg['PROJECT_DIR'])
+
+    if cfg['count_made']:
+        # samples with a library in this attempt
+        made_list = my_update_lib_df.loc[my_update_lib_df[f"{cfg['prefix']}Destination_ID"].notna(), 'Sample Barcode'].unique()
+
+        project_df['Made_Library'] = np.where(
+            (project_df['ITS_sample_id'].isin(made_list)), project_df['Made_Library']+1, project_df['Made_Library'])
+
+    return project_df
+#########################
+#########################
+
+
+#########################
+#########################
+def updateSqlDb(project_df, cfg, date):
+
+    # write only the rows that changed to project_database.db.  The old .db is
+    # archived in full only when the table's columns change
+    project_db.upsertTable(cfg['PROJECT_DIR'] / 'project_database.db', 'project_database', project_df,
+                           project_db.PROJECT_DB_KEYS, cfg['ARCHIV_DIR'] / f"archive_project_database_{date}.db")
+
+    # archive the current project_database.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(cfg['PROJECT_DIR'] / 'project_database.csv', project_df,
+                        cfg['ARCHIV_DIR'] / f"archive_project_database_{date}")
+
+    return
+#########################
+#########################
+
+
+#########################
+#########################
+def createSQLdb(update_lib_df, cfg, date):
+
+    # write only the rows that changed to lib_info.db.  The old .db is
+    # archived in full only when the table's columns change
+    project_db.upsertTable(cfg['PROJECT_DIR'] / 'lib_info.db', 'lib_info', update_lib_df,
+                           project_db.LIB_INFO_KEYS, cfg['ARCHIV_DIR'] / f"archive_lib_info_{date}.db")
+
+    # archive the current lib_info.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(cfg['PROJECT_DIR'] / 'lib_info.csv', update_lib_df,
+                        cfg['ARCHIV_DIR'] / f"archive_lib_info_{date}")
+
+    return
+#########################
+#########################
+
+
+#########################
+#########################
+def runRework(attempt, project_dir=None):
+
+    cfg = getAttempt(attempt, Path.cwd() if project_dir is None else project_dir)
+
+    prefix = cfg['prefix']
+
+    # get current date and time, will add to archive database file name
+    date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+
+    # add library pass/fail results from the reviewed fa analysis file
+    # to the lib_info file
+    lib_df = updateLibInfo(cfg)
+
+    # find the number of library plates made so far and increment by 1
+    next_plate_num = getNextPlateNum(lib_df, cfg)
+
+    # generate the rework frame all the files are made from
+    rework_df, rxn_size = getReworkFiles(lib_df, next_plate_num, cfg)
+
+    # add Illumina indexes to rework df
+    rework_df = addIlluminaIndex(rework_df, lib_df, cfg)
+
+    # make df that will be used ot create echo transfer files, then creat echo transfer files
+    echo_df, dest_list = makeEchoFiles(rework_df, cfg)
+
+    # make file for printing barcodes for lib plates and FA plates
+    makeBarcodeFils(dest_list, cfg)
+
+    # create df just for making Illumina index transfer files for loading indexes after tagmentation reaction
+    illum_df = createIllumDataframe(rework_df, rxn_size)
+
+    # create df just for making a liquid transfer file for the dilution plates
+    dilution_df, rework_df = makeDilution(rework_df, cfg)
+
+    # make Illumina Index transfer files
+    makeIlluminaFiles(illum_df, cfg)
+
+    # make Dilution plate liquid transfer files
+    makeDilutionFile(dilution_df, cfg)
+
+    # make threshold.txt file for FA output analysis in next step of SIP wetlab process
+    makeThreshold(rework_df, cfg)
+
+    # select subset of columns in rework_df, add the attempt's prefix, and merge with lib_df
+    rework_df = rework_df[['Destination_ID', 'Destination_Well', 'Destination_row', 'Destination_col',
+                           f'{prefix}Lib_rxn_size(X)', 'DNA_transfer_vol_(nl)', 'Illumina_index_set',
+                           'Illumina_index', f'{prefix}FA_dilution_factor']]
+
+    rework_df = rework_df.rename(columns={c: f'{prefix}{c}' for c in rework_df.columns if not c.startswith(prefix)})
+
+    # drop the rework request column, and add the new attempt's columns
+    update_lib_df = pd.concat([lib_df.drop(columns=[cfg['request_col']]), rework_df], axis=1)
+
+    # make input files for Fragment Analysis for reworked libs
+    makeFAinputFiles(update_lib_df, dest_list, well_list_96w, cfg)
+
+    # update the 'made lib' column of overall project summary file
+    project_df = updateProjectDatabase(update_lib_df, cfg)
+
+    # update the sql project_database.db
+    updateSqlDb(project_df, cfg, date)
+
+    # create sqlite database file
+    createSQLdb(update_lib_df, cfg, date)
+
+    # Create success marker file to indicate script completed successfully
+    status_file = cfg['PROJECT_DIR'] / '.workflow_status' / f"{cfg['step']}.success"
+
+    os.makedirs(status_file.parent, exist_ok=True)
+
+    with open(status_file, 'w') as f:
+        f.write('Script completed successfully')
+
+    step_metrics.writeMetrics(status_file)
+
+    return update_lib_df
+#########################
+#########################
@@ -6,15 +6,21 @@
 # sys.argv[1] = manually updated version of final_lib_summary.csv generated from second_FA.output.analysis.py
 
 import pandas as pd
-import numpy as np
 import sys
 from datetime import datetime
 from pathlib import Path
-import openpyxl
 import shutil
-from sqlalchemy import create_engine
 import os
 
+import lazy_import
+import project_db
+import sip_params
+import library_attempts
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+
 
 ##########################
 ##########################
@@ -24,7 +30,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR / 'lib_info.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM lib_info"
@@ -47,22 +53,10 @@ def readSQLdb():
 #########################
 def updateSQLdb(lb_info_df):
 
-    # archive the older version of sql lib_info.db
-    Path(PROJECT_DIR /
-            "lib_info.db").rename(ARCHIV_DIR / f"archive_lib_info_{date}.db")
-    Path(ARCHIV_DIR / f"archive_lib_info_{date}.db").touch()
-
-    sql_db_path = PROJECT_DIR /'lib_info.db'
-
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-    # Specify the table name and database engine
-    table_name = 'lib_info'
-    
-    # Export the DataFrame to the SQLite database
-    lb_info_df.to_sql(table_name, engine, if_exists='replace', index=False) 
-    
-    engine.dispose()
+    # write only the rows that changed to lib_info.db.  The old .db is
+    # archived in full only when the table's columns change
+    project_db.upsertTable(PROJECT_DIR / 'lib_info.db', 'lib_info', lb_info_df,
+                           project_db.LIB_INFO_KEYS, ARCHIV_DIR / f"archive_lib_info_{date}.db")
 
     return
 #########################
@@ -76,7 +70,7 @@ def compareFinalVSlibinfo(lib_df, lb_info_df):
     # check for manual updates to final_lib_summary.csv
     # and update lib_info.csv if manual updates found
     if not lib_df.equals(lb_info_df):
-        keep_going = str(input(
+        keep_going = str(sip_params.ask('replace_lib_info_with_final_summary', 
             """\n\nThe final_lib_summary.csv database is different from lib_info.csv.  Would you like to replace lib_info.csv with final_lib_summary.csv?  (y/n)\n\n""") or "n")
 
         if (keep_going.lower() == 'y'):
@@ -89,13 +83,10 @@ def compareFinalVSlibinfo(lib_df, lb_info_df):
             print("Sorry, you must choose 'Y' or 'N' next time. \n\nAborting\n\n")
             sys.exit()
 
-        # arive the current lib_info.csv
-        Path(PROJECT_DIR /
-             "lib_info.csv").rename(ARCHIV_DIR / f"archive_lib_info_{date}.csv")
-        Path(ARCHIV_DIR / f"archive_lib_info_{date}.csv").touch()
-
-        # create updated library info file
-        lib_df.to_csv(PROJECT_DIR / 'lib_info.csv', index=False)
+        # archive the current lib_info.csv and create updated version, plus
+        # a parquet mirror when SIP_PARQUET_MIRROR=1
+        project_db.writeCsv(PROJECT_DIR / 'lib_info.csv', lib_df,
+                            ARCHIV_DIR / f"archive_lib_info_{date}")
         
         # update lib_info.db sqlite database file
         updateSQLdb(lb_info_df)       
@@ -113,67 +104,9 @@ def selectPlateForPooling(my_lib_df):
     # select samples that passed >=1 attempt at lib cration
     my_passed_df = my_lib_df[my_lib_df['Total_passed_attempts'] >= 1].copy()
 
-    # create empty columns for pooling source plate and wells
-    my_passed_df['Pool_source_plate'] = ""
-
-    my_passed_df['Pool_source_well'] = ""
-
-    # add pool info in special condition when emergency 3 attempt at lib creation is used
-    if 'Third_Passed_library' in my_passed_df.columns:
-    
-        # select redo plate over intial plate if lib passed in both attempts
-        my_passed_df['Pool_source_plate'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_Destination_ID'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Destination_ID'], my_passed_df['Destination_ID'])))
-    
-        my_passed_df['Pool_source_well'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_Destination_Well'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Destination_Well'], my_passed_df['Destination_Well'])))
-    
-        my_passed_df['Pool_Illumina_index_set'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_Illumina_index_set'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Illumina_index_set'], my_passed_df['Illumina_index_set'])))
-    
-        my_passed_df['Pool_Illumina_index'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_Illumina_index'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Illumina_index'], my_passed_df['Illumina_index'])))
-    
-        my_passed_df['Pool_DNA_conc_ng/uL'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_ng/uL'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_ng/uL'], my_passed_df['ng/uL'])))
-    
-        my_passed_df['Pool_nmole/L'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_nmole/L'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_nmole/L'], my_passed_df['nmole/L'])))
-    
-        my_passed_df['Pool_Avg. Size'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_Avg. Size'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Avg. Size'], my_passed_df['Avg. Size'])))
-    
-        my_passed_df['Pool_dilution_factor'] = np.where(
-            my_passed_df['Third_Passed_library'] == 1, my_passed_df['Third_FA_dilution_factor'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_FA_dilution_factor'], my_passed_df['FA_dilution_factor'])))
-    
-        ###############
-
-   # add pool info in normal circumstances when only 2 attempts at pooling were made
-    else:
-        # select redo plate over intial plate if lib passed in both attempts
-        my_passed_df['Pool_source_plate'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_Destination_ID'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Destination_ID'], my_passed_df['Destination_ID'])))
-
-        my_passed_df['Pool_source_well'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_Destination_Well'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Destination_Well'], my_passed_df['Destination_Well'])))
-
-        my_passed_df['Pool_Illumina_index_set'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_Illumina_index_set'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Illumina_index_set'], my_passed_df['Illumina_index_set'])))
-
-        my_passed_df['Pool_Illumina_index'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_Illumina_index'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Illumina_index'], my_passed_df['Illumina_index'])))
-
-        my_passed_df['Pool_DNA_conc_ng/uL'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_ng/uL'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_ng/uL'], my_passed_df['ng/uL'])))
-
-        my_passed_df['Pool_nmole/L'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_nmole/L'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_nmole/L'], my_passed_df['nmole/L'])))
-
-        my_passed_df['Pool_Avg. Size'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_Avg. Size'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_Avg. Size'], my_passed_df['Avg. Size'])))
-
-        my_passed_df['Pool_dilution_factor'] = np.where(
-            my_passed_df['Total_passed_attempts'] == 2, my_passed_df['Redo_FA_dilution_factor'], (np.where(my_passed_df['Redo_Passed_library'] == 1, my_passed_df['Redo_FA_dilution_factor'], my_passed_df['FA_dilution_factor'])))
+    # take pool source plate, well, index, concentration, size and dilution from
+    # the latest attempt that passed, first, Redo_ or Third_ (emergency 3rd attempt)
+    my_passed_df = library_attempts.resolveAttempts(my_passed_df)
 
     print('\n\nHere are the number of passed fractions for each sample:\n\n')
 
@@ -203,7 +136,7 @@ def makeClaritySummary(my_lib_df):
 
     # user inputs # uL of DNA remaining before library construction
     fraction_vol = float(
-        input("Enter the resuspension volume for DNA pellet (default 35uL): ") or 35)
+        sip_params.ask('resuspension_vol', "Enter the resuspension volume for DNA pellet (default 35uL): ") or 35)
 
     # this is usually the resuspension volume transfered into the echo plate for later lib creation
     its_df['Transferred Volume (uL)'] = fraction_vol
@@ -222,7 +155,7 @@ def createSQLdb(passed_df):
 
     sql_db_path = PROJECT_DIR /'lib_info_submitted_to_clarity.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # Specify the table name and database engine
     table_name = 'lib_info_submitted_to_clarity'
@@ -240,6 +173,8 @@ def createSQLdb(passed_df):
 ##########################
 # MAIN PROGRAM
 ##########################
+step_metrics.timeFunctions(globals())
+
 PROJECT_DIR = Path.cwd()
 
 ARCHIV_DIR = PROJECT_DIR / "archived_files"
@@ -282,3 +217,4 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/make.clarity.summary.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/make.clarity.summary.success')
@@ -1,18 +1,22 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from pathlib import Path
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfFileMerger
 import os
+import lazy_import
+import project_db
+import step_metrics
+
+# imported when first used, see lazy_import.py
+plt = lazy_import.lazyModule('matplotlib.pyplot')
+PyPDF2 = lazy_import.lazyModule('PyPDF2')
 
 
 PROJECT_DIR = Path.cwd()
 
 
-# import csv with sample data
-lib_df = pd.read_csv('lib_info.csv', header=0,
-                     converters={'Sample Barcode': str})
+# import csv with sample data, only the columns used for plotting
+lib_df = project_db.readCsv('lib_info.csv', usecols=['Sample Barcode', 'Density (g/mL)', 'DNA Concentration (ng/uL)', 'Replicate_Group', 'Fraction_sample_name'],
+                            converters={'Sample Barcode': str})
 
 # get list of unique group names in project
 groups = sorted(lib_df['Replicate_Group'].unique().tolist())
@@ -65,7 +69,7 @@ for g in groups:
 
 
 # Create and instance of PdfFileMerger() class
-merger = PdfFileMerger()
+merger = PyPDF2.PdfFileMerger()
 
 # loop through group figure pdfs and merge them into one
 for pdf in pdf_files:
@@ -76,3 +80,10 @@ for pdf in pdf_files:
 # Write out the merged PDF
 merger.write(PROJECT_DIR / "merged_DNAvsDensity_plots.pdf")
 merger.close()
+
+# Create success marker to indicate script completed successfully
+status_dir = PROJECT_DIR / ".workflow_status"
+status_dir.mkdir(exist_ok=True)
+success_file = status_dir / "makeDensityDNAplots.success"
+success_file.touch()
+step_metrics.writeMetrics(success_file)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-# USAGE:   python merge.SIP.fraction.files.loop.py
+# USAGE:   python merge.SIP.fraction.files.loop.py [--workers N]
 
 
 from pathlib import Path
@@ -8,14 +8,26 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import argparse
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from sqlalchemy import create_engine
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfMerger
 
 # call exists() function named 'file_exists'
 from os.path import exists as file_exists
 
+import lazy_import
+import fraction_plate_io
+import density_windows
+import project_db
+import sip_params
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+plt = lazy_import.lazyModule('matplotlib.pyplot')
+PyPDF2 = lazy_import.lazyModule('PyPDF2')
+
 
 ##########################
 ##########################
@@ -28,7 +40,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR / 'project_database.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM project_database"
@@ -45,6 +57,29 @@ def readSQLdb():
 ##########################
 
 
+##########################
+##########################
+def getWorkers():
+
+    parser = argparse.ArgumentParser(
+        description='Merge density, volume, and DNA conc files for all SIP fraction plates')
+
+    # number of worker processes used to parse fraction plates.  Default of 1
+    # keeps the original one-plate-at-a-time behavior
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of parallel worker processes used to parse fraction plates (default 1)')
+
+    args = parser.parse_args()
+
+    if (args.workers < 1):
+        print('\n\nError.  --workers must be >=1.  Aborting.\n\n')
+        sys.exit()
+
+    return args.workers
+##########################
+##########################
+
+
 
 # ##########################
 # ##########################
@@ -126,36 +161,9 @@ def getMatchedFiles(dirname, ext, pre_post):
 def getVolumes(my_dirname, my_plateid):
     vol_path = my_dirname+"/" + my_plateid+".CSV"
 
-    # import corrsponding volume check file
-    my_volume_df = pd.read_csv(vol_path, header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-        'TUBE': str, 'RACKID': str}, skip_blank_lines=True)
-    # volume_df = pd.read_csv(plateid+".CSV", header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-    #     'TUBE': str, 'RACKID': str})
-
-    # replace missing values with 0 ONLY for well A01.  This seems to be a glitch
-    # in instrument used to measure well volumes
-    my_volume_df['VOLAVG'] = np.where(
-        ((my_volume_df['TUBE'] == 'A01') & (my_volume_df['VOLAVG'].isnull())), 0, my_volume_df['VOLAVG'])
-
-    if my_volume_df['VOLAVG'].isnull().values.any():
-        print(
-            f"\n\nERROR\n\nThe volume plate for {my_plateid} is missing data.  Aborting script\n\n")
-        sys.exit()
-
-    my_volume_df['VOLAVG'] = my_volume_df['VOLAVG'].astype(int)
-
-    # loop to reformat well positions, e.g. A01 --> A1, B01 --> B1
-    new_pos_list = []
-    for index, row in my_volume_df.iterrows():
-        # print(row['TUBE'])
-        well = row['TUBE']
-        if well[1] == '0':
-            well = well.replace('0', '')
-
-        new_pos_list.append(well)
-
-    # replace old well format with new format
-    my_volume_df["TUBE"] = new_pos_list
+    # import corrsponding volume check file, checked and with wells
+    # reformatted, e.g. A01 --> A1
+    my_volume_df = fraction_plate_io.readPlateVolumes(vol_path, my_plateid)
 
     return my_volume_df
 
@@ -178,8 +186,8 @@ def getDensity(my_dirname, my_plateid):
     # book.save()
     # app.kill()
 
-    my_density_df = pd.read_excel(dens_path, header=0, engine=("openpyxl"), usecols=['Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Set', 'Spike-in Mass (pg)'],
-                                  converters={'Plate barcode': str, 'Sample barcode': str, 'Fraction #': int, 'Spike-in Mass (pg)': float})
+    my_density_df = fraction_plate_io.readDensityFile(dens_path, usecols=[
+                                                      'Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Set', 'Spike-in Mass (pg)'])
     # add 'SIP' to plate barcode column to match actual barcode
     # my_density_df['Plate barcode'] = 'SIP' + my_density_df['Plate barcode']
 
@@ -214,57 +222,53 @@ def getConc(my_dirname, my_plateid, pre_post):
         # create dna conc file name
         conc_path = my_dirname+"/"+my_plateid+".txt"
 
-    # conc_path = my_dirname+"/"+my_plateid+".txt"
-
-    tmp_conc_file = 'tmp_conc.txt'
-
-    with open(tmp_conc_file, 'w') as outfile:
-        with open(conc_path, 'r') as file:
-            for line in file:
-                if not line.isspace():
-                    outfile.write(line)
-
-    # # read in DNA conc file
-    # conc_path = my_dirname+"/"+my_plateid+".txt"
+    # parse DNA conc file in memory, keeping only "SPL" wells.  Values <= 0
+    # are set to 0.001 ng/ul, and concentrations are not rounded here, matching
+    # the values this script has always written to library_selection_file.csv
+    my_DNA_conc_df = fraction_plate_io.readConcFile(
+        conc_path, clamp_at=0, decimals=None)
 
-    my_DNA_conc_df = pd.read_csv(tmp_conc_file, sep='\t', header=1, usecols=['Well ID', 'Well', '[Concentration]'],
-                                 converters={'[Concentration]': str}, skip_blank_lines=True)
-
-    # remove empty lines with NaN
-    my_DNA_conc_df.dropna(inplace=True)
+    return my_DNA_conc_df
 
-    # remove blanks and standards from dataframe and keep only rows with "SPL" in well ID
-    my_DNA_conc_df = my_DNA_conc_df.loc[my_DNA_conc_df['Well ID'].str.contains(
-        'SPL')]
+##########################
+##########################
 
-    my_DNA_conc_df.drop('Well ID', inplace=True, axis=1)
 
-    # remove "<" character from dna conc for samples below detection limit
-    my_DNA_conc_df["[Concentration]"] = my_DNA_conc_df["[Concentration]"].str.replace(
-        '<', '')
+##########################
+##########################
+def mergePlate(dirname, plateid, pre_post):
 
-    # replace dna conc values <= 0 with 0.001 ng/ul.  Clarity/ITS won't accept a conc <= 0
-    my_DNA_conc_df["[Concentration]"] = np.where(my_DNA_conc_df["[Concentration]"].astype(
-        float) <= 0, 0.001, my_DNA_conc_df["[Concentration]"].astype(float))
+    # import density, dna conc, and volume files for a single fraction plate
+    volume_df = getVolumes(dirname, plateid)
+    density_df = getDensity(dirname, plateid)
+    DNA_conc_df = getConc(dirname, plateid, pre_post)
 
-    # round DNA concentration
-    my_DNA_conc_df = my_DNA_conc_df.round({'Concentration]': 3})
+    # merge denisty and volume dataframes
+    merged_df = density_df.merge(volume_df, how='outer', left_on=['Well Pos', 'Plate barcode'],
+                                 right_on=['TUBE', 'RACKID'])
 
-    try:
-        os.remove(tmp_conc_file)
+    # generate error if there is a mismatch in wells or plate id between density and volume files
+    if (merged_df["TUBE"].isnull().values.any()):
+        print("\n\n")
+        print(merged_df)
+        print(
+            '\n\n Wells and plated id do not match. Aborting. Check error file. \n\n')
+        merged_df.to_csv('error.desnity.volume.merge.csv', index=False)
 
-    except:
-        print(f'\nError deleting {tmp_conc_file}')
+        sys.exit()
 
-    return my_DNA_conc_df
+    # merge dnc conc dataframe with density and volume df
+    merged_df = merged_df.merge(DNA_conc_df, how='inner', left_on='Well Pos',
+                                right_on='Well')
 
+    return merged_df
 ##########################
 ##########################
 
 
 ##########################
 ##########################
-def mergeIndividualPlates(dirname, matched, pre_post):
+def mergeIndividualPlates(dirname, matched, pre_post, workers=1):
 
     # create dictionarly to hold merged df for each plateid
     # the plate id is the key, and the merged df is the value
@@ -274,29 +278,23 @@ def mergeIndividualPlates(dirname, matched, pre_post):
     list_merged_plates = []
 
     # merge density, dna con, volume files for each fraction plate
-    # and fill dict d{} described above
-    for plateid in matched:
-        volume_df = getVolumes(dirname, plateid)
-        density_df = getDensity(dirname, plateid)
-        DNA_conc_df = getConc(dirname, plateid, pre_post)
-
-        # merge denisty and volume dataframes
-        d[plateid] = density_df.merge(volume_df, how='outer', left_on=['Well Pos', 'Plate barcode'],
-                                      right_on=['TUBE', 'RACKID'])
-
-        # generate error if there is a mismatch in wells or plate id between density and volume files
-        if (d[plateid]["TUBE"].isnull().values.any()):
-            print("\n\n")
-            print(d[plateid])
-            print(
-                '\n\n Wells and plated id do not match. Aborting. Check error file. \n\n')
-            d[plateid].to_csv('error.desnity.volume.merge.csv', index=False)
+    if (workers > 1) and (len(matched) > 1):
+        # parse plates in parallel worker processes.  executor.map() returns
+        # results in the same order as 'matched', so d{} below is filled in
+        # exactly the same order as a serial run and the concatenated
+        # result_df is identical.  A sys.exit() inside a worker is re-raised here
+        with ProcessPoolExecutor(max_workers=min(workers, len(matched))) as executor:
+            merged_list = list(executor.map(
+                mergePlate, repeat(dirname), matched, repeat(pre_post)))
 
-            sys.exit()
+    else:
+        merged_list = [mergePlate(dirname, plateid, pre_post)
+                       for plateid in matched]
+
+    # fill dict d{} described above
+    for plateid, merged_df in zip(matched, merged_list):
+        d[plateid] = merged_df
 
-        # merge dnc conc dataframe with density and volume df
-        d[plateid] = d[plateid].merge(DNA_conc_df, how='inner', left_on='Well Pos',
-                                      right_on='Well')
         # create list of successfully merged plate IDs
         list_merged_plates.append(plateid)
 
@@ -319,51 +317,10 @@ def mergeIndividualPlates(dirname, matched, pre_post):
 ##########################
 def setPassFailFractions (result_df):
     
-    # get list of unique group names in project
-    groups = sorted(result_df['Replicate_Group'].unique().tolist())
-    
-    # set Make_Lib to 1 for all libs as default
-    result_df['Make_Lib'] = 1
-    
-    complete_isotope_set = {'O18','C13','N15','Unlabeled'}
-
-    # loop through groups
-    for g in groups:
-        
-        # get list of isotopes used in group.E.g. ["O18", "Unlabled"]
-        isotopes = result_df[result_df['Replicate_Group']==g]['isotope_label'].unique().tolist()
-        
-        # check for isotope values that are not in the complete expected list of isotope values
-        if not set(isotopes).issubset(complete_isotope_set):
-            print (f"\n\nUnexpeced isotope value in group {g}\n\nAborting script\n")
-            sys.exit()
-
-        
-        # set density range used for making libraries
-        elif "O18" in isotopes:
-            
-            # add column idenitfying possible samples of lib creation based on density range
-            result_df['Make_Lib'] = np.where(
-                ((result_df['Replicate_Group'] == g) & ((result_df['Density (g/mL)'] > 1.78) | (result_df['Density (g/mL)'] < 1.68))), 0, result_df['Make_Lib'])
-            
-        elif "C13" in isotopes:
-            
-            # add column idenitfying possible samples of lib creation based on density range
-            result_df['Make_Lib'] = np.where(
-                ((result_df['Replicate_Group'] == g) & ((result_df['Density (g/mL)'] > 1.768) | (result_df['Density (g/mL)'] < 1.68))), 0, result_df['Make_Lib'])
-            
-        elif "N15" in isotopes:
-            
-            # add column idenitfying possible samples of lib creation based on density range
-            result_df['Make_Lib'] = np.where(
-                ((result_df['Replicate_Group'] == g) & ((result_df['Density (g/mL)'] > 1.76) | (result_df['Density (g/mL)'] < 1.68))), 0, result_df['Make_Lib'])
-            
-        # else:
-        #     print (f"\n\nCould not determine isotopes used in group {g}\n\nAborting script\n")
-        #     sys.exit()
+    # set Make_Lib to 0 for fractions outside the density range of the group's
+    # isotope, the ranges are in isotope_density_windows.csv
+    result_df = density_windows.setMakeLib(result_df)
 
-
-    
     # always set Make_Lib to 0 for first fraction collected
     result_df['Make_Lib'] = np.where(
          result_df['Fraction #'] == 1, 0, result_df['Make_Lib'])
@@ -438,7 +395,7 @@ def removeEmptyFractions(result_df):
 
     # ask user for total number of fractions collected
     total_fractions = float(
-        input("\nEnter the total # fractions collected (default 24): ") or 24)
+        sip_params.ask('total_fractions', "\nEnter the total # fractions collected (default 24): ") or 24)
 
     if (total_fractions <= 0):
         print('\n\nError.  Fractions must be >0.  Aborting.\n\n')
@@ -520,7 +477,7 @@ def findDuplicateSamples(result_df):
         find_dups_df[find_dups_df['Sample Barcode'].isin(dup_list)].to_csv(MERGE_DIR /
             'summary_duplicate_samples.csv', index=False)
 
-        keep_going = str(input("""
+        keep_going = str(sip_params.ask('duplicate_samples_action', """
         There are three options for the next step. 
         Do you wish to deduplicate, keep duplicates, or quit? 
         options: (dedup/keep/quit):  """) or "quit")
@@ -704,7 +661,7 @@ def makeDNAvsDensityPlots(my_lib_df):
         plt.close(f)
 
     # Create and instance of PdfMerger() class
-    merger = PdfMerger()
+    merger = PyPDF2.PdfMerger()
 
     # loop through group figure pdfs and merge them into one
     for pdf in pdf_files:
@@ -733,26 +690,10 @@ def createSQLdb(df):
     # get current date and time, will add to archive database file name
     date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-    sql_db_path = PROJECT_DIR /'project_database.db'
-
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-
-    # Specify the table name and database engine
-    table_name = 'project_database'
-    
-    if (file_exists(PROJECT_DIR / "project_database.db")):
-        
-        # archive the current sql .db
-        Path(PROJECT_DIR /
-              "project_database.db").rename(ARCHIV_DIR / f"archive_project_database_{date}.db")
-        Path(ARCHIV_DIR / f"archive_project_database_{date}.db").touch()
-
-    
-    # Export the DataFrame to the SQLite database
-    df.to_sql(table_name, engine, if_exists='replace', index=False) 
-
-    engine.dispose()
+    # write only the rows that changed to project_database.db.  The old .db is
+    # archived in full only when the table's columns change
+    project_db.upsertTable(PROJECT_DIR / 'project_database.db', 'project_database', df,
+                           project_db.PROJECT_DB_KEYS, ARCHIV_DIR / f"archive_project_database_{date}.db")
 
     return
 #########################
@@ -783,109 +724,115 @@ PLOT_DIR = PROJECT_DIR / "DNA_vs_Density_plots"
 PLOT_DIR.mkdir(parents=True, exist_ok=True)
 
 
-# get current directory
-current_directory = os.getcwd()
 
-subdirectory_name = "3_merge_density_vol_conc_files"
+# the main program is guarded so worker processes started by --workers
+# can import this script without re-running it
+if __name__ == "__main__":
+    step_metrics.timeFunctions(globals())
+
+    # get current directory
+    current_directory = os.getcwd()
 
-# create path to subdirectory where density, volume, and dna conc files are located
-dirname = os.path.join(current_directory, subdirectory_name)
+    subdirectory_name = "3_merge_density_vol_conc_files"
 
+    # create path to subdirectory where density, volume, and dna conc files are located
+    dirname = os.path.join(current_directory, subdirectory_name)
 
-# # determine if DNA conc was measured before CsCl purification
-# # and if this was used to determine sequin addition
-# # this was change in protocol and impacts whetheror not
-# # there is a "post" prefix on the DNA conc file used in merging
-# pre_post = usePREandPOST()
 
-# for now, assume DNA conc files have "post" prefix
-pre_post = True  # DNA conc files have "post" prefix
+    # # determine if DNA conc was measured before CsCl purification
+    # # and if this was used to determine sequin addition
+    # # this was change in protocol and impacts whetheror not
+    # # there is a "post" prefix on the DNA conc file used in merging
+    # pre_post = usePREandPOST()
 
+    # for now, assume DNA conc files have "post" prefix
+    pre_post = True  # DNA conc files have "post" prefix
 
-# file extension for desnity file
-ext = ('.xlsx')
 
-# # read project_database.csv into  a dataframe
-# project_df = pd.read_csv(PROJECT_DIR / 'project_database.csv', header=0, converters={
-#     'ITS_sample_id': str})
+    # file extension for desnity file
+    ext = ('.xlsx')
 
-# read project_database.db into  a dataframe
-project_df = readSQLdb()
+    # number of worker processes used to merge fraction plates
+    workers = getWorkers()
 
+    # # read project_database.csv into  a dataframe
+    # project_df = pd.read_csv(PROJECT_DIR / 'project_database.csv', header=0, converters={
+    #     'ITS_sample_id': str})
 
-# get list of matched sets of density, dna conc, and volume files
-matched = getMatchedFiles(dirname, ext, pre_post)
+    # read project_database.db into  a dataframe
+    project_df = readSQLdb()
 
 
-# merge files density, dnaconc, and volume files for individual plates into individual dataframes
-list_merged_plates, merged_dict = mergeIndividualPlates(
-    dirname, matched, pre_post)
+    # get list of matched sets of density, dna conc, and volume files
+    matched = getMatchedFiles(dirname, ext, pre_post)
 
-# combine all merged results in individual dataframes into one dataframe
-# and select specific fraction to go into library creation
-result_df = mergeAllPlates(merged_dict)
 
-# remove empty fractions from result_df
+    # merge files density, dnaconc, and volume files for individual plates into individual dataframes
+    list_merged_plates, merged_dict = mergeIndividualPlates(
+        dirname, matched, pre_post, workers)
 
-result_df, total_fractions = removeEmptyFractions(result_df)
+    # combine all merged results in individual dataframes into one dataframe
+    # and select specific fraction to go into library creation
+    result_df = mergeAllPlates(merged_dict)
 
-# search results_df for duplicate sampel entries, e.g. re-running a sample on another plate
-result_df = findDuplicateSamples(result_df)
+    # remove empty fractions from result_df
 
-# add user sample names and replicate group info to results_df
-result_df = updateLibInfo(result_df, project_df)
+    result_df, total_fractions = removeEmptyFractions(result_df)
 
+    # search results_df for duplicate sampel entries, e.g. re-running a sample on another plate
+    result_df = findDuplicateSamples(result_df)
 
-# call fuction to set Make_Lib to 1 or 0 based on density
-result_df = setPassFailFractions (result_df)
+    # add user sample names and replicate group info to results_df
+    result_df = updateLibInfo(result_df, project_df)
 
-# creat library selection file
-result_df.to_csv(FIRST_DIR / 'library_selection_file.csv', index=False)
 
-# make pdf plots of DNA vs Density
-makeDNAvsDensityPlots(result_df)
+    # call fuction to set Make_Lib to 1 or 0 based on density
+    result_df = setPassFailFractions (result_df)
 
+    # creat library selection file
+    result_df.to_csv(FIRST_DIR / 'library_selection_file.csv', index=False)
 
-################################
-# update project database with samples successfully merged
-################################
+    # make pdf plots of DNA vs Density
+    makeDNAvsDensityPlots(result_df)
 
 
-# find unique list of sample IDs in merged results_df at end of merging script
-good_merged_list = result_df['Sample Barcode'].unique().tolist()
+    ################################
+    # update project database with samples successfully merged
+    ################################
 
-# # import project_database.csv into database
-# update_project_df = pd.read_csv(PROJECT_DIR / 'project_database.csv',
-#                                 header=0, converters={'ITS_sample_id': str})
 
-# read project_database.db into database
-update_project_df = readSQLdb()
+    # find unique list of sample IDs in merged results_df at end of merging script
+    good_merged_list = result_df['Sample Barcode'].unique().tolist()
 
-# upldate values im 'Merged_files' column
-update_project_df['Merged_files'] = np.where(
-    (update_project_df['ITS_sample_id'].isin(good_merged_list)), update_project_df['Merged_files']+1, update_project_df['Merged_files'])
+    # # import project_database.csv into database
+    # update_project_df = pd.read_csv(PROJECT_DIR / 'project_database.csv',
+    #                                 header=0, converters={'ITS_sample_id': str})
 
+    # read project_database.db into database
+    update_project_df = readSQLdb()
 
-# get current date and time, will add to archive database file name
-date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+    # upldate values im 'Merged_files' column
+    update_project_df['Merged_files'] = np.where(
+        (update_project_df['ITS_sample_id'].isin(good_merged_list)), update_project_df['Merged_files']+1, update_project_df['Merged_files'])
 
-# # create archive of database file by renaming file and adding date and time to file name
-# os.rename('project_database.csv', f'archive_project_database_{date}.csv')
-Path(PROJECT_DIR /
-     "project_database.csv").rename(ARCHIV_DIR / f"archive_project_database_{date}.csv")
-Path(ARCHIV_DIR / f"archive_project_database_{date}.csv").touch()
 
-# archive old project_database.db and replace with updated version
-createSQLdb(update_project_df)
+    # get current date and time, will add to archive database file name
+    date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-# make updated version of project_database.csv
-update_project_df.to_csv(PROJECT_DIR / 'project_database.csv', index=False)
+    # archive old project_database.db and replace with updated version
+    createSQLdb(update_project_df)
 
+    # archive the current project_database.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(PROJECT_DIR / 'project_database.csv', update_project_df,
+                        ARCHIV_DIR / f"archive_project_database_{date}")
 
 
-# Create success marker to indicate script completed successfully
-from pathlib import Path
-status_dir = Path.cwd() / ".workflow_status"
-status_dir.mkdir(exist_ok=True)
-success_file = status_dir / "merge.SIP.fraction.files.loop.success"
-success_file.touch()
+
+    # Create success marker to indicate script completed successfully
+    from pathlib import Path
+    status_dir = Path.cwd() / ".workflow_status"
+    status_dir.mkdir(exist_ok=True)
+    success_file = status_dir / "merge.SIP.fraction.files.loop.success"
+    success_file.touch()
+    step_metrics.writeMetrics(success_file)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+# Well names, rows, columns and positions of 96 and 384 well plates.
+#
+# The well lists that were typed out in most scripts, e.g. well_list_96w and
+# well_list_96w_emptycorner, come from getWellList().  Wells are ordered by
+# column (A1, B1, ... H1, A2, ...) as on the liquid handlers, or by row (A1,
+# A2, ... A12, B1, ...).  empty_corners=True leaves out the 4 corner wells
+# used for the FA ladder and library standards, and controls=N leaves out the
+# first N wells, e.g. the 6 E. coli isotope standards of the isotope plate.
+#
+# The conversions take a whole column, list or array of wells at once and
+# use lookup arrays made when the module is imported:
+#   wellToRowCol(['B3', 'H12'])            -> (array([2, 8]), array([3, 12]))
+#   rowColToWell([2, 8], [3, 12])          -> array(['B3', 'H12'])
+#   wellToIndex(df['Well'], empty_corners=True)   position in the well list, -1 if not in it
+#   indexToWell([0, 1], order='row')       -> array(['A1', 'A2'])
+#   rowNumber(df['Destination_Well'].str[0], plate=96)   'A' -> 1, 'B' -> 2, ..., errors on other values
+#   to384(['A1', 'B1'])                    -> array(['A1', 'C1']), 96 well plate stamped into a 384 well plate
+# Well names may be zero padded, e.g. 'A01' as in the SampleScanMini and
+# volume files.
+#
+# allocateWells() fills library plates from one of these well lists: each
+# plate is filled in well order, and when the last plate would get fewer than
+# 24 libraries the last two plates are split evenly instead.  The plate and
+# well of every library are worked out at once from the plate sizes.
+#
+# USAGE:   import plate_geometry
+#          well_list_96w = plate_geometry.getWellList(96)
+#          df['Destination_row'] = plate_geometry.rowNumber(df['Destination_Well'].str[0], plate=96)
+#          plate_num, wells = plate_geometry.allocateWells(len(df), empty_corners=True)
+
+
+import string
+
+import numpy as np
+import pandas as pd
+
+
+# rows and columns of each plate format
+PLATE_SHAPES = {96: (8, 12), 384: (16, 24)}
+
+ROW_LETTERS = np.array(list(string.ascii_uppercase[:16]))
+
+ROW_INDEX = pd.Index(ROW_LETTERS)
+
+
+##########################
+##########################
+def makeNameTable(n_rows, n_cols, pad=False):
+
+    # name of every well, table[row - 1, col - 1]
+    cols = [f'{c:02d}' if pad else str(c) for c in range(1, n_cols + 1)]
+
+    return np.array([[r + c for c in cols] for r in ROW_LETTERS[:n_rows]])
+##########################
+##########################
+
+
+# the 384 well names cover the 96 well names, e.g. 'H12'
+NAME_TABLE = makeNameTable(*PLATE_SHAPES[384])
+PADDED_NAME_TABLE = makeNameTable(*PLATE_SHAPES[384], pad=True)
+
+# every way of writing a well name in one index, with the position in
+# NAME_TABLE of each, i.e. 'A01' and 'A1' are both position 0
+_padded = PADDED_NAME_TABLE.ravel() != NAME_TABLE.ravel()
+
+NAME_INDEX = pd.Index(np.concatenate([NAME_TABLE.ravel(), PADDED_NAME_TABLE.ravel()[_padded]]))
+NAME_POSITIONS = np.concatenate([np.arange(NAME_TABLE.size), np.flatnonzero(_padded)])
+
+_rows, _cols = np.indices(PLATE_SHAPES[384]) + 1
+
+NAME_ROWS = _rows.ravel()[NAME_POSITIONS]
+NAME_COLS = _cols.ravel()[NAME_POSITIONS]
+
+
+##########################
+##########################
+def makeWellArray(plate=96, order='column', empty_corners=False, controls=0):
+
+    if plate not in PLATE_SHAPES:
+        raise ValueError(f'Unknown plate format {plate}, must be 96 or 384')
+
+    n_rows, n_cols = PLATE_SHAPES[plate]
+
+    table = NAME_TABLE[:n_rows, :n_cols]
+
+    wells = table.T.ravel() if order == 'column' else table.ravel()
+
+    if empty_corners:
+        corners = {table[0, 0], table[-1, 0], table[0, -1], table[-1, -1]}
+        wells = wells[~np.isin(wells, list(corners))]
+
+    return wells[controls:]
+##########################
+##########################
+
+
+# (plate, order, empty_corners, controls): well array and its index
+_well_arrays = {}
+
+
+##########################
+##########################
+def getWellArray(plate=96, order='column', empty_corners=False, controls=0):
+
+    key = (plate, order, empty_corners, controls)
+
+    if key not in _well_arrays:
+        wells = makeWellArray(*key)
+        wells.setflags(write=False)
+
+        _well_arrays[key] = (wells, pd.Index(wells))
+
+    return _well_arrays[key][0]
+##########################
+##########################
+
+
+##########################
+##########################
+def getWellList(plate=96, order='column', empty_corners=False, controls=0):
+
+    # plain list, for scripts that slice it or use .index()
+    return getWellArray(plate, order, empty_corners, controls).tolist()
+##########################
+##########################
+
+
+##########################
+##########################
+def getWellDict(plate=96, order='column', empty_corners=False, controls=0):
+
+    # {'A1': 0, 'B1': 1, ...}
+    return {w: i for i, w in enumerate(getWellArray(plate, order, empty_corners, controls))}
+##########################
+##########################
+
+
+##########################
+##########################
+def lookupNames(wells):
+
+    # position of each name in NAME_INDEX, -1 for names that aren't wells
+    wells = pd.Series(np.asarray(wells, dtype=object)).astype(str).str.strip().str.upper()
+
+    return NAME_INDEX.get_indexer(wells)
+##########################
+##########################
+
+
+##########################
+##########################
+def wellToRowCol(wells):
+
+    # 1-based row and column numbers, 0 for names that aren't wells
+    idx = lookupNames(wells)
+
+    found = idx >= 0
+
+    return np.where(found, NAME_ROWS[idx], 0), np.where(found, NAME_COLS[idx], 0)
+##########################
+##########################
+
+
+##########################
+##########################
+def rowColToWell(rows, cols, pad=False):
+
+    table = PADDED_NAME_TABLE if pad else NAME_TABLE
+
+    return table[np.asarray(rows, dtype=int) - 1, np.asarray(cols, dtype=int) - 1]
+##########################
+##########################
+
+
+##########################
+##########################
+def wellToIndex(wells, plate=96, order='column', empty_corners=False, controls=0):
+
+    # position of each well in the well list, -1 if it isn't in the list
+    idx = lookupNames(wells)
+
+    # padded names to plain names, 'A01' -> 'A1'
+    names = np.where(idx >= 0, NAME_TABLE.ravel()[NAME_POSITIONS[idx]], '')
+
+    getWellArray(plate, order, empty_corners, controls)
+
+    return _well_arrays[(plate, order, empty_corners, controls)][1].get_indexer(names)
+##########################
+##########################
+
+
+##########################
+##########################
+def indexToWell(positions, plate=96, order='column', empty_corners=False, controls=0):
+
+    return getWellArray(plate, order, empty_corners, controls)[np.asarray(positions, dtype=int)]
+##########################
+##########################
+
+
+##########################
+##########################
+def rowNumber(letters, plate=384):
+
+    # 'A' -> 1, 'B' -> 2, ...  Anything that isn't a row letter of the plate
+    # format, e.g. NaN, 'h' or 'Z', raises an error instead of becoming a row
+    if plate not in PLATE_SHAPES:
+        raise ValueError(f'Unknown plate format {plate}, must be 96 or 384')
+
+    letters = np.asarray(letters, dtype=object)
+
+    numbers = ROW_INDEX.get_indexer(letters.ravel()).reshape(letters.shape) + 1
+
+    bad = (numbers < 1) | (numbers > PLATE_SHAPES[plate][0])
+
+    if bad.any():
+        raise ValueError(f'Not row letters of a {plate} well plate: {sorted(set(map(str, letters[bad])))[:5]}')
+
+    return numbers.astype(np.int64)
+##########################
+##########################
+
+
+##########################
+##########################
+def rowLetter(numbers):
+
+    return ROW_LETTERS[np.asarray(numbers, dtype=int) - 1]
+##########################
+##########################
+
+
+##########################
+##########################
+def to384(wells, quadrant=1):
+
+    # well of a 96 well plate stamped into quadrant 1-4 of a 384 well plate,
+    # quadrant 1 puts A1 in A1, quadrant 2 in A2, 3 in B1 and 4 in B2
+    rows, cols = wellToRowCol(wells)
+
+    row_offset, col_offset = divmod(quadrant - 1, 2)
+
+    return rowColToWell(2 * rows - 1 + row_offset, 2 * cols - 1 + col_offset)
+##########################
+##########################
+
+
+##########################
+##########################
+def allocateWells(n_libs, plate=96, order='column', empty_corners=False, controls=0, min_last=24):
+
+    # plate number, 1 for the first plate, and well of each of n_libs libraries
+    wells = getWellArray(plate, order, empty_corners, controls)
+
+    per_plate = len(wells)
+
+    n_plates = -(-n_libs // per_plate)
+
+    sizes = np.full(n_plates, per_plate)
+
+    if n_plates > 0:
+        sizes[-1] = n_libs - per_plate * (n_plates - 1)
+
+    # a short last plate is balanced with the plate before it
+    if (n_plates > 1) and (sizes[-1] < min_last):
+        shared = per_plate + sizes[-1]
+        sizes[-2:] = [shared // 2, shared - shared // 2]
+
+    plate_num = np.repeat(np.arange(1, n_plates + 1), sizes)
+
+    # position of each library on its plate
+    positions = np.arange(n_libs) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    return plate_num, wells[positions]
+##########################
+##########################
+
+
+# lookup arrays of the well orders the scripts use
+for _plate in PLATE_SHAPES:
+    for _order in ['column', 'row']:
+        for _empty_corners in [False, True]:
+            getWellArray(_plate, _order, _empty_corners)
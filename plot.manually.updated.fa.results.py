@@ -11,11 +11,12 @@ import sys
 from pathlib import Path
 from os.path import exists as file_exists
 import os
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfFileMerger
-import seaborn as sns
 from datetime import datetime
 
+import density_plot_pdf
+import project_db
+import step_metrics
+
 
 
 ##########################
@@ -142,8 +143,8 @@ def compareUpdateVsReduced(updated_df, reduced_df):
 def updateLibInfo(updated_df):
 
     #  make df of lib_df.  Remember, lib_df does not include results of 2nd fa analysis yet
-    lib_df = pd.read_csv(PROJECT_DIR / "lib_info.csv",
-                         header=0, converters={'Sample Barcode': str, 'Fraction #': int})
+    lib_df = project_db.readCsv(PROJECT_DIR / "lib_info.csv",
+                                converters={'Sample Barcode': str, 'Fraction #': int})
 
     
     if 'Total_passed_attempts' in lib_df.columns:
@@ -229,7 +230,7 @@ def getTMPdf(df, s):
 
 ######################
 ######################
-def plotDensVsConc(s, df, version, all_pdf_files):
+def plotDensVsConc(s, g, df, version, all_pages):
 
     # make dict where marker showng lib pass/fail results are colored by result of first or second attempt 
     color_dict = {'first': 'b', 'second': 'r', 'third_scheduled' : 'g', 'third' : 'g'}
@@ -241,30 +242,14 @@ def plotDensVsConc(s, df, version, all_pdf_files):
     # and return name of sample provided by user
     tmp_df, name = getTMPdf(df, s)
 
-    # creation matliplot object
-    f = plt.figure()
-
-
-    # make line plot of sample DNA concentration, NOT the library concentration
-    sns.lineplot(data=tmp_df, x="Density (g/mL)",
-                 y="DNA Concentration (ng/uL)", color='black', legend=False).set(title=f'{version} {g}: {name}')
-
-
-    # make scatter plot where marker style indicates if library was successfully created (pass)
-    sns.scatterplot(data=tmp_df, x="Density (g/mL)",
-                    y="DNA Concentration (ng/uL)", style="Lib Pass/Fail",  hue="plot_version", palette=color_dict, markers=marker_form, s=100)
-
-    # save plot to a pdf
-    plt.savefig(f'tmp_{s}_{version}.pdf', format="pdf", dpi=300)
+    # add page for sample to plot pdf.  Line plot is of sample DNA concentration,
+    # NOT the library concentration, and scatter plot marker style indicates if
+    # library was successfully created (pass)
+    all_pages.append(density_plot_pdf.makePage(tmp_df, f'{version} {g}: {name}',
+                                               line_kws={'color': 'black'},
+                                               scatter_kws={'hue': "plot_version", 'palette': color_dict, 'markers': marker_form}))
 
-    # add name of group figure pdf
-    all_pdf_files.append(f'tmp_{s}_{version}.pdf')
-    
-    # show plot in different screen
-    # plt.show()
-
-    plt.close(f)
-    return all_pdf_files
+    return all_pages
 
 ######################
 ######################
@@ -273,24 +258,11 @@ def plotDensVsConc(s, df, version, all_pdf_files):
 ######################
 
 
-def mergePDFs(pdf_files, version):
-    # Create and instance of PdfFileMerger() class
-    merger = PdfFileMerger()
-
-    # loop through group figure pdfs and merge them into one
-    for pdf in pdf_files:
-        # Append PDF files
-        merger.append(pdf)
+def writePlotPdf(all_pages, version):
 
-    merger.write(f"UPDATED_DNAvsDensity_PASS-FAIL_plots_{version}_{date}.pdf")
-
-    merger.close()
-
-    # # second loop to separately delete individual files is necessary
-    # # to make script work on PC... for some reason.
-    # for pdf in all_pdf_files:
-    #     # delete indidvidual group figure pdf
-    #     os.remove(pdf)
+    # render every sample page into one pdf with all plots
+    density_plot_pdf.writePlotPdf(
+        all_pages, f"UPDATED_DNAvsDensity_PASS-FAIL_plots_{version}_{date}.pdf")
 
 ######################
 ######################
@@ -308,63 +280,69 @@ def mergePDFs(pdf_files, version):
 
 
 
-SECOND_FA_DIR = Path.cwd()
+# the main program is guarded so worker processes started by SIP_PLOT_WORKERS
+# can import this script without re-running it
+if __name__ == "__main__":
+    step_metrics.timeFunctions(globals())
+
+    SECOND_FA_DIR = Path.cwd()
 
-LIB_DIR = SECOND_FA_DIR.parent
+    LIB_DIR = SECOND_FA_DIR.parent
 
-PROJECT_DIR = LIB_DIR.parent
+    PROJECT_DIR = LIB_DIR.parent
 
 
-# get current date and time, will add to archive database file name
-date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+    # get current date and time, will add to archive database file name
+    date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-# current working direcotry
-current_dir = os.path.basename(os.getcwd())
+    # current working direcotry
+    current_dir = os.path.basename(os.getcwd())
 
-# confirm user provided needed input file in correct directory
-# and generate df from updated and reduced versions of fa analysis summary .txt files
-updated_df, reduced_df = confirmFileProvided(current_dir)
+    # confirm user provided needed input file in correct directory
+    # and generate df from updated and reduced versions of fa analysis summary .txt files
+    updated_df, reduced_df = confirmFileProvided(current_dir)
 
 
-# identify libs whose pass/fail status were manually changed in updated_2nd_fa_analysis_summary.txt
-updated_df = compareUpdateVsReduced(updated_df, reduced_df)
+    # identify libs whose pass/fail status were manually changed in updated_2nd_fa_analysis_summary.txt
+    updated_df = compareUpdateVsReduced(updated_df, reduced_df)
 
 
-# add library pass/fail results from reduced_2nd_fa_analysis.txt to info stored in lib_info.csv, but don't update lib_info.csv
-# pass/fail results may have been manually modified from
-# automatic outpt generated by script second.FA.output.analysis.py
-lib_df = updateLibInfo(updated_df)
+    # add library pass/fail results from reduced_2nd_fa_analysis.txt to info stored in lib_info.csv, but don't update lib_info.csv
+    # pass/fail results may have been manually modified from
+    # automatic outpt generated by script second.FA.output.analysis.py
+    lib_df = updateLibInfo(updated_df)
 
 
 
-# get list of unique group names in project
-groups = sorted(lib_df['Replicate_Group'].unique().tolist())
+    # get list of unique group names in project
+    groups = sorted(lib_df['Replicate_Group'].unique().tolist())
 
 
-# empty list to later hold names of pdfs for each group figure
-# this will be used ot merge multiple pdfs at end of script
-all_pdf_files = []
+    # empty list to later hold a page for each sample plot
+    # this will be used to write one pdf at end of script
+    all_pages = []
 
-# loop through list of groups
-for g in groups:
+    # loop through list of groups
+    for g in groups:
 
-    # get list of samples in group
-    samples = sorted(lib_df[lib_df['Replicate_Group'] == g]
-                     ['Sample Barcode'].unique().tolist())
+        # get list of samples in group
+        samples = sorted(lib_df[lib_df['Replicate_Group'] == g]
+                         ['Sample Barcode'].unique().tolist())
 
-    # loop through samples and add line to plt.plot
-    for s in samples:
+        # loop through samples and add page to plot pdf
+        for s in samples:
 
-        plotDensVsConc(s, lib_df, 'updated', all_pdf_files)
+            plotDensVsConc(s, g, lib_df, 'updated', all_pages)
 
 
-# merged plots from each individual sample into one
-# pdf with all plots
-mergePDFs(all_pdf_files, 'second_attempt')
+    # write plots from each individual sample into one
+    # pdf with all plots
+    writePlotPdf(all_pages, 'second_attempt')
 
-# second loop to separately delete individual files is necessary
-# to make script work on PC... for some reason.
-for pdf in all_pdf_files:
-    # delete indidvidual group figure pdf
-    os.remove(pdf)
+    # Create success marker to indicate script completed successfully
+    status_dir = PROJECT_DIR / ".workflow_status"
+    status_dir.mkdir(exist_ok=True)
+    success_file = status_dir / "plot.manually.updated.fa.results.success"
+    success_file.touch()
+    step_metrics.writeMetrics(success_file)
 
@@ -5,25 +5,31 @@
 
 from pathlib import Path
 import pandas as pd
-import numpy as np
 import sys
 import os
 # from openpyxl import load_workbook
 from datetime import datetime
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfMerger
 
 # call exists() function named 'file_exists'
 from os.path import exists as file_exists
 
+import lazy_import
 import pre_vs_post_dna_conc_plots
+import fraction_plate_io
+import project_db
+import sip_params
+import step_metrics
+
+# imported when first used, see lazy_import.py
+plt = lazy_import.lazyModule('matplotlib.pyplot')
+PyPDF2 = lazy_import.lazyModule('PyPDF2')
 
 
 ##########################
 ##########################
 def getPrefix():
     # ask user for total number of fractions collected
-    prefix = input(
+    prefix = sip_params.ask('peg_prefix', 
         "Comparing 'pre' or 'post' PEG additions?\n\nNote, prefix must be lower case and must match case used in file names:  ")
 
     if (prefix != 'pre') and (prefix != 'post'):
@@ -41,7 +47,7 @@ def getPrefix():
 def getFractionNumber():
     # ask user for total number of fractions collected
     total_fractions = float(
-        input("Enter the total # fractions collected (default 24): ") or 24)
+        sip_params.ask('total_fractions', "Enter the total # fractions collected (default 24): ") or 24)
 
     if (total_fractions <= 0):
         print('\n\nError.  Fractions must be >0.  Aborting.\n\n')
@@ -108,36 +114,9 @@ def getMatchedFiles(dirname, prefix):
 def getVolumes(my_dirname, my_plateid):
     vol_path = my_dirname+"/" + my_plateid+".CSV"
 
-    # import corrsponding volume check file
-    my_volume_df = pd.read_csv(vol_path, header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-        'TUBE': str, 'RACKID': str}, skip_blank_lines=True)
-    # volume_df = pd.read_csv(plateid+".CSV", header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-    #     'TUBE': str, 'RACKID': str})
-
-    # replace missing values with 0 ONLY for well A01.  This seems to be a glitch
-    # in instrument used to measure well volumes
-    my_volume_df['VOLAVG'] = np.where(
-        ((my_volume_df['TUBE'] == 'A01') & (my_volume_df['VOLAVG'].isnull())), 0, my_volume_df['VOLAVG'])
-
-    if my_volume_df['VOLAVG'].isnull().values.any():
-        print(
-            f"\n\nERROR\n\nThe volume plate for {my_plateid} is missing data.  Aborting script\n\n")
-        sys.exit()
-
-    my_volume_df['VOLAVG'] = my_volume_df['VOLAVG'].astype(int)
-
-    # loop to reformat well positions, e.g. A01 --> A1, B01 --> B1
-    new_pos_list = []
-    for index, row in my_volume_df.iterrows():
-        # print(row['TUBE'])
-        well = row['TUBE']
-        if well[1] == '0':
-            well = well.replace('0', '')
-
-        new_pos_list.append(well)
-
-    # replace old well format with new format
-    my_volume_df["TUBE"] = new_pos_list
+    # import corrsponding volume check file, checked and with wells
+    # reformatted, e.g. A01 --> A1
+    my_volume_df = fraction_plate_io.readPlateVolumes(vol_path, my_plateid)
 
     return my_volume_df
 
@@ -160,8 +139,8 @@ def getDensity(my_dirname, my_plateid):
     # book.save()
     # app.kill()
 
-    my_density_df = pd.read_excel(dens_path, header=0, engine=("openpyxl"), usecols=['Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Mass (pg)'],
-                                  converters={'Plate barcode': str, 'Sample barcode': str, 'Fraction #': int})
+    my_density_df = fraction_plate_io.readDensityFile(dens_path, usecols=[
+                                                      'Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Mass (pg)'])
 
     # # check if desnity .xlsx file already hase values ented in Spike-in Mass (pg) column
     # if not(my_density_df['Spike-in Mass (pg)'].isnull().all()):
@@ -205,44 +184,9 @@ def getConc(my_dirname, my_dna):
 
     conc_path = my_dirname+"/" + my_dna
 
-    tmp_conc_file = 'tmp_conc.txt'
-
-    with open(tmp_conc_file, 'w') as outfile:
-        with open(conc_path, 'r') as file:
-            for line in file:
-                if not line.isspace():
-                    outfile.write(line)
-
-    my_DNA_conc_df = pd.read_csv(tmp_conc_file, sep='\t', header=1, usecols=['Well ID', 'Well', '[Concentration]'],
-                                 converters={'[Concentration]': str}, skip_blank_lines=True)
-
-    # remove empty lines with NaN
-    my_DNA_conc_df.dropna(inplace=True)
-
-    # remove blanks and standards from dataframe and keep only rows with "SPL" in well ID
-    my_DNA_conc_df = my_DNA_conc_df.loc[my_DNA_conc_df['Well ID'].str.contains(
-        'SPL')]
-
-    my_DNA_conc_df.drop('Well ID', inplace=True, axis=1)
-
-    # remove "<" character from dna conc for samples below detection limit
-    my_DNA_conc_df["[Concentration]"] = my_DNA_conc_df["[Concentration]"].str.replace(
-        '<', '')
-
-    # replace dna conc values <= 0.001 with 0.001 ng/ul.  Clarity/ITS won't accept a conc <= 0
-    my_DNA_conc_df["[Concentration]"] = np.where(my_DNA_conc_df["[Concentration]"].astype(
-        float) <= 0.001, 0.001, my_DNA_conc_df["[Concentration]"].astype(float))
-
-    # round DNA concentration
-    my_DNA_conc_df = my_DNA_conc_df.round({'[Concentration]': 3})
-
-    # append my_DNA_conc_df to larger DF of all files
-
-    try:
-        os.remove(tmp_conc_file)
-
-    except:
-        print(f'\nError deleting {tmp_conc_file}')
+    # parse DNA conc file in memory, keeping only "SPL" wells
+    # with values <= 0.001 set to 0.001 ng/ul and rounded to 3 places
+    my_DNA_conc_df = fraction_plate_io.readConcFile(conc_path)
 
     return my_DNA_conc_df
 
@@ -378,7 +322,7 @@ def addDnaMassPerFraction(all_plate_df, prefix, total_fractions):
     elif prefix == 'post':
         # get post PEG resuspension volume from user
         resuspend_vol = float(
-            input("\n\nEnter the resuspension volume following PEG precipitation (default 35): ") or 35)
+            sip_params.ask('peg_resuspension_vol', "\n\nEnter the resuspension volume following PEG precipitation (default 35): ") or 35)
 
         if (resuspend_vol <= 0):
             print('\n\nError.  Resuspension volume must be >0.  Aborting.\n\n')
@@ -494,7 +438,7 @@ def makeDNAvsDensityPlots(all_plate_df, sample_dict, total_fractions, prefix):
         plt.close(f)
 
     # Create and instance of PdfMerger() class
-    merger = PdfMerger()
+    merger = PyPDF2.PdfMerger()
 
     # loop through group figure pdfs and merge them into one
     for pdf in pdf_files:
@@ -590,7 +534,7 @@ def compareDNAvsDensityVersions(all_plate_df, sample_dict, total_fractions, pref
             plt.close(f)
 
     # Create and instance of PdfMerger() class
-    merger = PdfMerger()
+    merger = PyPDF2.PdfMerger()
 
     # loop through group figure pdfs and merge them into one
     for pdf in pdf_files:
@@ -706,7 +650,7 @@ def individualDNAvsDensityPlots(all_plate_df, sample_dict, total_fractions, pref
             plt.close(f)
 
     # Create and instance of PdfMerger() class
-    merger = PdfMerger()
+    merger = PyPDF2.PdfMerger()
 
     # loop through group figure pdfs and merge them into one
     for pdf in pdf_files:
@@ -736,6 +680,8 @@ def individualDNAvsDensityPlots(all_plate_df, sample_dict, total_fractions, pref
 ###    MAIN Program    ###
 ##########################
 ##########################
+step_metrics.timeFunctions(globals())
+
 # get current date and time, will add some file names
 date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
@@ -797,7 +743,7 @@ for dna in dna_files:
     all_plate_df = pd.concat([all_plate_df, merged_df],
                              axis=0, ignore_index=True)
 # read project_database.csv into  a dataframe
-project_df = pd.read_csv(PROJECT_DIR / 'project_database.csv', header=0, usecols=['Sample_Name', 'Replicate_Group', 'ITS_sample_id'], converters={
+project_df = project_db.readCsv(PROJECT_DIR / 'project_database.csv', usecols=['Sample_Name', 'Replicate_Group', 'ITS_sample_id'], converters={
     'ITS_sample_id': str})
 
 # add user sample name and replicate group to all_plate_df
@@ -842,3 +788,4 @@ status_dir = Path.cwd() / ".workflow_status"
 status_dir.mkdir(exist_ok=True)
 success_file = status_dir / "plot_DNAconc_vs_Density.success"
 success_file.touch()
+step_metrics.writeMetrics(success_file)
@@ -6,38 +6,14 @@ import pandas as pd
 import numpy as np
 import os
 import sys
-import shutil
 from pathlib import Path
 from datetime import datetime
 import re
 
+import archive_store
+import fa_results
+import step_metrics
 
-##########################
-##########################
-def compareFolderFileNames(folder_path, file, folder_name):
-    
-    # make df from FA smear analysis output .csv file
-    fa_df = pd.read_csv(folder_path + f'/{file}', usecols=['Sample ID'] )
-    
-    # make list of all sample names
-    sample_list = fa_df['Sample ID'].unique().tolist()
-    
-    plate_list = []
-    
-    # make new plate list after spliting sample names at '_'
-    # add 'F' to paresed plate name to matche expected plate barcode in
-    # FA output folder name
-    for s in sample_list:
-        plate_list.append(s.split('.')[0])
-    
-    # abort program if the plate name in output folder does not
-    # match plate name parsed from sample name in smear analysis .csv file
-    if folder_name not in set(plate_list):
-        print (f'\nThere is a mismatch between FA plate ID and sample names for plate {folder_name}.  Aborting script\n')
-        sys.exit()
-    
-    
-    return
 
 ##########################
 ##########################
@@ -91,59 +67,11 @@ def findLatestAttempt():
 
 
 
-##########################
-##########################
-def getFAfiles(crnt_dir):
-
-    fa_files = []
-    
-
-    for direct in os.scandir(crnt_dir):
-        if direct.is_dir():
-            nxt_dir = os.path.abspath(direct)
-            
-            # scan current directory and find subdirectories
-            for fa in os.scandir(nxt_dir): 
-                if fa.is_dir():
-                    
-                    # find full path to subdirectories
-                    folder_path = os.path.abspath(fa)
-                    
-                    # extract name of FA plate by parsing the subdirectory name
-                    folder_name = os.path.basename(fa)
-                    folder_name = folder_name.split(' ')[0]
-                    
-                    # search for smear analysis files in each subdirectory
-                    for file in os.listdir(fa):
-                        if file.endswith('Smear Analysis Result.csv'):
-                            # confirm folder name matches plate name parsed from
-                            # smear analysis .csv sample names.  Error out if mismatch
-                            compareFolderFileNames(folder_path, file, folder_name)
-                            
-                            # copy and rename smear analysis to main directory if good match
-                            shutil.copy(folder_path +f'/{file}',crnt_dir)
-                            os.rename(os.path.join(crnt_dir, file), os.path.join(crnt_dir, f'{folder_name}.csv'))
-                            
-                            # add folder name (aka FA plate name) to list
-                            fa_files.append(f'{folder_name}.csv')
-
-    # quit script if directory doesn't contain FA .csv files
-    if len(fa_files) == 0:
-        print("\n\n Did not find any FA output files.  Aborting program\n\n")
-        sys.exit()
-
-    else:
-
-        # return a list of FA plate names
-        return fa_files
-##########################
-##########################
-
-
-
 ##########################
 # MAIN PROGRAM
 ##########################
+step_metrics.timeFunctions(globals())
+
 # # get current working directory and its parent directory
 # crnt_dir = os.getcwd()
 # prnt_dir = os.path.dirname(crnt_dir)
@@ -165,30 +93,23 @@ ATTEMPT_DIR = REWORK_DIR / latest_attempt
 crnt_dir = ATTEMPT_DIR
 
 
-fa_files = getFAfiles(crnt_dir)
+fa_files = fa_results.findFAfiles(crnt_dir, plate_name=fa_results.fa12PlateName)
 
 if len(fa_files) >1:
     print('\nMultiple FA12 output file found. There should be only one.  Aborting script.\n\n')
     sys.exit()
 
 else:
-    file = fa_files[0]
+    file = list(fa_files.values())[0]
 
 
 # # read FA12 smear analysis file into df
 # fa_df = pd.read_csv(crnt_dir + f'/{file}')
-fa_df = pd.read_csv(ATTEMPT_DIR / file)
-
-
-# remove rows with "empty" or "ladder" in sample ID. search is case insensitive
-fa_df = fa_df[fa_df["Sample ID"].str.contains(
-    'empty', case=False) == False]
+fa_df = pd.read_csv(file)
 
-fa_df = fa_df[fa_df["Sample ID"].str.contains(
-    'LibStd', case=False) == False]
 
-fa_df = fa_df[fa_df["Sample ID"].str.contains(
-    'ladder', case=False) == False]
+# remove rows with "empty", "ladder" or "LibStd" in sample ID. search is case insensitive
+fa_df = fa_results.dropControlWells(fa_df)
 
 
 #split into 400-800_df and 100-400_df based on column "Range"
@@ -287,9 +208,8 @@ final_df = pd.concat([rest_df,update_df])
 date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
 # arive the current lib_info.csv
-Path(POOL_DIR /
-      "pool_summary.csv").rename(ARCHIV_DIR / f"archive_pool_summary_{date}.csv")
-Path(ARCHIV_DIR / f"archive_pool_summary_{date}.csv").touch()
+archive_store.archiveFile(POOL_DIR / "pool_summary.csv",
+                          ARCHIV_DIR / f"archive_pool_summary_{date}.csv")
 # create updated library info file
 final_df.to_csv(POOL_DIR / 'pool_summary.csv', index=False)
 
@@ -298,4 +218,5 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/pool.FA12.analysis.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/pool.FA12.analysis.success')
 
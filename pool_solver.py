@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+# Assign library plates to pools.
+#
+# Plates in one pool must have different Illumina index sets, or libraries in
+# the pool would share an index, and the Hamilton pooling method has room for
+# at most 5 library plates, a concentrated and a dilute copy of each.  The
+# pool numbers used to be typed into assign_pool_number_sheet.xlsx by hand and
+# checked afterwards by complete.clarity.pool.prep.sheet.py.
+#
+# assignPools() uses the fewest pools both rules allow, i.e. enough for the
+# index set used on the most plates and for max_plates plates per pool.  The
+# plates, largest first, each go to the pool with the fewest libraries that
+# still has room and doesn't have its index set yet.  Plates are then moved
+# or swapped between the largest and smallest pools while that evens out the
+# number of libraries per pool.  If the first pass gets stuck the plates are
+# dealt out in turn by index set, which always fits, and evened out the same
+# way.
+#
+# USAGE:   import pool_solver
+#          plate_df['Assigned_Pool'] = pool_solver.assignPools(plate_df, max_plates=5)
+#          print(pool_solver.summarisePools(plate_df))
+
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Hamilton deck space, library plates per pool
+MAX_PLATES_PER_POOL = 5
+
+
+##########################
+##########################
+def countPools(set_codes, max_plates):
+
+    n_plates = len(set_codes)
+
+    most_plates_one_set = np.bincount(set_codes).max() if n_plates else 0
+
+    return max(math.ceil(n_plates / max_plates), most_plates_one_set, 1)
+##########################
+##########################
+
+
+##########################
+##########################
+def fillPools(order, set_codes, libs, n_pools, plate_cap):
+
+    # each plate to the smallest pool it fits in, None if one doesn't fit
+    pool_of = np.full(len(set_codes), -1)
+
+    pool_libs = np.zeros(n_pools)
+    pool_plates = np.zeros(n_pools, dtype=int)
+    has_set = np.zeros((n_pools, set_codes.max() + 1), dtype=bool)
+
+    for i in order:
+        fits = (pool_plates < plate_cap) & ~has_set[:, set_codes[i]]
+
+        if not fits.any():
+            return None
+
+        p = np.flatnonzero(fits)[np.argmin(pool_libs[fits])]
+
+        pool_of[i] = p
+        pool_libs[p] += libs[i]
+        pool_plates[p] += 1
+        has_set[p, set_codes[i]] = True
+
+    return pool_of
+##########################
+##########################
+
+
+##########################
+##########################
+def dealPools(set_codes, n_pools):
+
+    # plates of the largest index set first, each plate to the next pool in
+    # turn, so plates of one set never share a pool when no set is used on
+    # more than n_pools plates
+    set_sizes = np.bincount(set_codes)
+
+    order = np.lexsort((set_codes, -set_sizes[set_codes]))
+
+    pool_of = np.empty(len(set_codes), dtype=int)
+    pool_of[order] = np.arange(len(set_codes)) % n_pools
+
+    return pool_of
+##########################
+##########################
+
+
+##########################
+##########################
+def balancePools(pool_of, set_codes, libs, n_pools, plate_cap, max_rounds=1000):
+
+    # move or swap one plate at a time between the largest and another pool,
+    # whichever brings the two closest to the same number of libraries
+    pool_of = pool_of.copy()
+
+    for _ in range(max_rounds):
+        pool_libs = np.bincount(pool_of, weights=libs, minlength=n_pools)
+        pool_plates = np.bincount(pool_of, minlength=n_pools)
+
+        a = np.argmax(pool_libs)
+
+        best = None
+
+        for b in np.argsort(pool_libs):
+            gap = pool_libs[a] - pool_libs[b]
+
+            if gap <= 0:
+                break
+
+            in_a = np.flatnonzero(pool_of == a)
+            in_b = np.flatnonzero(pool_of == b)
+
+            sets_a = set(set_codes[in_a])
+            sets_b = set(set_codes[in_b])
+
+            # candidate changes: (libraries moved from a to b, plate from a, plate from b)
+            changes = []
+
+            if pool_plates[b] < plate_cap:
+                changes += [(libs[x], x, None) for x in in_a if set_codes[x] not in sets_b]
+
+            for x in in_a:
+                for y in in_b:
+                    same = set_codes[x] == set_codes[y]
+
+                    if same or (set_codes[x] not in sets_b and set_codes[y] not in sets_a):
+                        changes.append((libs[x] - libs[y], x, y))
+
+            for moved, x, y in changes:
+                # the larger of the two pools afterwards must be smaller than a now
+                if 0 < moved < gap:
+                    score = abs(gap - 2 * moved)
+
+                    if best is None or score < best[0]:
+                        best = (score, b, x, y)
+
+            if best is not None:
+                break
+
+        if best is None:
+            break
+
+        _, b, x, y = best
+
+        pool_of[x] = b
+
+        if y is not None:
+            pool_of[y] = a
+
+    return pool_of
+##########################
+##########################
+
+
+##########################
+##########################
+def assignPools(plate_df, max_plates=MAX_PLATES_PER_POOL, set_col='Pool_Illumina_index_set',
+                libs_col='#_of_libs'):
+
+    # pool number, from 1, of each row of plate_df (one row per library plate)
+    set_codes = pd.factorize(plate_df[set_col])[0]
+    libs = plate_df[libs_col].to_numpy(dtype=float)
+
+    if len(plate_df) == 0:
+        return pd.Series([], index=plate_df.index, dtype=int)
+
+    n_pools = countPools(set_codes, max_plates)
+
+    # even the number of plates in each pool as well as the libraries
+    plate_cap = math.ceil(len(plate_df) / n_pools)
+
+    # largest plates first
+    order = np.lexsort((np.arange(len(libs)), -libs))
+
+    pool_of = fillPools(order, set_codes, libs, n_pools, plate_cap)
+
+    if pool_of is None:
+        pool_of = dealPools(set_codes, n_pools)
+
+    pool_of = balancePools(pool_of, set_codes, libs, n_pools, plate_cap)
+
+    # number the pools largest first
+    pool_libs = np.bincount(pool_of, weights=libs, minlength=n_pools)
+
+    rank = np.empty(n_pools, dtype=int)
+    rank[np.lexsort((np.arange(n_pools), -pool_libs))] = np.arange(n_pools)
+
+    return pd.Series(rank[pool_of] + 1, index=plate_df.index)
+##########################
+##########################
+
+
+##########################
+##########################
+def summarisePools(plate_df, pool_col='Assigned_Pool', set_col='Pool_Illumina_index_set', libs_col='#_of_libs'):
+
+    return plate_df.groupby(pool_col).agg(plates=(set_col, 'size'), index_sets=(set_col, 'nunique'),
+                                          libs=(libs_col, 'sum')).reset_index()
+##########################
+##########################
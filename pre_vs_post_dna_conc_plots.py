@@ -8,23 +8,30 @@
 
 from pathlib import Path
 import pandas as pd
-import numpy as np
 import sys
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-from PyPDF2 import PdfFileMerger
 
 # call exists() function named 'file_exists'
 from os.path import exists as file_exists
 
+import lazy_import
+import fraction_plate_io
+import project_db
+import sip_params
+import step_metrics
+
+# imported when first used, see lazy_import.py
+plt = lazy_import.lazyModule('matplotlib.pyplot')
+PyPDF2 = lazy_import.lazyModule('PyPDF2')
+
 
 ##########################
 ##########################
 def getFractionNumber():
     # ask user for total number of fractions collected
     total_fractions = float(
-        input("Enter the total # fractions collected (default 24): ") or 24)
+        sip_params.ask('total_fractions', "Enter the total # fractions collected (default 24): ") or 24)
 
     if (total_fractions <= 0):
         print('\n\nError.  Fractions must be >0.  Aborting.\n\n')
@@ -109,36 +116,9 @@ def getMatchedPrePostFiles(dirname):
 def getVolumes(my_dirname, my_plateid):
     vol_path = my_dirname+"/" + my_plateid+".CSV"
 
-    # import corrsponding volume check file
-    my_volume_df = pd.read_csv(vol_path, header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-        'TUBE': str, 'RACKID': str}, skip_blank_lines=True)
-    # volume_df = pd.read_csv(plateid+".CSV", header=0, usecols=['RACKID', 'TUBE', 'VOLAVG'], converters={
-    #     'TUBE': str, 'RACKID': str})
-
-    # replace missing values with 0 ONLY for well A01.  This seems to be a glitch
-    # in instrument used to measure well volumes
-    my_volume_df['VOLAVG'] = np.where(
-        ((my_volume_df['TUBE'] == 'A01') & (my_volume_df['VOLAVG'].isnull())), 0, my_volume_df['VOLAVG'])
-
-    if my_volume_df['VOLAVG'].isnull().values.any():
-        print(
-            f"\n\nERROR\n\nThe volume plate for {my_plateid} is missing data.  Aborting script\n\n")
-        sys.exit()
-
-    my_volume_df['VOLAVG'] = my_volume_df['VOLAVG'].astype(int)
-
-    # loop to reformat well positions, e.g. A01 --> A1, B01 --> B1
-    new_pos_list = []
-    for index, row in my_volume_df.iterrows():
-        # print(row['TUBE'])
-        well = row['TUBE']
-        if well[1] == '0':
-            well = well.replace('0', '')
-
-        new_pos_list.append(well)
-
-    # replace old well format with new format
-    my_volume_df["TUBE"] = new_pos_list
+    # import corrsponding volume check file, checked and with wells
+    # reformatted, e.g. A01 --> A1
+    my_volume_df = fraction_plate_io.readPlateVolumes(vol_path, my_plateid)
 
     return my_volume_df
 
@@ -161,8 +141,8 @@ def getDensity(my_dirname, my_plateid):
     # book.save()
     # app.kill()
 
-    my_density_df = pd.read_excel(dens_path, header=0, engine=("openpyxl"), usecols=['Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Mass (pg)'],
-                                  converters={'Plate barcode': str, 'Sample barcode': str, 'Fraction #': int})
+    my_density_df = fraction_plate_io.readDensityFile(dens_path, usecols=[
+                                                      'Plate barcode', 'Sample barcode', 'Well Pos', 'Fraction #', 'Density', 'Spike-in Mass (pg)'])
 
     # # check if desnity .xlsx file already hase values ented in Spike-in Mass (pg) column
     # if not(my_density_df['Spike-in Mass (pg)'].isnull().all()):
@@ -206,42 +186,9 @@ def getConc(my_dirname, my_dna):
 
     conc_path = my_dirname+"/" + my_dna
 
-    tmp_conc_file = 'tmp_conc.txt'
-
-    with open(tmp_conc_file, 'w') as outfile:
-        with open(conc_path, 'r') as file:
-            for line in file:
-                if not line.isspace():
-                    outfile.write(line)
-
-    my_DNA_conc_df = pd.read_csv(tmp_conc_file, sep='\t', header=1, usecols=['Well ID', 'Well', '[Concentration]'],
-                                 converters={'[Concentration]': str}, skip_blank_lines=True)
-
-    # remove empty lines with NaN
-    my_DNA_conc_df.dropna(inplace=True)
-
-    # remove blanks and standards from dataframe and keep only rows with "SPL" in well ID
-    my_DNA_conc_df = my_DNA_conc_df.loc[my_DNA_conc_df['Well ID'].str.contains(
-        'SPL')]
-
-    my_DNA_conc_df.drop('Well ID', inplace=True, axis=1)
-
-    # remove "<" character from dna conc for samples below detection limit
-    my_DNA_conc_df["[Concentration]"] = my_DNA_conc_df["[Concentration]"].str.replace(
-        '<', '')
-
-    # replace dna conc values <= 0.001 with 0.001 ng/ul.  Clarity/ITS won't accept a conc <= 0
-    my_DNA_conc_df["[Concentration]"] = np.where(my_DNA_conc_df["[Concentration]"].astype(
-        float) <= 0.001, 0.001, my_DNA_conc_df["[Concentration]"].astype(float))
-
-    # round DNA concentration
-    my_DNA_conc_df = my_DNA_conc_df.round({'[Concentration]': 3})
-
-    try:
-        os.remove(tmp_conc_file)
-
-    except:
-        print(f'\nError deleting {tmp_conc_file}')
+    # parse DNA conc file in memory, keeping only "SPL" wells
+    # with values <= 0.001 set to 0.001 ng/ul and rounded to 3 places
+    my_DNA_conc_df = fraction_plate_io.readConcFile(conc_path)
 
     return my_DNA_conc_df
 
@@ -316,7 +263,7 @@ def updatePostVolume(post_all_plate_df, resuspend_vol=-1):
     if resuspend_vol == -1:
 
         resuspend_vol = float(
-            input("Enter the resuspension volume following PEG precipitation (default 35): ") or 35)
+            sip_params.ask('peg_resuspension_vol', "Enter the resuspension volume following PEG precipitation (default 35): ") or 35)
 
         if (resuspend_vol <= 0):
             print('\n\nError.  Resuspension volume must be >0.  Aborting.\n\n')
@@ -593,7 +540,7 @@ def main(total_fractions=-1, resuspend_vol=-1, date=-1):
                             'Sample barcode', 'Plate barcode', 'Fraction #', 'Density'], how='left')
 
     # read project_database.csv into  a dataframe
-    project_df = pd.read_csv(PROJECT_DIR / 'project_database.csv', header=0, usecols=['Sample_Name', 'Replicate_Group', 'ITS_sample_id'], converters={
+    project_df = project_db.readCsv(PROJECT_DIR / 'project_database.csv', usecols=['Sample_Name', 'Replicate_Group', 'ITS_sample_id'], converters={
         'ITS_sample_id': str})
 
     # add user sample name and replicate group to all_plate_df
@@ -603,7 +550,7 @@ def main(total_fractions=-1, resuspend_vol=-1, date=-1):
         all_plate_df, sample_dict, total_fractions)
 
     # Create and instance of PdfFileMerger() class
-    merger = PdfFileMerger()
+    merger = PyPDF2.PdfFileMerger()
 
     # loop through group figure pdfs and merge them into one
     for pdf in pdf_files:
@@ -633,4 +580,14 @@ def main(total_fractions=-1, resuspend_vol=-1, date=-1):
 
 
 if __name__ == "__main__":
+    step_metrics.timeFunctions(globals())
+
     main(-1, -1)
+
+    # Create success marker to indicate script completed successfully.
+    # This script is run from 3_merge_density_vol_conc_files
+    status_dir = Path.cwd().parent / ".workflow_status"
+    status_dir.mkdir(exist_ok=True)
+    success_file = status_dir / "pre_vs_post_dna_conc_plots.success"
+    success_file.touch()
+    step_metrics.writeMetrics(success_file)
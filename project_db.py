@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+# Incremental updates of the project sqlite databases, project_database.db
+# and lib_info.db.
+#
+# Scripts used to archive the whole .db file and re-write every table with
+# df.to_sql(..., if_exists='replace') at the end of each step.  upsertTable()
+# instead compares the updated dataframe with the table by key, i.e.
+# ITS_sample_id for project_database and Sample Barcode + Fraction # for
+# lib_info, and in one transaction only inserts, updates, or deletes the
+# rows that changed.  The previous values of changed rows are kept in a
+# changelog table, e.g. lib_info_changelog, in the same .db, so a step can
+# be undone with rollbackTable() without full archive copies.
+#
+# When the columns or column types of the table change, or row order would
+# differ from the dataframe, the table is replaced as before and the old
+# .db file is moved to archived_files, through archive_store.py.
+#
+# writeCsv() writes the lib_info.csv / project_database.csv copies of the
+# tables.  With SIP_PARQUET_MIRROR=1 (and pyarrow installed) a typed, zstd
+# compressed .parquet mirror is written next to each csv, and the previous
+# mirror, rather than the csv, becomes the archived snapshot.  readCsv()
+# loads only the requested columns from the mirror when it is at least as
+# new as the csv, e.g. not after the csv was edited by hand, and otherwise
+# reads the csv as before.
+#
+# USAGE:   import project_db
+#          project_db.upsertTable(PROJECT_DIR / 'lib_info.db', 'lib_info', lib_df,
+#                                 ['Sample Barcode', 'Fraction #'], ARCHIV_DIR / f"archive_lib_info_{date}.db")
+#          project_db.writeCsv(PROJECT_DIR / 'lib_info.csv', lib_df, ARCHIV_DIR / f"archive_lib_info_{date}")
+#          lib_df = project_db.readCsv(PROJECT_DIR / 'lib_info.csv', usecols=[...], converters={'Sample Barcode': str})
+
+
+import os
+import sys
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+import lazy_import
+import archive_store
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
+
+# parquet mirrors of the csv files are only used when pyarrow is installed
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# key columns of each table
+PROJECT_DB_KEYS = ['ITS_sample_id']
+LIB_INFO_KEYS = ['Sample Barcode', 'Fraction #']
+
+
+##########################
+##########################
+def quote(name):
+
+    return '"' + name.replace('"', '""') + '"'
+##########################
+##########################
+
+
+##########################
+##########################
+def replaceTable(db_path, table_name, df, archive_path):
+
+    # full re-write of the table, same as scripts did before
+    if (archive_path is not None) and Path(db_path).exists():
+
+        # archive the current sql .db
+        archive_store.archiveFile(db_path, archive_path)
+
+    engine = sqlalchemy.create_engine(f'sqlite:///{db_path}')
+
+    # Export the DataFrame to the SQLite database
+    df.to_sql(table_name, engine, if_exists='replace', index=False)
+
+    engine.dispose()
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def getColumnTypes(conn, table_name):
+
+    return [(r[1], r[2]) for r in conn.execute(f'PRAGMA table_info({quote(table_name)})')]
+##########################
+##########################
+
+
+##########################
+##########################
+def getExpectedTypes(df, table_name):
+
+    # create the table pandas would make for df in an empty in-memory
+    # database, so column types can be compared with the existing table
+    engine = sqlalchemy.create_engine('sqlite://')
+
+    schema = pd.io.sql.get_schema(df, table_name, con=engine)
+
+    engine.dispose()
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute(schema)
+    types = getColumnTypes(conn, table_name)
+    conn.close()
+
+    return types
+##########################
+##########################
+
+
+##########################
+##########################
+def toRows(df):
+
+    # values as they are stored in sqlite, i.e. python objects with None for NaN
+    columns = [df[c].astype(object).where(df[c].notna(), None).tolist()
+               for c in df.columns]
+
+    return [tuple(r) for r in zip(*columns)]
+##########################
+##########################
+
+
+##########################
+##########################
+def canUpsert(conn, table_name, df, key_cols):
+
+    # a keyed update gives the same table as a full replace only if
+    # columns, column types, and keys match
+    if len(df.select_dtypes(include=['datetime', 'datetimetz', 'timedelta']).columns) > 0:
+        return False
+
+    if not all(k in df.columns for k in key_cols):
+        return False
+
+    if df.duplicated(subset=key_cols).any() or df[key_cols].isna().values.any():
+        return False
+
+    return getColumnTypes(conn, table_name) == getExpectedTypes(df, table_name)
+##########################
+##########################
+
+
+##########################
+##########################
+def createChangelog(conn, table_name):
+
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS {quote(table_name + "_changelog")} (
+                     changed_at TEXT, script TEXT, action TEXT, row_id INTEGER,
+                     row_key TEXT, old_values TEXT, new_values TEXT)''')
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def upsertTable(db_path, table_name, df, key_cols, archive_path=None):
+
+    # returns the number of inserted, updated, and deleted rows,
+    # or None if the whole table was replaced
+    if not Path(db_path).exists():
+        replaceTable(db_path, table_name, df, None)
+        return None
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+
+    try:
+        # lock the database for the whole update, so a failure leaves it unchanged
+        conn.execute('BEGIN IMMEDIATE')
+
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                              (table_name,)).fetchone() is not None
+
+        changes = None
+
+        if exists and canUpsert(conn, table_name, df, key_cols):
+            changes = applyChanges(conn, table_name, df, key_cols)
+
+        if changes is None:
+            conn.execute('ROLLBACK')
+        else:
+            conn.execute('COMMIT')
+
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+    finally:
+        conn.close()
+
+    if changes is None:
+        replaceTable(db_path, table_name, df, archive_path)
+
+    return changes
+##########################
+##########################
+
+
+##########################
+##########################
+def applyChanges(conn, table_name, df, key_cols):
+
+    columns = list(df.columns)
+    key_idx = [columns.index(k) for k in key_cols]
+
+    col_sql = ', '.join(quote(c) for c in columns)
+
+    old = {}
+    old_order = []
+    for r in conn.execute(f'SELECT rowid, {col_sql} FROM {quote(table_name)} ORDER BY rowid'):
+        key = tuple(r[1 + i] for i in key_idx)
+        old[key] = (r[0], r[1:])
+        old_order.append(key)
+
+    new_rows = toRows(df)
+    new_keys = [tuple(r[i] for i in key_idx) for r in new_rows]
+
+    # rows keep their place in the table, and new rows are added at the end,
+    # so the dataframe must list existing rows in table order before new rows
+    kept = [k for k in new_keys if k in old]
+    kept_set = set(kept)
+    if (kept != [k for k in old_order if k in kept_set]) or (new_keys[:len(kept)] != kept):
+        return None
+
+    now = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
+    script = os.path.basename(sys.argv[0])
+    log = []
+
+    new_key_set = set(new_keys)
+    for key in old_order:
+        if key not in new_key_set:
+            rowid, values = old[key]
+            conn.execute(f'DELETE FROM {quote(table_name)} WHERE rowid = ?', (rowid,))
+            log.append((now, script, 'delete', rowid, json.dumps(key),
+                        json.dumps(dict(zip(columns, values))), None))
+
+    placeholders = ', '.join('?' for c in columns)
+
+    for key, row in zip(new_keys, new_rows):
+        if key not in old:
+            cur = conn.execute(
+                f'INSERT INTO {quote(table_name)} ({col_sql}) VALUES ({placeholders})', row)
+            log.append((now, script, 'insert', cur.lastrowid, json.dumps(key),
+                        None, json.dumps(dict(zip(columns, row)))))
+            continue
+
+        rowid, values = old[key]
+
+        # only columns whose value changed are written
+        changed = [i for i, (a, b) in enumerate(zip(values, row))
+                   if (a != b) or (type(a) is str) != (type(b) is str)]
+
+        if len(changed) > 0:
+            set_sql = ', '.join(f'{quote(columns[i])} = ?' for i in changed)
+            conn.execute(f'UPDATE {quote(table_name)} SET {set_sql} WHERE rowid = ?',
+                         [row[i] for i in changed] + [rowid])
+            log.append((now, script, 'update', rowid, json.dumps(key),
+                        json.dumps({columns[i]: values[i] for i in changed}),
+                        json.dumps({columns[i]: row[i] for i in changed})))
+
+    if len(log) > 0:
+        createChangelog(conn, table_name)
+        conn.executemany(
+            f'INSERT INTO {quote(table_name + "_changelog")} VALUES (?, ?, ?, ?, ?, ?, ?)', log)
+
+    return len(log)
+##########################
+##########################
+
+
+##########################
+##########################
+def rollbackTable(db_path, table_name, since):
+
+    # undo every change logged at or after 'since', a date string in the
+    # same format used for archive file names, e.g. 2024_05_01-Time13-45-00
+    conn = sqlite3.connect(db_path, isolation_level=None)
+
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+
+        log = conn.execute(f'''SELECT rowid, action, row_id, old_values FROM {quote(table_name + "_changelog")}
+                               WHERE changed_at >= ? ORDER BY rowid DESC''', (since,)).fetchall()
+
+        for log_id, action, row_id, old_values in log:
+            if action == 'insert':
+                conn.execute(f'DELETE FROM {quote(table_name)} WHERE rowid = ?', (row_id,))
+
+            elif action == 'update':
+                values = json.loads(old_values)
+                set_sql = ', '.join(f'{quote(c)} = ?' for c in values)
+                conn.execute(f'UPDATE {quote(table_name)} SET {set_sql} WHERE rowid = ?',
+                             list(values.values()) + [row_id])
+
+            elif action == 'delete':
+                values = json.loads(old_values)
+                col_sql = ', '.join(['rowid'] + [quote(c) for c in values])
+                conn.execute(f'INSERT INTO {quote(table_name)} ({col_sql}) VALUES ({", ".join("?" * (len(values) + 1))})',
+                             [row_id] + list(values.values()))
+
+            conn.execute(f'DELETE FROM {quote(table_name + "_changelog")} WHERE rowid = ?', (log_id,))
+
+        conn.execute('COMMIT')
+
+    except Exception:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+    finally:
+        conn.close()
+
+    return len(log)
+##########################
+##########################
+
+
+##########################
+##########################
+def useParquetMirror():
+
+    return (os.environ.get('SIP_PARQUET_MIRROR', '0') == '1') and (pyarrow is not None)
+##########################
+##########################
+
+
+##########################
+##########################
+def getMirrorPath(csv_path):
+
+    return Path(csv_path).with_suffix('.parquet')
+##########################
+##########################
+
+
+##########################
+##########################
+def isMirrorCurrent(csv_path):
+
+    # a csv changed after the mirror was written, e.g. edited by hand, wins.
+    # The csv is the file of record, so a mirror without one isn't used
+    pq_path = getMirrorPath(csv_path)
+
+    if (pyarrow is None) or (not pq_path.exists()) or (not Path(csv_path).exists()):
+        return False
+
+    return pq_path.stat().st_mtime_ns >= Path(csv_path).stat().st_mtime_ns
+##########################
+##########################
+
+
+##########################
+##########################
+def writeParquetMirror(pq_path, df):
+
+    tmp = pq_path.with_suffix(f'.{os.getpid()}.tmp')
+
+    try:
+        df.to_parquet(tmp, index=False, compression='zstd')
+
+        # only keep mirror if it reads back exactly as written
+        back = pd.read_parquet(tmp)
+        if back.equals(df.reset_index(drop=True)):
+            os.replace(tmp, pq_path)
+        else:
+            pq_path.unlink(missing_ok=True)
+
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def writeCsv(csv_path, df, archive_stem=None):
+
+    # archive_stem is the archive path without extension,
+    # e.g. ARCHIV_DIR / f"archive_lib_info_{date}"
+    csv_path = Path(csv_path)
+    pq_path = getMirrorPath(csv_path)
+
+    if archive_stem is not None:
+        archive_stem = Path(archive_stem)
+
+        # the current files are copied, not moved, so readers never find
+        # the csv missing while it's rewritten
+        if useParquetMirror() and isMirrorCurrent(csv_path):
+            # archive the current mirror.  Already a compressed snapshot of the csv
+            archive_store.archiveFile(pq_path, archive_stem.with_suffix('.parquet'), move=False)
+
+        else:
+            # archive the current csv
+            archive_store.archiveFile(csv_path, archive_stem.with_suffix('.csv'), move=False)
+
+    # create updated csv file next to the old one and swap it in, so a
+    # step reading the csv at the same time gets the old or the new file
+    tmp = csv_path.with_suffix(f'.{os.getpid()}.tmp')
+
+    try:
+        df.to_csv(tmp, index=False)
+
+        os.replace(tmp, csv_path)
+
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    if useParquetMirror():
+        writeParquetMirror(pq_path, df)
+    else:
+        # an old mirror would be out of date
+        pq_path.unlink(missing_ok=True)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def readCsv(csv_path, usecols=None, converters=None):
+
+    converters = converters or {}
+
+    if not isMirrorCurrent(csv_path):
+        return pd.read_csv(csv_path, header=0, usecols=usecols, converters=converters)
+
+    pq_path = getMirrorPath(csv_path)
+
+    df = pd.read_parquet(pq_path, columns=usecols)
+
+    # keep columns in file order, same as read_csv(usecols=...)
+    if usecols is not None:
+        df = df[[c for c in pyarrow.parquet.read_schema(pq_path).names if c in usecols]]
+
+    # converters get the text the csv would hold, e.g. '' for missing values
+    for col, conv in converters.items():
+        if col in df.columns:
+            df[col] = [conv('' if pd.isna(v) else str(v)) for v in df[col]]
+
+    return df
+##########################
+##########################
@@ -8,6 +8,9 @@ from datetime import datetime
 from os.path import exists as file_exists
 from pathlib import Path
 
+import project_db
+import sip_params
+
 
 # parent_headers = ['Proposal ID', 'Principal Investigator ',
 #                   'Sample Name', 'Sample Replicate Group', 'Sample ID', 'Barcode']
@@ -55,7 +58,7 @@ def updateProjectDatabase(current_project, parent_all_inclusive):
     if ('Sample_Name' in p_df.columns) or ('Replicate_Group' in p_df.columns):
         print('\n\nThe project_database.csv file already had columns with Sample Name and/or Replicate Group.  Do you want to overwrite?')
 
-        val = input()
+        val = sip_params.ask('overwrite_sample_names')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -93,11 +96,10 @@ def makeUpdatedFiles(merged_project_df):
     # update project database and archive older version of project database
     date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-    Path(PROJECT_DIR /
-         "project_database.csv").rename(ARCHIV_DIR / f"archive_project_database_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_project_database_{date}.csv").touch()
-
-    merged_project_df.to_csv(PROJECT_DIR / 'project_database.csv', index=False)
+    # archive the current project_database.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(PROJECT_DIR / 'project_database.csv', merged_project_df,
+                        ARCHIV_DIR / f"archive_project_database_{date}")
 
     return
 ############################
@@ -8,6 +8,10 @@ from datetime import datetime
 from os.path import exists as file_exists
 from pathlib import Path
 
+import project_db
+import archive_store
+import sip_params
+
 
 # parent_headers = ['Proposal ID', 'Principal Investigator ',
 #                   'Sample Name', 'Sample Replicate Group', 'Sample ID', 'Barcode']
@@ -55,7 +59,7 @@ def updateProjectDatabase(current_project, parent_all_inclusive):
     if ('Sample_Name' in p_df.columns) or ('Replicate_Group' in p_df.columns):
         print('\n\nThe project_database.csv file already had columns with Sample Name and/or Replicate Group.  Do you want to overwrite?')
 
-        val = input()
+        val = sip_params.ask('overwrite_sample_names')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -106,7 +110,7 @@ def updateLibInfo(my_lib_info, merged_project_df):
     if ('Fraction_sample_name' in my_lib_info_df.columns) or ('Replicate_Group' in my_lib_info_df.columns):
         print('\n\nThe lib_info.csv / lib_info_submitted...csv file already have columns with Fraction_sample_name and/or Replicate_Group.  Do you want to overwrite?')
 
-        val = input()
+        val = sip_params.ask('overwrite_lib_sample_names')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -152,18 +156,15 @@ def makeUpdatedFiles(merged_project_df, updated_lib_info_df):
     # update project database and archive older version of project database
     date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-    Path(PROJECT_DIR /
-         "project_database.csv").rename(ARCHIV_DIR / f"archive_project_database_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_project_database_{date}.csv").touch()
-
-    merged_project_df.to_csv(PROJECT_DIR / 'project_database.csv', index=False)
-
-    # update lib_info.csv and archive older version
-    Path(PROJECT_DIR /
-         "lib_info.csv").rename(ARCHIV_DIR / f"archive_lib_info_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_lib_info_{date}.csv").touch()
+    # archive the current project_database.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(PROJECT_DIR / 'project_database.csv', merged_project_df,
+                        ARCHIV_DIR / f"archive_project_database_{date}")
 
-    updated_lib_info_df.to_csv(PROJECT_DIR / 'lib_info.csv', index=False)
+    # archive the current lib_info.csv and create updated version, plus
+    # a parquet mirror when SIP_PARQUET_MIRROR=1
+    project_db.writeCsv(PROJECT_DIR / 'lib_info.csv', updated_lib_info_df,
+                        ARCHIV_DIR / f"archive_lib_info_{date}")
 
     return
 ############################
@@ -219,10 +220,8 @@ if (file_exists(submit_info) == 1):
     # update project database and archive older version of project database
     date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-    Path(PROJECT_DIR /
-         "lib_info_submitted_to_clarity.csv").rename(ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity_{date}.csv")
-    Path(ARCHIV_DIR /
-         f"archive_lib_info_submitted_to_clarity_{date}.csv").touch()
+    archive_store.archiveFile(PROJECT_DIR / "lib_info_submitted_to_clarity.csv",
+                              ARCHIV_DIR / f"archive_lib_info_submitted_to_clarity_{date}.csv")
 
     updated_submit_df.to_csv(
         PROJECT_DIR / 'lib_info_submitted_to_clarity.csv', index=False)
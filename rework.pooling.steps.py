@@ -11,6 +11,11 @@ from datetime import datetime
 # call exists() function named 'file_exists'
 from os.path import exists as file_exists
 
+import archive_store
+import sip_params
+import plate_geometry
+import step_metrics
+
 
 
 
@@ -73,7 +78,7 @@ def makeFinalPoolTransfer(pool_df):
     
     if tmp_df.shape[0]>0:
         dup_list =tmp_df['pool'].tolist()
-        duplicate = input((f"\n\nThere are pools with duplicate siz-selected tubes,i.e. {dup_list}. Do you with to continue (y/n)?  ") or 'n')
+        duplicate = sip_params.ask('continue_duplicate_size_selection', (f"\n\nThere are pools with duplicate siz-selected tubes,i.e. {dup_list}. Do you with to continue (y/n)?  ") or 'n')
         
         if duplicate != 'y' and duplicate != 'Y':
             print ('\n\nOk. Please fix pool_summary.csv.  Aborting script\n\n')
@@ -93,7 +98,7 @@ def makeFinalPoolTransfer(pool_df):
 
     final_df['Destination_Tube_Barcode'] = final_df['Destination_Tube_Name']
     
-    transfer_vol = float(input("\nWhat is transfer volume for loading final LIMS tubes? default is 49:   ")  or 49)
+    transfer_vol = float(sip_params.ask('lims_tube_transfer_vol', "\nWhat is transfer volume for loading final LIMS tubes? default is 49:   ")  or 49)
 
     if transfer_vol <= 0:
         print ('\nTransfer volumes must by > 0uL.  Aborting script\n')
@@ -191,7 +196,7 @@ def incrementPoolNumberInName(redo_dest_tube_list,new_dest_list):
         # requesting a whole new pool. There shouldn't be enough of the 
         # first pool remainin for 3 attempts
         if y == 3 and r not in new_dest_list:
-            x = input((f"\n\n{r} will be on 3rd attempt at size selction, but a whole new pool has not been requested.  Do you wish to proceed (y/n)?  ")or'n')
+            x = sip_params.ask('proceed_third_size_selection', (f"\n\n{r} will be on 3rd attempt at size selction, but a whole new pool has not been requested.  Do you wish to proceed (y/n)?  ")or'n', key=r)
         
             if x in ['y','yes','Y']:
                 redo_dict[redo_dest_tube_list[i]] = s  
@@ -204,7 +209,7 @@ def incrementPoolNumberInName(redo_dest_tube_list,new_dest_list):
         # double check if doing a > 4thrd attenpt at size selection 
         #There shouldn't be enough of the pooled material remaining for 5+ attempts
         elif y >4:
-            x = input((f"\n\n{r} will be on >4th attempt at size selction, but the pool should be exhausted.  Do you with to proceed (y/n)?  ")or'n')
+            x = sip_params.ask('proceed_fourth_size_selection', (f"\n\n{r} will be on >4th attempt at size selction, but the pool should be exhausted.  Do you with to proceed (y/n)?  ")or'n', key=r)
         
             if x in ['y','yes','Y']:
                 redo_dict[redo_dest_tube_list[i]] = s  
@@ -458,28 +463,12 @@ def makePippinBarcodeFile(rework_df):
 # this verseion fo function assuming pool will be split into 1 pippin lane
 def getWellList(FA_df):
 
-    # list will be refernced to convert row number into row letter
-    row_list = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-
-    well_list = []
-
     num_fa_wells = len(FA_df['Dest_Tube_Size_Selected'].unique().tolist())
 
     num_rows = math.ceil(num_fa_wells/10)
 
-    for i in range(1, (12*num_rows)+1):
-
-        # set row number as floor after dividing by 12
-        r = math.floor((i-1)/12)
-
-        # set column number as modulo of 12
-        c = ((i) % 12)
-
-        if c == 0:
-            well_list.append(row_list[r]+'12')
-
-        else:
-            well_list.append(row_list[r]+str(c))
+    # whole rows of the FA plate, A1, A2, ... A12, B1, ...
+    well_list = plate_geometry.getWellList(96, order='row')[:12*num_rows]
 
     return well_list, num_rows
 ##########################
@@ -688,9 +677,8 @@ def reSizeModule(pool_df, rework_df):
     
     
     
-    Path(POOL_DIR /
-          "pool_summary.csv").rename(ARCHIV_DIR / f"archive_pool_summary_{date}.csv")
-    Path(ARCHIV_DIR / f"archive_pool_summary_{date}.csv").touch()
+    archive_store.archiveFile(POOL_DIR / "pool_summary.csv",
+                              ARCHIV_DIR / f"archive_pool_summary_{date}.csv")
 
     # create updated library info file
     pool_df.to_csv(POOL_DIR / 'pool_summary.csv', index=False, header=True)
@@ -707,6 +695,8 @@ def reSizeModule(pool_df, rework_df):
 ### MAIN PRORGRAM
 ###################
 
+step_metrics.timeFunctions(globals())
+
 # get current date and time, will add to archive database file name
 date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
@@ -756,7 +746,7 @@ rework_df = rework_df.sort_values(by=['Pool_Name'], ascending=True)
 rework_df.reset_index(drop=True, inplace=True)
 
 if rework_df.shape[0] == 0:
-    all_done = (input("\nNo pools need rework. Is that correct (y/n)?   ")  or 'n')
+    all_done = (sip_params.ask('confirm_no_pool_rework', "\nNo pools need rework. Is that correct (y/n)?   ")  or 'n')
 
     if all_done.lower() == 'y':
         
@@ -809,5 +799,6 @@ import os
 os.makedirs('.workflow_status', exist_ok=True)
 with open('.workflow_status/rework.pooling.steps.success', 'w') as f:
     f.write('Script completed successfully')
+step_metrics.writeMetrics('.workflow_status/rework.pooling.steps.success')
 
 
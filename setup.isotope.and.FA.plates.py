@@ -16,16 +16,20 @@ import xlrd
 from xlutils.copy import copy
 from os.path import exists as file_exists
 from pathlib import Path
-from sqlalchemy import create_engine
+
+import lazy_import
+import project_db
+import sip_params
+import plate_geometry
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
 
 
 
 # define list of destination well positions for a 96-well
-well_list_96w = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                 'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                 'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                 'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                 'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12', 'H12']
+well_list_96w = plate_geometry.getWellList(96)
 
 
 #########################
@@ -104,14 +108,10 @@ def createDirectories():
 #########################
 def getWellDictionary():
 
-    my_well_list = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'G1', 'H1', 'A2', 'B2', 'C2', 'D2', 'E2', 'F2', 'G2', 'H2', 'A3', 'B3', 'C3',
-                    'D3', 'E3', 'F3', 'G3', 'H3', 'A4', 'B4', 'C4', 'D4', 'E4', 'F4', 'G4', 'H4', 'A5', 'B5', 'C5', 'D5', 'E5', 'F5', 'G5',
-                    'H5', 'A6', 'B6', 'C6', 'D6', 'E6', 'F6', 'G6', 'H6', 'A7', 'B7', 'C7', 'D7', 'E7', 'F7', 'G7', 'H7', 'A8', 'B8', 'C8',
-                    'D8', 'E8', 'F8', 'G8', 'H8', 'A9', 'B9', 'C9', 'D9', 'E9', 'F9', 'G9', 'H9', 'A10', 'B10', 'C10', 'D10', 'E10', 'F10', 'G10',
-                    'H10', 'A11', 'B11', 'C11', 'D11', 'E11', 'F11', 'G11', 'H11', 'A12', 'B12', 'C12', 'D12', 'E12', 'F12', 'G12', 'H12']
+    my_well_list = plate_geometry.getWellList(96)
 
     # make dict with key == well postion, and value == list position, e.g. {'A1':0, 'B1':1, ...}
-    my_well_dict = {k: v for v, k in enumerate(my_well_list)}
+    my_well_dict = plate_geometry.getWellDict(96)
 
     return my_well_list, my_well_dict
 
@@ -331,7 +331,7 @@ def mergeAliquotSSmini():
 def getUserInputMinMaxParameters():
     # # ask User to input minimum volume liquid handler can transfer
     my_min_trans_vol = float(
-        input("Enter the minimum volume liquid handler can pipet (default 2.4ul): ") or 2.4)
+        sip_params.ask('min_transfer_vol', "Enter the minimum volume liquid handler can pipet (default 2.4ul): ") or 2.4)
 
     if (my_min_trans_vol < 0):
         print('\n\nError.  Minimum volume must be >0 uL.  Aborting.\n\n')
@@ -339,7 +339,7 @@ def getUserInputMinMaxParameters():
 
     # user provides amount of DNA to transfer for isotope QC
     my_trans_mass = float(
-        input("Enter the target transfer mass in ng's for isotope screening (default 60): ") or 60)
+        sip_params.ask('isotope_transfer_mass', "Enter the target transfer mass in ng's for isotope screening (default 60): ") or 60)
 
     # check that isotope transfer mass doesn't exceed 10% of total available DNA mass
     if (my_trans_mass >= (0.1*clarity_df['Available Mass (ng)'].min())):
@@ -347,7 +347,7 @@ def getUserInputMinMaxParameters():
         #     clarity_df[clarity_df['Available Mass (ng)'] <= (my_trans_mass*10)])
         print("\nIsotope transfer DNA mass is >=10% of total available DNA for at least one sample. \nDo you wish to continue (Y/N)? :")
 
-        val = input()
+        val = sip_params.ask('continue_high_isotope_mass')
 
         if (val == 'Y' or val == 'y'):
             print("\nOk, we'll keep going")
@@ -362,14 +362,14 @@ def getUserInputMinMaxParameters():
     # user provide minimum volume for each sample.  Buffer will be added to sample
     # to bring volume up to minimum value
     my_min_sample_vol = float(
-        input("\nEnter the minimum volume for sample matrix tubes (default 60ul): ") or 60)
+        sip_params.ask('min_sample_vol', "\nEnter the minimum volume for sample matrix tubes (default 60ul): ") or 60)
 
     if (my_min_sample_vol < 0):
         print('\n\nError.  Minimum volume must be >0 uL.  Aborting.\n\n')
         sys.exit()
 
     my_max_dna_conc = float(
-        input("\nEnter the max target DNA conc for sample matrix tubes (default 25ng/ul): ") or 25)
+        sip_params.ask('max_sample_dna_conc', "\nEnter the max target DNA conc for sample matrix tubes (default 25ng/ul): ") or 25)
 
     if (my_max_dna_conc < 0):
         print('\n\nError.  Maximum conc must be >0 ng/uL.  Aborting.\n\n')
@@ -448,7 +448,7 @@ def calcDnaBufferTransfers(merged_df):
 def setupFAplate(merged_df, well_list, control_df):
     # calculte amount of buffer to add to isotope destination plate
     FA_trans_vol = float(
-        input("Enter the volume to transfer for FA plate (default 2.4ul): ") or 2.4)
+        sip_params.ask('fa_transfer_vol', "Enter the volume to transfer for FA plate (default 2.4ul): ") or 2.4)
 
     merged_df['Buffer_isotope_vol_(ul)'] = 45 + \
         FA_trans_vol - merged_df['Isotope_vol_(ul)']
@@ -651,7 +651,7 @@ def updateProjectDatabase(p_df, parent_all_inclusive):
     if ('Sample_Name' in p_df.columns) or ('Replicate_Group' in p_df.columns):
         print('\n\nThe project_database.csv file already had columns with Sample Name and/or Replicate Group.  Do you want to overwrite?')
 
-        val = input()
+        val = sip_params.ask('overwrite_sample_names')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -885,7 +885,7 @@ def createSQLdb(result_df):
 
     sql_db_path = BASE_OUTPUT_DIR /'project_database.db'
 
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
 
     # Specify the table name and database engine
@@ -905,6 +905,8 @@ def createSQLdb(result_df):
 #########################
 # MAIN PROGRAM
 #########################
+step_metrics.timeFunctions(globals())
+
 # Set the input directory to the current working directory
 input_dir = Path.cwd()
 
@@ -974,7 +976,7 @@ makeFAUploadFiles(merged_df, well_list_96w)
 isotope_df.to_csv(ISO_OUTPUT_DIR / 'isotope_transfer.csv', index=False)
 
 # project_df.to_csv('project_database.csv', index=False, line_terminator='\r\n')
-updated_project_df.to_csv('project_database.csv', index=False)
+project_db.writeCsv('project_database.csv', updated_project_df)
 
 # make sqlite db for the project_database
 createSQLdb(updated_project_df)
@@ -997,4 +999,6 @@ try:
     print(f"✓ Step {script_name} completed successfully")
 except Exception as e:
     print(f"✗ Failed to create success marker: {e}")
-    sys.exit(1)
\ No newline at end of file
+    sys.exit(1)
+
+step_metrics.writeMetrics(success_file)
\ No newline at end of file
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+# Answers to the questions the workflow scripts ask with input().
+#
+# Every prompt goes through ask(), which first looks for an answer in the
+# project's parameter file, sip_params.json (or sip_params.yaml /
+# sip_params.yml when PyYAML is installed), found in the folder the script is
+# run from or one of its parents.  SIP_PARAMS_FILE can point to a different
+# file.  Answers can be given for all scripts or per script:
+#
+#     {"total_fractions": 24,
+#      "calcSequinAddition": {"high_sequin_stock_conc": 70},
+#      "fill.clarity.lib.creation.sheet": {"pcr_cycles": {"27-123456": 12, "default": 12}}}
+#
+# A dict answer is looked up by the key passed to ask(), e.g. the plate id,
+# and falls back to its "default" entry.  Questions without an answer in the
+# file are asked as before.  With SIP_BATCH=1 nothing is asked: the answer is
+# left blank so the script uses its usual default, and y/n questions without
+# an answer abort the script as they would for any other invalid answer.
+# sip_params.example.json lists every parameter with its default.
+#
+# USAGE:   import sip_params
+#          total_fractions = float(sip_params.ask('total_fractions', "Enter the total # fractions collected (default 24): ") or 24)
+
+
+import os
+import sys
+import json
+from pathlib import Path
+
+# yaml parameter files are only read when PyYAML is installed
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+PARAM_FILE_NAMES = ['sip_params.json', 'sip_params.yaml', 'sip_params.yml']
+
+# parameters are read once per script run
+_params = None
+_params_path = None
+
+
+##########################
+##########################
+def isBatch():
+
+    return os.environ.get('SIP_BATCH', '0') == '1'
+##########################
+##########################
+
+
+##########################
+##########################
+def findParamFile(start_dir=None):
+
+    if os.environ.get('SIP_PARAMS_FILE'):
+        return Path(os.environ['SIP_PARAMS_FILE'])
+
+    if start_dir is None:
+        start_dir = Path.cwd()
+
+    # scripts run from the project folder or one of its sub folders
+    for d in [Path(start_dir)] + list(Path(start_dir).parents):
+        for name in PARAM_FILE_NAMES:
+            if (d / name).exists():
+                return d / name
+
+    return None
+##########################
+##########################
+
+
+##########################
+##########################
+def readParamFile(path):
+
+    with open(path) as f:
+        if path.suffix == '.json':
+            return json.load(f)
+
+        if yaml is None:
+            print(f'\n\nPyYAML is needed to read {path}.  Install it or use sip_params.json.  Aborting\n\n')
+            sys.exit()
+
+        return yaml.safe_load(f) or {}
+##########################
+##########################
+
+
+##########################
+##########################
+def getParams():
+
+    global _params, _params_path
+
+    if _params is None:
+        _params_path = findParamFile()
+
+        _params = readParamFile(_params_path) if _params_path is not None else {}
+
+    return _params
+##########################
+##########################
+
+
+##########################
+##########################
+def getScriptName():
+
+    return Path(sys.argv[0]).stem
+##########################
+##########################
+
+
+##########################
+##########################
+def lookup(params, script, name, key=None):
+
+    # a script's own section wins over the shared value
+    section = params.get(script)
+
+    if isinstance(section, dict) and (name in section):
+        value = section[name]
+    else:
+        value = params.get(name)
+
+    if isinstance(value, dict):
+        value = value.get(str(key), value.get('default')) if key is not None else value.get('default')
+
+    return value
+##########################
+##########################
+
+
+##########################
+##########################
+def toAnswer(value):
+
+    # answers are returned as text, the same as input()
+    if isinstance(value, bool):
+        return 'y' if value else 'n'
+
+    return str(value)
+##########################
+##########################
+
+
+##########################
+##########################
+def ask(name, prompt='', key=None):
+
+    value = lookup(getParams(), getScriptName(), name, key)
+
+    if value is not None:
+        answer = toAnswer(value)
+        print(f'{prompt}{answer}    ({name} from {_params_path.name})')
+        return answer
+
+    if isBatch():
+        print(f'{prompt}\n({name} not in parameter file, using default)')
+        return ''
+
+    return input(prompt)
+##########################
+##########################
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+# Timing and resource use of each workflow step.
+#
+# Importing step_metrics starts the clock and counts the project files the
+# script opens.  timeFunctions(globals()) wraps every function the script
+# defines, so the time spent in each of them (e.g. getDensity,
+# processFAfiles, createSQLdb), how often it was called and the rows of the
+# dataframes it returned are recorded.  Times include the functions called
+# from a function.  writeMetrics() is called when the success marker is
+# written and saves
+#   - .workflow_status/<step>.metrics.json, the profile of the last run, and
+#   - .workflow_status/metrics.jsonl, one line appended for every run,
+# with the wall and cpu time, peak memory, number and size of the files read
+# and written, and the per function times.  Files of python itself, its
+# packages and these scripts are not counted.
+#
+# Run on its own, step_metrics.py summarises metrics.jsonl: the time of each
+# step over all runs, its share of the project's total and its slowest
+# functions.
+#
+# USAGE:   import step_metrics
+#          step_metrics.timeFunctions(globals())          (after the function definitions)
+#          step_metrics.writeMetrics(success_file)        (next to the success marker)
+#
+#          python step_metrics.py [<project folder>] [--step STEP] [--top N]
+
+
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import sysconfig
+from datetime import datetime
+from pathlib import Path
+
+# peak memory is only available where the resource module is (not windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+METRICS_LOG = 'metrics.jsonl'
+
+# opens under these folders are python, package and script files, not project files
+IGNORED_DIRS = tuple(os.path.join(os.path.realpath(d), '') for d in
+                     {sys.prefix, sys.base_prefix, sys.exec_prefix, sysconfig.get_paths()['purelib'],
+                      str(SCRIPT_DIR), '/proc', '/sys', '/dev', '/etc', '/usr'})
+
+_start_time = time.perf_counter()
+_start_cpu = time.process_time()
+_started = datetime.now()
+
+_files_read = set()
+_files_written = set()
+
+# function name: [calls, seconds, rows]
+_functions = {}
+
+
+##########################
+##########################
+def auditOpen(event, args):
+
+    if event != 'open':
+        return
+
+    path, mode, flags = args
+
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return
+
+    path = os.path.abspath(os.fsdecode(path))
+
+    if path.startswith(IGNORED_DIRS):
+        return
+
+    if mode is not None:
+        writing = any(m in mode for m in 'wax+')
+    else:
+        writing = bool(flags & (os.O_WRONLY | os.O_RDWR))
+
+    (_files_written if writing else _files_read).add(path)
+
+    return
+##########################
+##########################
+
+
+sys.addaudithook(auditOpen)
+
+
+##########################
+##########################
+def countRows(result):
+
+    # rows of the dataframes a function returned, also inside tuples
+    if isinstance(result, tuple):
+        return sum(countRows(r) for r in result)
+
+    if hasattr(result, 'shape') and hasattr(result, 'columns'):
+        return result.shape[0]
+
+    return 0
+##########################
+##########################
+
+
+##########################
+##########################
+def timed(func):
+
+    stats = _functions.setdefault(func.__name__, [0, 0.0, 0])
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += time.perf_counter() - start
+
+        stats[2] += countRows(result)
+
+        return result
+
+    return wrapper
+##########################
+##########################
+
+
+##########################
+##########################
+def timeFunctions(namespace):
+
+    # wraps the functions defined in the script, not the ones it imported
+    for name, obj in list(namespace.items()):
+        if callable(obj) and hasattr(obj, '__code__') and (obj.__module__ == namespace.get('__name__')):
+            namespace[name] = timed(obj)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def getPeakMemoryMB():
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # bytes on mac, KB on linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+##########################
+##########################
+
+
+##########################
+##########################
+def totalSize(paths):
+
+    return sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+##########################
+##########################
+
+
+##########################
+##########################
+def getMetrics(step):
+
+    functions = {name: {'calls': calls, 'seconds': round(seconds, 4), 'rows': rows}
+                 for name, (calls, seconds, rows) in _functions.items() if calls}
+
+    return {'step': step,
+            'started': _started.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - _start_time, 4),
+            'cpu_seconds': round(time.process_time() - _start_cpu, 4),
+            'peak_memory_mb': getPeakMemoryMB(),
+            'rows_processed': sum(f['rows'] for f in functions.values()),
+            'files_read': len(_files_read),
+            'bytes_read': totalSize(_files_read),
+            'files_written': len(_files_written),
+            'bytes_written': totalSize(_files_written),
+            'functions': functions}
+##########################
+##########################
+
+
+##########################
+##########################
+def writeMetrics(success_file):
+
+    # metrics go next to the success marker, the step is named after it
+    success_file = Path(success_file)
+
+    metrics = getMetrics(success_file.stem)
+
+    # a failure to write metrics must not fail the step
+    try:
+        with open(success_file.with_suffix('.metrics.json'), 'w') as f:
+            json.dump(metrics, f, indent=1)
+
+        with open(success_file.parent / METRICS_LOG, 'a') as f:
+            f.write(json.dumps(metrics) + '\n')
+
+    except OSError as e:
+        print(f'Could not write metrics for {success_file.stem}: {e}')
+
+    return metrics
+##########################
+##########################
+
+
+##########################
+##########################
+def readMetricsLog(project_dir):
+
+    log_path = Path(project_dir) / '.workflow_status' / METRICS_LOG
+
+    if not log_path.exists():
+        print(f'\n\nNo metrics log {log_path}.  Aborting\n\n')
+        sys.exit()
+
+    runs = []
+
+    with open(log_path) as f:
+        for line in f:
+            if line.strip():
+                runs.append(json.loads(line))
+
+    return runs
+##########################
+##########################
+
+
+##########################
+##########################
+def summarise(runs, top=3):
+
+    # step: [runs, seconds, last seconds, peak memory, functions {name: seconds}]
+    steps = {}
+
+    for r in runs:
+        s = steps.setdefault(r['step'], [0, 0.0, 0.0, 0.0, {}])
+
+        s[0] += 1
+        s[1] += r['wall_seconds']
+        s[2] = r['wall_seconds']
+        s[3] = max(s[3], r['peak_memory_mb'] or 0)
+
+        for name, f in r['functions'].items():
+            s[4][name] = s[4].get(name, 0) + f['seconds']
+
+    total = sum(s[1] for s in steps.values()) or 1
+
+    print(f"{'step':<40} {'runs':>5} {'total s':>9} {'last s':>8} {'share':>6} {'peak MB':>8}   slowest functions")
+
+    for step, (n, seconds, last, memory, functions) in sorted(steps.items(), key=lambda x: -x[1][1]):
+        slowest = sorted(functions.items(), key=lambda x: -x[1])[:top]
+
+        slowest = ', '.join(f'{name} {t:.1f} s' for name, t in slowest)
+
+        print(f'{step:<40} {n:5d} {seconds:9.1f} {last:8.1f} {100 * seconds / total:5.1f}% {memory:8.0f}   {slowest}')
+
+    return steps
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('project', nargs='?', type=Path, default=Path.cwd())
+    parser.add_argument('--step', help='only runs of this step')
+    parser.add_argument('--top', type=int, default=3, help='slowest functions shown per step')
+    args = parser.parse_args()
+
+    runs = readMetricsLog(args.project)
+
+    if args.step is not None:
+        runs = [r for r in runs if r['step'] == args.step.removesuffix('.py')]
+
+    summarise(runs, args.top)
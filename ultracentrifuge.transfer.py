@@ -13,7 +13,14 @@ from datetime import datetime
 from os.path import exists as file_exists
 from pathlib import Path
 import math
-from sqlalchemy import create_engine
+
+import lazy_import
+import project_db
+import sip_params
+import step_metrics
+
+# imported when first used, see lazy_import.py
+sqlalchemy = lazy_import.lazyModule('sqlalchemy')
 
 
 
@@ -28,7 +35,7 @@ def readSQLdb():
     sql_db_path = PROJECT_DIR / 'project_database.db'
 
     # create sqlalchemy engine
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
+    engine = sqlalchemy.create_engine(f'sqlite:///{sql_db_path}') 
 
     # define sql query
     query = "SELECT * FROM project_database"
@@ -66,7 +73,7 @@ def getTubesForUltra(tube_file):
         print(tubes)
         print("\n\nThere are >16 tubes in list, which is more than rotor holds\n\n Do you wish to continue (Y/N)\n\n")
 
-        val = input()
+        val = sip_params.ask('continue_over_16_tubes')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -83,7 +90,7 @@ def getTubesForUltra(tube_file):
         print(tubes)
         print("\n\nThere are an odd number of tubes in list.\n\n Do you wish to continue (Y/N)\n\n")
 
-        val = input()
+        val = sip_params.ask('continue_odd_tubes')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -131,7 +138,7 @@ def checkIfEnoughMassorVolume(centrifuge_df):
         # print(centrifuge_df[centrifuge_df['Available_vol_(ul)'] <= 0])
         print("\nAt least one sample doesn't have any remaining volume\n\n See table above\n\n Do you wish to continue (Y/N)\n\n")
 
-        val = input()
+        val = sip_params.ask('continue_no_volume')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -145,7 +152,7 @@ def checkIfEnoughMassorVolume(centrifuge_df):
 
     # # ask User to input transfer mass, default value is 1,000 ng's
     centrifug_mass = float(
-        input("Enter the mass of DNA needed for ULTRACENTRIFUGE in ng's (default 1,000): ") or 1000)
+        sip_params.ask('ultracentrifuge_mass', "Enter the mass of DNA needed for ULTRACENTRIFUGE in ng's (default 1,000): ") or 1000)
 
     # abort if not enough sample mass for ultracentrifuge transfer
     if (any(centrifuge_df['Available_mass_(ng)'] < centrifug_mass)):
@@ -153,7 +160,7 @@ def checkIfEnoughMassorVolume(centrifuge_df):
         #     centrifuge_df[centrifuge_df['Available_mass_(ng)'] < centrifug_mass])
         print("\nAt least one sample doesn't have enough DNA mass\n\n See table above\n\n Do you wish to continue (Y/N)\n\n")
 
-        val = input()
+        val = sip_params.ask('continue_low_mass')
 
         if (val == 'Y' or val == 'y'):
             print("Ok, we'll keep going\n\n")
@@ -302,26 +309,10 @@ def createSQLdb(df):
     # get current date and time, will add to archive database file name
     date = datetime.now().strftime("%Y_%m_%d-Time%H-%M-%S")
 
-    sql_db_path = PROJECT_DIR /'project_database.db'
-
-    engine = create_engine(f'sqlite:///{sql_db_path}') 
-
-
-    # Specify the table name and database engine
-    table_name = 'project_database'
-    
-    if (file_exists(PROJECT_DIR / "project_database.db")):
-        
-        # archive the current sql .db
-        Path(PROJECT_DIR /
-              "project_database.db").rename(ARCHIV_DIR / f"archive_project_database_{date}.db")
-        Path(ARCHIV_DIR / f"archive_project_database_{date}.db").touch()
-
-    
-    # Export the DataFrame to the SQLite database
-    df.to_sql(table_name, engine, if_exists='replace', index=False) 
-
-    engine.dispose()
+    # write only the rows that changed to project_database.db.  The old .db is
+    # archived in full only when the table's columns change
+    project_db.upsertTable(PROJECT_DIR / 'project_database.db', 'project_database', df,
+                           project_db.PROJECT_DB_KEYS, ARCHIV_DIR / f"archive_project_database_{date}.db")
 
     return
 #########################
@@ -330,6 +321,8 @@ def createSQLdb(df):
 ###########################
 # MAIN PROGRAM
 ###########################
+step_metrics.timeFunctions(globals())
+
 # check if path  was provided, otherwise use current directory
 if len(sys.argv) < 2:
     print('\nDid not provide all required input files. Aborting. \n')
@@ -437,11 +430,10 @@ try:
 except Exception as e:
     print(f"\nWarning: Could not move {tube_file} to {OLD_DIR}: {e}")
 
-Path(PROJECT_DIR /
-     "project_database.csv").rename(ARCHIV_DIR / f"archive_project_database_{date}.csv")
-Path(ARCHIV_DIR / f"archive_project_database_{date}.csv").touch()
-
-project_df.to_csv(PROJECT_DIR / 'project_database.csv', index=False)
+# archive the current project_database.csv and create updated version, plus
+# a parquet mirror when SIP_PARQUET_MIRROR=1
+project_db.writeCsv(PROJECT_DIR / 'project_database.csv', project_df,
+                    ARCHIV_DIR / f"archive_project_database_{date}")
 
 # create updated project_database.db
 createSQLdb(project_df)
@@ -464,3 +456,5 @@ try:
 except Exception as e:
     print(f"✗ Failed to create success marker: {e}")
     sys.exit(1)
+
+step_metrics.writeMetrics(success_file)
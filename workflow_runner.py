@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+
+# Run the SIP workflow scripts in dependency order, skipping steps that are
+# already up to date.
+#
+# Steps are named after their .workflow_status/<step>.success markers.  A
+# step is re-run when
+#   - it has no success marker,
+#   - the files it reads (instrument files, sample lists, FA results, ...)
+#     have changed since its last success, or
+#   - a step it depends on succeeded more recently than it did.
+# Input fingerprints (size, mtime, and sha256 of every input file) are kept in
+# .workflow_status/<step>.inputs.json, written after each successful run.  A
+# step with a marker but no fingerprint, e.g. run from the GUI before this
+# runner existed, is taken as up to date and its fingerprint recorded.
+#
+# Steps that ask questions with input() are run one at a time with the
+# terminal.  The other steps, e.g. the plotting branches, are run at the
+# same time as each other and as the main chain, with their output written to
+# .workflow_status/<step>.log.  Optional steps (emergency third attempt,
+# plots, pool reworks) only run when asked for with --include or once they
+# have a marker in this project.  With SIP_BATCH=1 every step takes its
+# answers from sip_params.json and none of them needs the terminal.
+#
+# USAGE:   python workflow_runner.py [--dry-run] [--until STEP] [--include STEP ...]
+#                                    [--force STEP ...] [--arg STEP=VALUE ...] [--workers N]
+#
+#          python workflow_runner.py --arg ultracentrifuge.transfer=2_load_ultracentrifuge/tubes.csv
+
+
+import os
+import sys
+import json
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import archive_store
+import sip_params
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+FA_DIR = '4_make_library_analyze_fa'
+POOL_DIR = '5_pooling'
+
+# step name: script run, steps it follows, input file patterns relative to
+# the project folder, folder it is run from, whether it prompts the user,
+# and whether it is optional
+STEPS = {
+    'setup.isotope.and.FA.plates': {
+        'after': [],
+        'inputs': ['1_setup_isotope_qc_fa/input_files/*']},
+    'ultracentrifuge.transfer': {
+        'after': ['setup.isotope.and.FA.plates'],
+        'inputs': [],
+        'needs_arg': True},
+    'calcSequinAddition': {
+        'after': ['ultracentrifuge.transfer'],
+        'inputs': ['3_merge_density_vol_conc_files/*.xlsx', '3_merge_density_vol_conc_files/*.txt',
+                   '3_merge_density_vol_conc_files/*.csv', '3_merge_density_vol_conc_files/*.CSV']},
+    'merge.SIP.fraction.files.loop': {
+        'after': ['calcSequinAddition'],
+        'inputs': ['3_merge_density_vol_conc_files/*.xlsx', '3_merge_density_vol_conc_files/*.txt',
+                   '3_merge_density_vol_conc_files/*.csv', '3_merge_density_vol_conc_files/*.CSV']},
+    'make.library.creation.files.96': {
+        'after': ['merge.SIP.fraction.files.loop'],
+        'inputs': [f'{FA_DIR}/A_first_attempt_make_lib/library_selection_file.csv']},
+    'first.FA.output.analysis': {
+        'after': ['make.library.creation.files.96'],
+        'inputs': [f'{FA_DIR}/B_first_attempt_fa_result/**/*.csv']},
+    'rework.first.attempt': {
+        'after': ['first.FA.output.analysis'],
+        'inputs': [f'{FA_DIR}/B_first_attempt_fa_result/*.txt']},
+    'second.FA.output.analysis': {
+        'after': ['rework.first.attempt'],
+        'inputs': [f'{FA_DIR}/D_second_attempt_fa_result/**/*.csv']},
+    'emergency.third.attempt.rework': {
+        'after': ['second.FA.output.analysis'],
+        'inputs': [f'{FA_DIR}/D_second_attempt_fa_result/*.txt'],
+        'optional': True},
+    'emergency.third.FA.output.analysis': {
+        'after': ['emergency.third.attempt.rework'],
+        'inputs': [f'{FA_DIR}/F_third_attempt_fa_result/**/*.csv'],
+        'optional': True},
+    'conclude.all.fa.analysis': {
+        'after': ['second.FA.output.analysis', 'emergency.third.FA.output.analysis'],
+        'inputs': [f'{FA_DIR}/B_first_attempt_fa_result/*.txt', f'{FA_DIR}/D_second_attempt_fa_result/*.txt',
+                   f'{FA_DIR}/F_third_attempt_fa_result/*.txt']},
+    'make.clarity.summary': {
+        'after': ['conclude.all.fa.analysis'],
+        'inputs': [f'{POOL_DIR}/A_make_clarity_aliquot_upload_file/final_lib_summary.csv']},
+    'fill.clarity.lib.creation.sheet': {
+        'after': ['make.clarity.summary'],
+        'inputs': [f'{POOL_DIR}/B_fill_clarity_lib_creation_file/*.xls*']},
+    'generate_pool_assignment_tool': {
+        'after': ['fill.clarity.lib.creation.sheet'],
+        'inputs': []},
+    'complete.clarity.pool.prep.sheet': {
+        'after': ['generate_pool_assignment_tool'],
+        'inputs': [f'{POOL_DIR}/C_assign_libs_to_pools/*.xls*']},
+    'finish.pooling.libs': {
+        'after': ['complete.clarity.pool.prep.sheet'],
+        'inputs': [f'{POOL_DIR}/D_finish_pooling/*.xls*']},
+    'pool.FA12.analysis': {
+        'after': ['finish.pooling.libs'],
+        'inputs': [f'{POOL_DIR}/E_pooling_and_rework/**/*.csv'],
+        'optional': True},
+    'rework.pooling.steps': {
+        'after': ['pool.FA12.analysis'],
+        'inputs': [],
+        'optional': True},
+
+    # plotting branches.  They don't change any project files, but run on the
+    # thread pool next to the main chain, so each one follows the last steps
+    # that write the files it reads: the density workbooks (calcSequinAddition),
+    # project_database.csv (the rework steps) and lib_info.csv
+    # (make.clarity.summary).  Steps not in the plan are skipped
+    'plot_DNAconc_vs_Density': {
+        'after': ['calcSequinAddition', 'rework.first.attempt', 'emergency.third.attempt.rework'],
+        'inputs': ['3_merge_density_vol_conc_files/*.xlsx', '3_merge_density_vol_conc_files/*.txt',
+                   '3_merge_density_vol_conc_files/*.csv', '3_merge_density_vol_conc_files/*.CSV'],
+        'optional': True},
+    'pre_vs_post_dna_conc_plots': {
+        'after': ['calcSequinAddition', 'rework.first.attempt', 'emergency.third.attempt.rework'],
+        'inputs': ['3_merge_density_vol_conc_files/*.xlsx', '3_merge_density_vol_conc_files/*.txt',
+                   '3_merge_density_vol_conc_files/*.csv', '3_merge_density_vol_conc_files/*.CSV'],
+        'cwd': '3_merge_density_vol_conc_files',
+        'optional': True},
+    'makeDensityDNAplots': {
+        'after': ['make.clarity.summary'],
+        'inputs': ['lib_info.csv'],
+        'interactive': False,
+        'optional': True},
+    'plot.manually.updated.fa.results': {
+        'after': ['second.FA.output.analysis', 'make.clarity.summary'],
+        'inputs': [f'{FA_DIR}/D_second_attempt_fa_result/updated_*.txt'],
+        'cwd': f'{FA_DIR}/D_second_attempt_fa_result',
+        'interactive': False,
+        'optional': True},
+    'compare.final.lib.summary': {
+        'after': ['conclude.all.fa.analysis'],
+        'inputs': [f'{POOL_DIR}/A_make_clarity_aliquot_upload_file/*final_lib_summary.csv'],
+        'cwd': f'{POOL_DIR}/A_make_clarity_aliquot_upload_file',
+        'interactive': False,
+        'optional': True},
+}
+
+
+##########################
+##########################
+def getStatusDir(project_dir):
+
+    return Path(project_dir) / '.workflow_status'
+##########################
+##########################
+
+
+##########################
+##########################
+def getMarkerTime(project_dir, step):
+
+    marker = getStatusDir(project_dir) / f'{step}.success'
+
+    return marker.stat().st_mtime_ns if marker.exists() else None
+##########################
+##########################
+
+
+##########################
+##########################
+def getFingerprintPath(project_dir, step):
+
+    return getStatusDir(project_dir) / f'{step}.inputs.json'
+##########################
+##########################
+
+
+##########################
+##########################
+def readFingerprint(project_dir, step):
+
+    fp_path = getFingerprintPath(project_dir, step)
+
+    if not fp_path.exists():
+        return None
+
+    with open(fp_path) as f:
+        return json.load(f)
+##########################
+##########################
+
+
+##########################
+##########################
+def findInputs(project_dir, step, args):
+
+    project_dir = Path(project_dir)
+
+    files = set()
+
+    for pattern in STEPS[step]['inputs']:
+        files.update(p for p in project_dir.glob(pattern)
+                     if p.is_file() and not p.name.startswith('~$'))
+
+    # files passed on the command line, e.g. the ultracentrifuge sample list
+    for a in args:
+        p = project_dir / a
+        if p.is_file():
+            files.add(p)
+
+    return sorted(files)
+##########################
+##########################
+
+
+##########################
+##########################
+def makeFingerprint(project_dir, step, args, previous=None):
+
+    # size, mtime and sha256 of each input.  Files with the same size
+    # and mtime as last time keep their previous hash
+    old_files = previous['files'] if previous else {}
+
+    files = {}
+
+    for p in findInputs(project_dir, step, args):
+        rel = p.relative_to(project_dir).as_posix()
+
+        stat = p.stat()
+
+        old = old_files.get(rel)
+
+        if old and (old[0] == stat.st_size) and (old[1] == stat.st_mtime_ns):
+            files[rel] = old
+        else:
+            files[rel] = [stat.st_size, stat.st_mtime_ns, archive_store.hashFile(p)]
+
+    return {'args': list(args), 'files': files}
+##########################
+##########################
+
+
+##########################
+##########################
+def writeFingerprint(project_dir, step, fingerprint):
+
+    fp_path = getFingerprintPath(project_dir, step)
+
+    fp_path.parent.mkdir(exist_ok=True)
+
+    tmp_path = fp_path.with_suffix('.tmp')
+
+    with open(tmp_path, 'w') as f:
+        json.dump(fingerprint, f, indent=1)
+
+    os.replace(tmp_path, fp_path)
+
+    return
+##########################
+##########################
+
+
+##########################
+##########################
+def sameInputs(old, new):
+
+    # compare contents only, a file that was re-saved unchanged is not a change
+    if old['args'] != new['args']:
+        return False
+
+    return {k: v[2] for k, v in old['files'].items()} == {k: v[2] for k, v in new['files'].items()}
+##########################
+##########################
+
+
+##########################
+##########################
+def getStepArgs(project_dir, step, step_args):
+
+    # arguments given on the command line, or else the ones used last time
+    if step in step_args:
+        return step_args[step]
+
+    previous = readFingerprint(project_dir, step)
+
+    return previous['args'] if previous else []
+##########################
+##########################
+
+
+##########################
+##########################
+def whyStale(project_dir, step, args, plan, force):
+
+    # reason the step must run, or None if it is up to date
+    if step in force:
+        return 'forced'
+
+    marker_time = getMarkerTime(project_dir, step)
+
+    if marker_time is None:
+        return 'no success marker'
+
+    for up in STEPS[step]['after']:
+        up_time = getMarkerTime(project_dir, up)
+
+        if (up in plan) and (up_time is not None) and (up_time > marker_time):
+            return f'{up} ran more recently'
+
+    previous = readFingerprint(project_dir, step)
+
+    current = makeFingerprint(project_dir, step, args, previous)
+
+    if previous is None:
+        # marker from a run before fingerprints were kept
+        writeFingerprint(project_dir, step, current)
+        return None
+
+    if not sameInputs(previous, current):
+        return 'inputs changed'
+
+    return None
+##########################
+##########################
+
+
+##########################
+##########################
+def makePlan(project_dir, until=None, include=()):
+
+    # steps to consider, in dependency order.  Optional steps are only
+    # included when requested or when they already have a marker
+    wanted = [s for s in STEPS
+              if not STEPS[s].get('optional') or (s in include) or (getMarkerTime(project_dir, s) is not None)]
+
+    if until is not None:
+        if until not in STEPS:
+            print(f'\n\nUnknown step {until}.  Aborting\n\n')
+            sys.exit()
+
+        # keep only until and the steps it depends on
+        needed = set()
+        todo = [until]
+
+        while todo:
+            s = todo.pop()
+            if s not in needed:
+                needed.add(s)
+                todo.extend(STEPS[s]['after'])
+
+        wanted = [s for s in wanted if s in needed]
+
+    return wanted
+##########################
+##########################
+
+
+##########################
+##########################
+def runStep(project_dir, step, args, terminal_lock):
+
+    # returns True when the script wrote a new success marker
+    info = STEPS[step]
+
+    cmd = [sys.executable, str(SCRIPT_DIR / f'{step}.py')] + list(args)
+
+    cwd = Path(project_dir) / info.get('cwd', '.')
+
+    before = getMarkerTime(project_dir, step)
+
+    previous = readFingerprint(project_dir, step)
+
+    # in batch mode (SIP_BATCH=1) answers come from the project's
+    # sip_params file, so no step needs the terminal
+    if info.get('interactive', True) and not sip_params.isBatch():
+        # questions need the terminal, one step at a time
+        with terminal_lock:
+            print(f'\n\n########## {step} ##########\n', flush=True)
+            result = subprocess.run(cmd, cwd=cwd)
+
+    else:
+        log_path = getStatusDir(project_dir) / f'{step}.log'
+
+        with open(log_path, 'w') as log:
+            result = subprocess.run(cmd, cwd=cwd, stdin=subprocess.DEVNULL,
+                                    stdout=log, stderr=subprocess.STDOUT)
+
+    after = getMarkerTime(project_dir, step)
+
+    # scripts abort with sys.exit(), so a new marker is the only sure sign of success
+    if (result.returncode != 0) or (after is None) or (after == before):
+        return False
+
+    # fingerprint after the run, some steps update their own inputs,
+    # e.g. calcSequinAddition.py writes sequin masses into the density files
+    writeFingerprint(project_dir, step, makeFingerprint(project_dir, step, args, previous))
+
+    return True
+##########################
+##########################
+
+
+##########################
+##########################
+def runWorkflow(project_dir, plan, step_args, force=(), workers=4, dry_run=False):
+
+    getStatusDir(project_dir).mkdir(exist_ok=True)
+
+    terminal_lock = threading.Lock()
+
+    status = {}
+
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        while len(status) < len(plan):
+            progress = False
+
+            for step in plan:
+                if (step in status) or (step in running.values()):
+                    continue
+
+                ups = [u for u in STEPS[step]['after'] if u in plan]
+
+                if any(status.get(u) in ('failed', 'blocked') for u in ups):
+                    status[step] = 'blocked'
+                    print(f'{step}: blocked by an earlier step')
+                    progress = True
+                    continue
+
+                if not all(u in status for u in ups):
+                    continue
+
+                args = getStepArgs(project_dir, step, step_args)
+
+                if STEPS[step].get('needs_arg') and not args:
+                    status[step] = 'blocked'
+                    print(f'{step}: needs an input file, use --arg {step}=FILE')
+                    progress = True
+                    continue
+
+                reason = whyStale(project_dir, step, args, plan, force)
+
+                if reason is None:
+                    status[step] = 'up to date'
+                    print(f'{step}: up to date')
+
+                elif dry_run:
+                    # downstream steps would run too
+                    status[step] = 'would run'
+                    print(f'{step}: would run ({reason})')
+                    force = set(force) | {s for s in plan if step in STEPS[s]['after']}
+
+                else:
+                    print(f'{step}: running ({reason})')
+                    running[executor.submit(runStep, project_dir, step, args, terminal_lock)] = step
+
+                progress = True
+
+            if running and not progress:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for fut in done:
+                    step = running.pop(fut)
+                    status[step] = 'done' if fut.result() else 'failed'
+                    print(f'{step}: {status[step]}')
+
+            elif not running and not progress:
+                break
+
+    return status
+##########################
+##########################
+
+
+##########################
+##########################
+# MAIN PROGRAM
+##########################
+##########################
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--project', type=Path, default=Path.cwd())
+    parser.add_argument('--until', help='run only this step and the steps it depends on')
+    parser.add_argument('--include', nargs='*', default=[], help='optional steps to run')
+    parser.add_argument('--force', nargs='*', default=[], help='steps to re-run even if up to date')
+    parser.add_argument('--arg', action='append', default=[], help='STEP=VALUE argument passed to a step')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    step_args = {}
+
+    for a in args.arg:
+        step, _, value = a.partition('=')
+        step_args.setdefault(step.removesuffix('.py'), []).append(value)
+
+    include = [s.removesuffix('.py') for s in args.include]
+    force = [s.removesuffix('.py') for s in args.force]
+
+    for s in include + force + list(step_args):
+        if s not in STEPS:
+            print(f'\n\nUnknown step {s}.  Aborting\n\n')
+            sys.exit()
+
+    plan = makePlan(args.project, args.until, include)
+
+    status = runWorkflow(args.project, plan, step_args, force,
+                         args.workers, args.dry_run)
+
+    if any(v in ('failed', 'blocked') for v in status.values()):
+        sys.exit(1)